@@ -0,0 +1,204 @@
+"""
+End-to-end latency of the chat paths against the local fake Ollama server.
+Drives the real controllers (prompt building, memory, scheduler, cache, HTTP client) with a
+stand-in for st.session_state, and reports per operation:
+  - p50 / p95 / p99 wall time per call
+  - overhead outside the model: wall time minus the time the fake server spent "generating"
+  - allocations per call (tracemalloc, measured in a separate pass so tracing does not skew timings)
+
+Run from the repository root:
+    python -m benchmarks.bench_chat --turns 100 --token-delay 0.005 --tokens 80
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.fake_ollama import start_fake_ollama
+
+BOT_NAME = "StoryBot"
+
+
+class _SessionState(dict):
+    """Attribute-style dict standing in for st.session_state outside a Streamlit run"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        del self[name]
+
+
+def _fresh_session():
+    """Session state as main.py leaves it for a user on the chat page"""
+    from langchain.memory import ConversationBufferWindowMemory
+    from models.conversation import ConversationLog
+    from services.memory_store import MemoryStore
+
+    state = _SessionState(
+        page="chat",
+        selected_bot=BOT_NAME,
+        user_bots=[],
+        chat_histories={BOT_NAME: ConversationLog()},
+        memories={},
+        performance_metrics={"cache_hits": 0, "cache_misses": 0, "llm_errors": 0, "time_to_first_token": []},
+        group_chat={"bots": [], "shared_history": [], "personality_memories": {}, "histories": {},
+                    "shared_memory": MemoryStore.new_memory()},
+    )
+    state.group_chat["personality_memories"][BOT_NAME] = ConversationBufferWindowMemory(
+        k=30, return_messages=True, memory_key="chat_history"
+    )
+    return state
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _report(name, latencies, overheads, allocations):
+    ordered = sorted(latencies)
+    blocks, net_kib, peak_kib = allocations
+    print(f"{name:<28} p50 {_percentile(ordered, 0.50) * 1000:8.2f} ms  "
+          f"p95 {_percentile(ordered, 0.95) * 1000:8.2f} ms  p99 {_percentile(ordered, 0.99) * 1000:8.2f} ms  "
+          f"overhead {statistics.mean(overheads) * 1000:7.2f} ms  "
+          f"allocs {blocks:7.0f} blocks / {net_kib:7.1f} KiB net / {peak_kib:7.1f} KiB peak")
+
+
+class ChatBenchmark:
+    """Runs each chat operation repeatedly against one fake server"""
+
+    def __init__(self, server, turns, turns_per_chat):
+        self.server = server
+        self.turns = turns
+        self.turns_per_chat = turns_per_chat
+
+    def _model_seconds(self):
+        with self.server.stats_lock:
+            return self.server.model_seconds
+
+    def _reset_session(self):
+        import streamlit as st
+        from services.response_cache import get_response_cache
+
+        st.session_state = _fresh_session()
+        get_response_cache().clear()  # Every call below should reach the model
+
+    # ---- operations (one call each, i is the turn number) ----
+
+    @staticmethod
+    async def _chat_turn(i):
+        from controllers.chat_controller import LLMChatController
+        await LLMChatController().generate_single_response(f"Turn {i}: what happens next?")
+
+    @staticmethod
+    async def _chat_stream_turn(i):
+        from controllers.chat_controller import LLMChatController
+        async for _ in LLMChatController().stream_single_response(f"Turn {i}: what happens next?"):
+            pass
+
+    @staticmethod
+    async def _greeting(i):
+        from controllers.chat_controller import LLMChatController
+        from services.response_cache import get_response_cache
+        get_response_cache().clear()  # Same prompt every time; measure the uncached path
+        await LLMChatController().generate_greeting()
+
+    @staticmethod
+    async def _enhance(i):
+        from controllers.chat_controller import LLMChatController
+        await LLMChatController().enhance_text(f"A brave knight, version {i}.", "character description")
+
+    @staticmethod
+    async def _group_turn(i):
+        from config import get_default_bots
+        from controllers.group_chat_controller import GroupChatManager
+        bot = next(bot for bot in get_default_bots() if bot.name == BOT_NAME)
+        await GroupChatManager().generate_bot_response(bot, f"Turn {i}: what do you think?")
+
+    # ---- measurement ----
+
+    async def _timed(self, operation):
+        latencies, overheads = [], []
+        self._reset_session()
+        await operation(-1)  # Warm up imports, the HTTP pool and the chain cache
+        for i in range(self.turns):
+            if i % self.turns_per_chat == 0:
+                self._reset_session()
+            model_before = self._model_seconds()
+            started = time.perf_counter()
+            await operation(i)
+            elapsed = time.perf_counter() - started
+            latencies.append(elapsed)
+            overheads.append(elapsed - (self._model_seconds() - model_before))
+        return latencies, overheads
+
+    async def _allocations(self, operation):
+        """Mean (blocks, net KiB, peak KiB) allocated per call"""
+        blocks = net = peak = 0.0
+        self._reset_session()
+        tracemalloc.start()
+        try:
+            for i in range(self.turns):
+                if i % self.turns_per_chat == 0:
+                    self._reset_session()
+                before = tracemalloc.take_snapshot()
+                tracemalloc.reset_peak()
+                base, _ = tracemalloc.get_traced_memory()
+                await operation(i)
+                _, turn_peak = tracemalloc.get_traced_memory()
+                diff = tracemalloc.take_snapshot().compare_to(before, "filename")
+                blocks += sum(stat.count_diff for stat in diff if stat.count_diff > 0)
+                net += sum(stat.size_diff for stat in diff)
+                peak += turn_peak - base
+        finally:
+            tracemalloc.stop()
+        return blocks / self.turns, net / self.turns / 1024, peak / self.turns / 1024
+
+    def run(self, name, operation):
+        with contextlib.redirect_stdout(io.StringIO()):  # The controllers log every turn
+            latencies, overheads = asyncio.run(self._timed(operation))
+            allocations = asyncio.run(self._allocations(operation))
+        _report(name, latencies, overheads, allocations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=100, help="Calls per operation")
+    parser.add_argument("--turns-per-chat", type=int, default=20, help="Start a fresh conversation every N turns")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Fake model seconds per token")
+    parser.add_argument("--tokens", type=int, default=60, help="Reply length in tokens")
+    args = parser.parse_args()
+
+    server, base_url = start_fake_ollama(token_delay=args.token_delay, response_tokens=args.tokens)
+    # Must be set before the shared client and caches are created
+    os.environ["OLLAMA_HOST"] = base_url
+    from config import RESPONSE_CACHE_CONFIG, GREETING_POOL_CONFIG, CONVERSATION_STORE_CONFIG
+    RESPONSE_CACHE_CONFIG["sqlite_path"] = None
+    GREETING_POOL_CONFIG["path"] = None
+    CONVERSATION_STORE_CONFIG["sqlite_path"] = None
+
+    print(f"Fake Ollama at {base_url}: {args.tokens} tokens per reply, {args.token_delay * 1000:.1f} ms per token, "
+          f"{args.turns} calls per operation\n")
+    bench = ChatBenchmark(server, args.turns, args.turns_per_chat)
+    try:
+        bench.run("generate_single_response", bench._chat_turn)
+        bench.run("stream_single_response", bench._chat_stream_turn)
+        bench.run("generate_greeting", bench._greeting)
+        bench.run("enhance_text", bench._enhance)
+        bench.run("group generate_bot_response", bench._group_turn)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Round-trip overhead of the LangChain Ollama wrapper versus the native pooled client,
+measured against the local fake server so only client-side cost is timed.
+
+Run from the repository root:
+    python -m benchmarks.bench_ollama_client --requests 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.fake_ollama import start_fake_ollama
+
+
+def _report(name, samples):
+    samples = sorted(samples)
+    p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+    print(f"{name:<40} mean {statistics.mean(samples) * 1000:7.2f} ms   "
+          f"p50 {statistics.median(samples) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms")
+
+
+def _time_calls(call, count):
+    call()  # Warm up (connection setup, imports)
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _time_async_stream(astream, count):
+    async def run():
+        async for _ in astream():
+            pass
+        samples = []
+        for _ in range(count):
+            started = time.perf_counter()
+            async for _ in astream():
+                pass
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--model", default="llama3:latest")
+    args = parser.parse_args()
+
+    server, base_url = start_fake_ollama()
+    prompt = "Tell me a short story about a dragon."
+    print(f"Fake Ollama at {base_url}, {args.requests} requests per case\n")
+
+    try:
+        # Before: langchain_community's wrapper (new HTTP connection per request)
+        from langchain_community.llms import Ollama
+        legacy = Ollama(model=args.model, base_url=base_url)
+        _report("langchain Ollama invoke", _time_calls(lambda: legacy.invoke(prompt), args.requests))
+        _report("langchain Ollama astream",
+                _time_async_stream(lambda: legacy.astream(prompt), args.requests))
+
+        # After: native client with a pooled keep-alive session
+        from services.ollama_client import OllamaClient, OllamaLLM
+        import services.ollama_client as ollama_client
+        ollama_client._shared_client = OllamaClient(base_url=base_url)
+
+        client = ollama_client.get_ollama_client()
+        _report("native client generate",
+                _time_calls(lambda: client.generate(args.model, prompt), args.requests))
+        _report("native client stream_generate",
+                _time_calls(lambda: list(client.stream_generate(args.model, prompt)), args.requests))
+
+        native = OllamaLLM(model=args.model)
+        _report("OllamaLLM invoke (LangChain adapter)", _time_calls(lambda: native.invoke(prompt), args.requests))
+        _report("OllamaLLM astream (LangChain adapter)",
+                _time_async_stream(lambda: native.astream(prompt), args.requests))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
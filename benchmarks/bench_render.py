@@ -0,0 +1,96 @@
+"""
+Rerun time of the chat page as conversations grow.
+Renders views/pages/chat.py with Streamlit's AppTest harness for chats of 10, 100 and 1000 messages
+and reports, per size:
+  - p50 / p95 rerun time
+  - widgets per rerun (chat messages and buttons)
+once with the default render window and once with every message rendered, for comparison.
+No model is called: the chats are pre-filled and already greeted.
+
+Run from the repository root:
+    python -m benchmarks.bench_render --sizes 10 100 1000 --reruns 20
+"""
+import argparse
+import contextlib
+import io
+import time
+
+BOT_NAME = "StoryBot"
+
+
+def _chat_page_script():
+    """Script run by AppTest: the chat page alone, as main.py renders it"""
+    import asyncio
+    from views.pages.chat import chat_page
+    asyncio.run(chat_page("StoryBot"))
+
+
+def _filled_log(size):
+    """A chat log of size alternating messages, bot replies with quoted dialogue"""
+    from models.conversation import ConversationLog
+
+    chat_log = ConversationLog()
+    chat_log.append("assistant", 'The innkeeper looks up. "Welcome, traveller."', greeting=True)
+    for i in range(1, size):
+        if i % 2:
+            chat_log.append("user", f"Message {i}: I ask about the road north.")
+        else:
+            chat_log.append("assistant", f'*leans in* "The road north is dangerous," she says. "Turn {i}."')
+    return chat_log
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def measure(size, reruns, render_all):
+    """Rerun timings and widget counts for one chat size"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_function(_chat_page_script, default_timeout=120)
+    app.session_state["selected_bot"] = BOT_NAME
+    app.session_state["page"] = "chat"
+    app.session_state["user_bots"] = []
+    app.session_state["chat_histories"] = {BOT_NAME: _filled_log(size)}
+    app.session_state["memories"] = {}
+    app.session_state["greeting_sent"] = True
+    app.session_state["performance_metrics"] = {"cache_hits": 0, "cache_misses": 0, "llm_errors": 0,
+                                                "time_to_first_token": []}
+    if render_all:
+        app.session_state[f"render_window_{BOT_NAME}"] = size
+
+    app.run()  # First run imports the page and builds the controller
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+
+    timings = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - started)
+    return sorted(timings), len(app.chat_message), len(app.button)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Messages per chat")
+    parser.add_argument("--reruns", type=int, default=20, help="Timed reruns per size")
+    args = parser.parse_args()
+
+    from config import CONVERSATION_STORE_CONFIG, GREETING_POOL_CONFIG, CHAT_RENDER_CONFIG
+    CONVERSATION_STORE_CONFIG["sqlite_path"] = None
+    GREETING_POOL_CONFIG["path"] = None
+
+    print(f"Render window: {CHAT_RENDER_CONFIG['window']} messages, {args.reruns} reruns per size\n")
+    for size in args.sizes:
+        for render_all in (False, True):
+            with contextlib.redirect_stdout(io.StringIO()):  # The page logs every rerun
+                timings, messages, buttons = measure(size, args.reruns, render_all)
+            mode = "all messages" if render_all else "windowed"
+            print(f"{size:>5} messages  {mode:<13} p50 {_percentile(timings, 0.50) * 1000:8.1f} ms  "
+                  f"p95 {_percentile(timings, 0.95) * 1000:8.1f} ms  "
+                  f"{messages:5d} chat messages  {buttons:5d} buttons rendered")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Cold-start time to first paint.
+Each sample is a fresh Python process that imports Streamlit and renders main.py once with the
+AppTest harness, as a new server would for its first visitor. Reports, per start page:
+  - p50 / p95 time from process start to the end of the first script run
+  - which heavy dependencies (torch, torchaudio, zonos, LangChain, PIL) that run loaded
+  - the slowest top-level imports (python -X importtime)
+once with lazy page imports (the app as shipped) and once with every page module imported up front,
+for comparison. No model is called: greeting warm-up and the metrics endpoint are turned off.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup --runs 5 --pages home chat
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("torch", "torchaudio", "zonos", "langchain", "langchain_core", "PIL")
+
+# Runs in the child process; prints one JSON line when the first run has finished
+_CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+streamlit_s = time.perf_counter() - started
+
+from config import CONVERSATION_STORE_CONFIG, GREETING_POOL_CONFIG, get_default_bots
+CONVERSATION_STORE_CONFIG["sqlite_path"] = None
+GREETING_POOL_CONFIG["path"] = None
+if {eager}:
+    import importlib
+    from views.pages import ROUTES
+    for module, _ in ROUTES.values():
+        importlib.import_module("views.pages." + module)
+
+app = AppTest.from_file("main.py", default_timeout=300)
+app.session_state["greetings_warmed"] = True
+app.session_state["page"] = {page!r}
+app.session_state["selected_bot"] = get_default_bots()[0].name
+run_started = time.perf_counter()
+app.run()
+print(json.dumps({{
+    "streamlit_s": streamlit_s,
+    "first_run_s": time.perf_counter() - run_started,
+    "error": app.exception[0].message if app.exception else None,
+    "heavy": sorted(name for name in {heavy!r} if name in sys.modules),
+    "modules": len(sys.modules),
+}}))
+"""
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _slowest_imports(importtime_log, count):
+    """Top-level imports with the largest cumulative time, from python -X importtime output"""
+    imports = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not name.startswith(" ") or name.startswith("  "):
+            continue  # Nested import; its time is already in its parent's cumulative time
+        try:
+            imports.append((int(cumulative), name.strip()))
+        except ValueError:
+            continue  # Header line
+    return sorted(imports, reverse=True)[:count]
+
+
+def measure(page, eager):
+    """One cold start: (seconds to first paint, child report, slowest imports)"""
+    env = dict(os.environ, METRICS_PORT="0")
+    env.pop("PROFILE_RERUNS", None)
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD.format(page=page, eager=eager, heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, env=env, check=False
+    )
+    elapsed = time.perf_counter() - started
+    report_line = next((line for line in reversed(result.stdout.splitlines()) if line.startswith("{")), None)
+    if report_line is None:
+        raise RuntimeError(f"Cold start failed:\n{result.stderr[-2000:]}")
+    report = json.loads(report_line)
+    if report["error"]:
+        raise RuntimeError(f"main.py raised on the first run: {report['error']}")
+    return elapsed, report, _slowest_imports(result.stderr, 8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts per page and mode")
+    parser.add_argument("--pages", nargs="+", default=["home"], help="Start pages (routes in views/pages)")
+    args = parser.parse_args()
+
+    print(f"{args.runs} cold starts per page and mode\n")
+    for page in args.pages:
+        for eager in (False, True):
+            timings, report, slowest = [], None, None
+            for _ in range(args.runs):
+                elapsed, report, slowest = measure(page, eager)
+                timings.append(elapsed)
+            timings.sort()
+            mode = "all pages" if eager else "lazy"
+            print(f"{page:<12} {mode:<10} p50 {_percentile(timings, 0.50) * 1000:8.1f} ms  "
+                  f"p95 {_percentile(timings, 0.95) * 1000:8.1f} ms  "
+                  f"(streamlit import {report['streamlit_s'] * 1000:6.1f} ms, "
+                  f"first run {report['first_run_s'] * 1000:7.1f} ms, {report['modules']} modules)")
+            print(f"{'':<12} heavy modules loaded: {', '.join(report['heavy']) or 'none'}")
+            for cumulative_us, name in slowest[:5]:
+                print(f"{'':<12}   {cumulative_us / 1000:8.1f} ms  import {name}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
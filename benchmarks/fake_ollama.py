@@ -0,0 +1,169 @@
+"""
+Minimal stand-in for the Ollama HTTP API, used to measure client overhead without a model.
+Serves /api/generate and /api/chat (streaming NDJSON or single JSON) over HTTP/1.1 keep-alive,
+with a configurable per-token delay and reply length. Time spent "in the model" is accumulated in
+server.model_seconds so benchmarks can separate it from client-side overhead.
+
+Run standalone (point the app at it with OLLAMA_HOST=http://127.0.0.1:11435):
+    python -m benchmarks.fake_ollama --port 11435 --token-delay 0.02 --tokens 120
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = "Once upon a time, in a land of fluffy clouds, a small dragon learned to sing."
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep connections open between requests
+
+    # Set on the server instance by start_fake_ollama()
+    def _settings(self):
+        return (getattr(self.server, "reply", DEFAULT_REPLY), getattr(self.server, "token_delay", 0.0),
+                getattr(self.server, "response_tokens", None))
+
+    def _tokens(self, reply, response_tokens, request):
+        """Reply split into tokens, repeated or cut to the configured length (and num_predict)"""
+        words = reply.split(" ")
+        count = response_tokens or len(words)
+        num_predict = (request.get("options") or {}).get("num_predict")
+        if num_predict and num_predict > 0:
+            count = min(count, num_predict)
+        tokens = [word + " " for word in itertools.islice(itertools.cycle(words), count)]
+        if tokens:
+            tokens[-1] = tokens[-1].rstrip()
+        return tokens
+
+    def _add_model_time(self, seconds):
+        with self.server.stats_lock:
+            self.server.model_seconds += seconds
+            self.server.request_count += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": "llama3:latest"}]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json({"error": "invalid JSON"}, status=400)
+            return
+
+        if self.path not in ("/api/generate", "/api/chat"):
+            self._send_json({"error": f"unknown endpoint {self.path}"}, status=404)
+            return
+
+        reply, token_delay, response_tokens = self._settings()
+        chat = self.path == "/api/chat"
+        tokens = self._tokens(reply, response_tokens, request)
+
+        if request.get("stream", True):
+            self._stream(request, tokens, token_delay, chat)
+        else:
+            time.sleep(token_delay * len(tokens))
+            self._add_model_time(token_delay * len(tokens))
+            self._send_json(self._chunk(request, "".join(tokens), chat, done=True, eval_count=len(tokens)))
+
+    @staticmethod
+    def _chunk(request, text, chat, done, eval_count=0):
+        chunk = {"model": request.get("model", ""), "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                 "done": done}
+        if chat:
+            chunk["message"] = {"role": "assistant", "content": text}
+        else:
+            chunk["response"] = text
+        if done:
+            chunk.update({
+                "done_reason": "stop",
+                "prompt_eval_count": len(json.dumps(request)) // 4,
+                "eval_count": eval_count,
+                "total_duration": 0,
+            })
+            if not chat:
+                chunk["context"] = [1, 2, 3]
+        return chunk
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, request, tokens, token_delay, chat):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        slept = 0.0
+        try:
+            for token in tokens:
+                if token_delay:
+                    time.sleep(token_delay)
+                    slept += token_delay
+                self._write_chunk(self._chunk(request, token, chat, done=False))
+            self._write_chunk(self._chunk(request, "", chat, done=True, eval_count=len(tokens)))
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client hung up mid-stream (cancelled generation)
+            self.close_connection = True
+        finally:
+            self._add_model_time(slept)
+
+    def _write_chunk(self, payload):
+        line = json.dumps(payload).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+
+def start_fake_ollama(port: int = 0, reply: str = DEFAULT_REPLY, token_delay: float = 0.0,
+                      response_tokens: int = None):
+    """
+    Start the fake server on a background thread
+
+    Args:
+        port: Port to bind (0 picks a free one)
+        reply: Text every request answers with
+        token_delay: Seconds to wait before each generated token
+        response_tokens: Reply length in tokens (None uses the reply text as is)
+
+    Returns:
+        (server, base_url); call server.shutdown() when done
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeOllamaHandler)
+    server.daemon_threads = True
+    server.reply = reply
+    server.token_delay = token_delay
+    server.response_tokens = response_tokens
+    server.stats_lock = threading.Lock()
+    server.model_seconds = 0.0
+    server.request_count = 0
+    threading.Thread(target=server.serve_forever, daemon=True, name="fake-ollama").start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Ollama server for benchmarks")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds per generated token")
+    parser.add_argument("--tokens", type=int, default=None, help="Reply length in tokens")
+    args = parser.parse_args()
+
+    server, url = start_fake_ollama(args.port, token_delay=args.token_delay, response_tokens=args.tokens)
+    print(f"Fake Ollama listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -2,7 +2,6 @@
 import io
 import os
 import streamlit as st
-from PIL import Image
 
 
 def get_bot_attribute(bot, attribute, default=None):
@@ -36,6 +35,7 @@ def get_bot_avatar(bot, size=40):
             "filepath" in avatar_data and
             os.path.exists(avatar_data["filepath"])):
 
+        from PIL import Image  # Only bots with image avatars need PIL; it loads on first use
         try:
             # Open and resize image
             image = Image.open(avatar_data["filepath"])
@@ -78,6 +78,7 @@ def get_avatar_display(bot, size=40):
             if isinstance(avatar_data, dict):
                 filepath = avatar_data.get('filepath')
                 if filepath and os.path.exists(filepath):
+                    from PIL import Image
                     try:
                         image = Image.open(filepath)
                         # Resize image to requested size for consistency
@@ -123,7 +124,7 @@ def display_avatar(bot, width=80):
     """Display bot avatar in Streamlit (for use in pages/components)"""
     avatar_display = get_avatar_display(bot, size=width)
 
-    if isinstance(avatar_display, Image.Image):
+    if not isinstance(avatar_display, str):
         # It's an image - display it
         st.image(avatar_display, width=width)
     else:
@@ -1,16 +1,26 @@
 import streamlit as st
 import pyperclip
 from controllers.chat_controller import LLMChatController
+from services.conversation_store import get_conversation_store
+from services.memory_store import MemoryStore
+from services.rerun_metrics import RerunMetrics
 
 
-async def display_chat_toolbar(controller: LLMChatController = None):
-    """Compact chat toolbar component"""
+@st.fragment
+def display_chat_toolbar(controller: LLMChatController = None):
+    """Compact chat toolbar component; its buttons redraw only the toolbar unless the chat changes"""
+    with RerunMetrics.track("fragment:toolbar"):
+        _render_toolbar(controller)
+
+
+def _render_toolbar(controller: LLMChatController = None):
+    """Body of the toolbar fragment"""
     if controller is None:
         controller = LLMChatController()
 
     # Get current chat history
     bot_name = st.session_state.selected_bot
-    chat_history = st.session_state.chat_histories.get(bot_name, [])
+    chat_history = MemoryStore.log(bot_name)
 
     # Create a compact toolbar (image, options, spacer)
     toolbar_cols = st.columns([1, 1, 4])
@@ -35,10 +45,9 @@ async def display_chat_toolbar(controller: LLMChatController = None):
                     use_container_width=True,
                     key=f"clear_chat_{bot_name}"
             ):
-                st.session_state.chat_histories[bot_name] = []
+                chat_history.clear()
                 st.session_state.greeting_sent = False
-                if 'memory' in st.session_state:
-                    st.session_state.memory['chat_history'].clear()
+                MemoryStore.clear(MemoryStore.key_for_name(bot_name))
                 st.toast("Chat cleared!", icon="🗑️")
                 st.rerun()
 
@@ -51,10 +60,13 @@ async def display_chat_toolbar(controller: LLMChatController = None):
                     use_container_width=True,
                     key=f"export_chat_{bot_name}"
             ):
+                if chat_history.earlier:
+                    # Stored chats are only partly loaded; export all of it
+                    get_conversation_store().load_earlier(chat_history, chat_history.earlier)
                 chat_text = f"Chat with {bot_name}\n\n"
-                for role, msg in chat_history:
-                    prefix = "You: " if role == "user" else f"{bot_name}: "
-                    chat_text += f"{prefix}{msg}\n\n"
+                for message in chat_history:
+                    prefix = "You: " if message.role == "user" else f"{bot_name}: "
+                    chat_text += f"{prefix}{message.content}\n\n"
 
                 st.download_button(
                     "Download chat",
@@ -62,4 +74,11 @@ async def display_chat_toolbar(controller: LLMChatController = None):
                     file_name=f"chat_with_{bot_name}.txt",
                     mime="text/plain",
                     key=f"download_{bot_name}"
-                )
\ No newline at end of file
+                )
+
+            st.divider()
+
+            # How much each interaction redraws (full page vs one fragment)
+            for scope, stats in RerunMetrics.summary().items():
+                st.caption(f"{scope}: {stats['count']} reruns, last {stats['last_ms']:.0f} ms, "
+                           f"avg {stats['mean_ms']:.0f} ms")
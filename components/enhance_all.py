@@ -0,0 +1,80 @@
+import streamlit as st
+from config import ENHANCE_CONFIG
+from controllers.chat_controller import LLMChatController
+
+# (session key, widget key, enhance_text field name, label) for each enhanceable form field
+ENHANCE_FIELDS = [
+    ("appearance_text", "appearance_text_widget", "appearance description", "Appearance"),
+    ("desc_text", "desc_text_widget", "character background", "Background"),
+    ("scenario_text", "scenario_text_widget", "scenario context", "Scenario"),
+    ("greeting_text", "greeting_text_widget", "character greeting", "Greeting"),
+]
+
+
+def build_greeting_prompt(form_data, current_greeting):
+    """Greeting rewrite prompt built from the rest of the form"""
+    context = {
+        "name": form_data["basic"]["name"],
+        "appearance": st.session_state.get("appearance_text", ""),
+        "background": st.session_state.get("desc_text", ""),
+        "personality": ", ".join(form_data["personality"]["traits"]),
+        "current_greeting": current_greeting
+    }
+
+    return f"""Create an engaging greeting message for {context['name']} that:
+                - Matches their personality: {context['personality']}
+                - Reflects their background: {context['background']}
+                - Optionally references their appearance: {context['appearance']}
+                - Is 4-5 sentences maximum
+                - Sounds in-character
+                - Thoughts appear in italics format
+                - Dialogue in "quotes"
+
+                Current greeting (improve upon this):
+                {context['current_greeting']}
+                === Enhanced greeting ===
+
+                === End Enhanced greeting ==="""
+
+
+async def render_enhance_all_button(form_data, limits):
+    """
+    "Enhance all" button: enhances every filled-in text field concurrently and keeps partial results
+
+    Args:
+        form_data: Form data collected so far (name and traits feed the greeting prompt)
+        limits: {session key: max characters} for each field
+    """
+    if not st.button("✨ Enhance all", key="enhance_all", help="Enhance every description field at once with AI"):
+        return
+
+    fields = {}
+    for state_key, widget_key, field_name, _ in ENHANCE_FIELDS:
+        text = st.session_state.get(widget_key, st.session_state.get(state_key, ""))
+        if field_name == "character greeting" and text.strip():
+            text = build_greeting_prompt(form_data, text)
+        fields[field_name] = text
+
+    with st.spinner("Enhancing all fields..."):
+        results = await LLMChatController().enhance_fields(fields, timeout=ENHANCE_CONFIG["field_timeout"])
+
+    if not results:
+        st.toast("Fill in at least one field to enhance", icon="ℹ️")
+        return
+
+    failed = []
+    for state_key, _, field_name, label in ENHANCE_FIELDS:
+        if field_name not in results:
+            continue
+        enhanced = results[field_name]
+        if enhanced is None:
+            failed.append(label)
+            continue
+        # Ensure enhanced text doesn't exceed the limit
+        st.session_state[state_key] = enhanced[:limits[state_key]]
+
+    if failed:
+        st.toast(f"Could not enhance: {', '.join(failed)} (kept as is)", icon="⚠️")
+    else:
+        st.toast("All fields enhanced!", icon="✨")
+    st.rerun()
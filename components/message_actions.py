@@ -1,19 +1,28 @@
 import streamlit as st
 import pyperclip
-import asyncio
 from components.audio_player import audio_player
+from services.async_runner import run_async
+from services.memory_store import MemoryStore
+from services.conversation_context import ConversationContext
+from services.cancellation import CancellationRegistry, GenerationCancelled
+from services.message_alternatives import MessageAlternatives
+from services.llm_scheduler import get_llm_scheduler
+from controllers.voice_controller import VoiceService
+from config import REGENERATE_CONFIG
 
+# Seconds a first audio request waits for the voice engine to finish loading
+VOICE_INIT_TIMEOUT = 120
 
-async def display_message_actions(role, message, idx, chat_history, bot_name, bot_controller, bot_has_voice,
-                                  current_bot):
+
+def display_message_actions(message, chat_log, bot_name, bot_controller, bot_has_voice, current_bot):
     """
-    Display action buttons for a message (copy, regenerate, edit, delete, voice)
+    Display action buttons for a message (copy, regenerate, edit, delete, voice).
+    Runs inside the message's fragment: actions that only change this message rerun just that
+    fragment, actions that change the message list rerun the page.
 
     Args:
-        role: "user" or "assistant"
-        message: The message content
-        idx: Message index in chat history
-        chat_history: Full chat history
+        message: The Message to act on
+        chat_log: ConversationLog the message belongs to
         bot_name: Name of the current bot
         bot_controller: LLMChatController instance
         bot_has_voice: Whether voice is enabled for this bot
@@ -21,25 +30,33 @@ async def display_message_actions(role, message, idx, chat_history, bot_name, bo
     """
     try:
         # Different actions for user vs assistant messages
-        if role == "assistant":
-            await _display_assistant_actions(message, idx, chat_history, bot_name, bot_controller, bot_has_voice,
-                                             current_bot)
+        if message.role == "assistant":
+            _display_assistant_actions(message, chat_log, bot_name, bot_controller, bot_has_voice, current_bot)
         else:
-            await _display_user_actions(message, idx, chat_history, bot_name, bot_controller)
+            _display_user_actions(message, bot_name, bot_controller)
 
     except Exception as e:
         st.error(f"Message actions error: {str(e)}")
 
 
-async def _display_assistant_actions(message, idx, chat_history, bot_name, bot_controller, bot_has_voice, current_bot):
+def _display_assistant_actions(message, chat_log, bot_name, bot_controller, bot_has_voice, current_bot):
     """Display actions for assistant messages"""
     # Skip actions for greeting message
-    if idx == 0:  # First message is usually greeting
+    if message.meta.get("greeting") or message.parent_id is None:
         return
 
+    idx = message.id
+    alternatives = MessageAlternatives.get(message)
+
     with st.container():
         # Create columns for different action types
-        action_cols = st.columns([4, 1, 1, 1])  # Space, copy, regenerate, voice
+        if alternatives:
+            # Space, previous, position, next, copy, regenerate, voice
+            action_cols = st.columns([2, 1, 1, 1, 1, 1, 1])
+            _display_alternative_switcher(alternatives, action_cols[1:4], bot_name, message)
+            action_cols = [action_cols[0]] + action_cols[4:]
+        else:
+            action_cols = st.columns([4, 1, 1, 1])  # Space, copy, regenerate, voice
 
         # Empty space
         with action_cols[0]:
@@ -53,7 +70,7 @@ async def _display_assistant_actions(message, idx, chat_history, bot_name, bot_c
                     use_container_width=True,
                     key=f"copy_chat_{bot_name}_{idx}"
             ):
-                _handle_copy_message(message)
+                _handle_copy_message(message.content)
 
         # Regenerate button
         with action_cols[2]:
@@ -63,18 +80,37 @@ async def _display_assistant_actions(message, idx, chat_history, bot_name, bot_c
                     use_container_width=True,
                     key=f"regen_{bot_name}_{idx}"
             ):
-                await _handle_regenerate_response(idx, chat_history, bot_name, bot_controller)
+                _handle_regenerate_response(message, chat_log, bot_name, bot_controller)
 
         # Voice button (only if voice is enabled)
         with action_cols[3]:
-            if bot_has_voice and hasattr(st.session_state, 'voice_service'):
-                _display_voice_button(message, current_bot, bot_name, idx)
+            if bot_has_voice:
+                _display_voice_button(message, current_bot, bot_name)
             else:
                 st.empty()  # Empty space if no voice
 
 
-async def _display_user_actions(message, idx, chat_history, bot_name, bot_controller):
+def _display_alternative_switcher(alternatives, cols, bot_name, message):
+    """◀ n/N ▶ controls to flip between regenerated replies (no LLM call)"""
+    selected = alternatives["selected"]
+    total = len(alternatives["candidates"])
+    idx = message.id
+
+    with cols[0]:
+        if st.button("◀", help="Previous alternative", use_container_width=True, key=f"alt_prev_{bot_name}_{idx}"):
+            MessageAlternatives.select(bot_name, message, selected - 1)
+            st.rerun(scope="fragment")
+    with cols[1]:
+        st.caption(f"{selected + 1}/{total}")
+    with cols[2]:
+        if st.button("▶", help="Next alternative", use_container_width=True, key=f"alt_next_{bot_name}_{idx}"):
+            MessageAlternatives.select(bot_name, message, selected + 1)
+            st.rerun(scope="fragment")
+
+
+def _display_user_actions(message, bot_name, bot_controller):
     """Display actions for user messages (edit, delete)"""
+    idx = message.id
     with st.container():
         action_cols = st.columns([5, 1, 1])  # Space, edit, delete
 
@@ -92,8 +128,8 @@ async def _display_user_actions(message, idx, chat_history, bot_name, bot_contro
             ):
                 st.session_state.editing_message = {
                     'bot_name': bot_name,
-                    'message_index': idx,
-                    'current_content': message
+                    'message_id': message.id,
+                    'current_content': message.content
                 }
                 st.rerun()
 
@@ -105,7 +141,7 @@ async def _display_user_actions(message, idx, chat_history, bot_name, bot_contro
                     use_container_width=True,
                     key=f"delete_{bot_name}_{idx}"
             ):
-                await _handle_delete_message(idx, chat_history, bot_name, bot_controller)
+                _handle_delete_message(message, bot_name, bot_controller)
 
 
 def _handle_copy_message(message):
@@ -117,34 +153,30 @@ def _handle_copy_message(message):
         st.error(f"Failed to copy: {str(e)}")
 
 
-async def _handle_regenerate_response(idx, chat_history, bot_name, bot_controller):
+def _handle_regenerate_response(message, chat_log, bot_name, bot_controller):
     """Handle regenerate response for assistant messages"""
     try:
-        # Store the user message that prompted this response
-        user_message = chat_history[idx - 1][1]  # Previous message is user input
-
-        # Remove this response and all subsequent messages
-        st.session_state.chat_histories[bot_name] = chat_history[:idx]
-
-        # Clear memory of this exchange
-        if 'memory' in st.session_state:
-            messages = st.session_state.memory['chat_history'].messages
-            if len(messages) >= 2:
-                st.session_state.memory['chat_history'].messages = messages[:-2]
-
-        # Clear audio cache for removed messages
-        keys_to_remove = [key for key in st.session_state.audio_cache if
-                          bot_name in key and int(key.split('_')[-1]) >= idx]
-        for key in keys_to_remove:
-            generating_key = f"generating_{key}"
-            if generating_key in st.session_state:
-                del st.session_state[generating_key]
-            del st.session_state.audio_cache[key]
-
-        # Regenerate response
+        # The user message this reply answered
+        user_message = chat_log.get(message.parent_id)
+
+        # Remove this response and all subsequent messages (memory and per-message audio go with them)
+        chat_log.truncate_after(message.id, inclusive=True)
+        ConversationContext.invalidate(MemoryStore.for_bot_name(bot_name))
+
+        # Generate several candidates at once; extra ones would only queue behind the scheduler's slots
+        count = max(1, min(REGENERATE_CONFIG["candidates"], get_llm_scheduler().max_concurrency))
         with st.spinner("Regenerating response..."):
-            new_response = await bot_controller.generate_single_response(user_message)
-            st.session_state.chat_histories[bot_name].append(("assistant", new_response))
+            candidates = run_async(bot_controller.generate_candidates(user_message.content, count))
+        if not candidates:
+            return  # Superseded by a newer request
+
+        reply = chat_log.last()
+        if reply is None or reply.role != "assistant":
+            # Not recorded (error message): show it without adding it to memory
+            reply = chat_log.append("assistant", candidates[0], parent_id=user_message.id)
+        # The replaced reply stays reachable as an alternative
+        MessageAlternatives.add(reply, message, candidates)
+        chat_log.update(reply)
 
         st.rerun()
 
@@ -152,76 +184,81 @@ async def _handle_regenerate_response(idx, chat_history, bot_name, bot_controlle
         st.error(f"Regeneration failed: {str(e)}")
 
 
-async def _handle_delete_message(idx, chat_history, bot_name, bot_controller):
+def _handle_delete_message(message, bot_name, bot_controller):
     """Handle delete message and subsequent messages"""
     try:
-        await bot_controller.delete_message(bot_name, idx)
+        run_async(bot_controller.delete_message(bot_name, message.id))
         st.rerun()
 
     except Exception as e:
         st.error(f"Delete failed: {str(e)}")
 
 
-def _display_voice_button(message, current_bot, bot_name, idx):
-    """Display voice generation button with three states"""
+def _display_voice_button(message, current_bot, bot_name):
+    """Display the voice button: generate, then play"""
     try:
-        # Create a unique key for this message's audio
-        audio_key = f"audio_{bot_name}_{idx}"
-        generating_key = f"generating_{audio_key}"
+        # Create a unique key for this message's audio (message ids are never reused)
+        audio_key = f"audio_{bot_name}_{message.id}"
 
-        # Initialize generating state if not exists
-        if generating_key not in st.session_state:
-            st.session_state[generating_key] = False
-
-        # Check if audio already exists in cache
-        audio_exists = audio_key in st.session_state.audio_cache
+        # Audio generated for this message is kept in its metadata
+        audio_path = message.meta.get("audio_path")
         import os
 
-        if audio_exists:
-            # Verify the file actually exists
-            audio_path = st.session_state.audio_cache[audio_key]
-            if not os.path.exists(audio_path):
-                del st.session_state.audio_cache[audio_key]
-                audio_exists = False
-
-        # Show appropriate button based on state
-        if st.session_state[generating_key]:
-            st.button("⏳", help="Generating audio...", key=f"loading_{audio_key}", disabled=True)
-        elif audio_exists:
-            audio_path = st.session_state.audio_cache[audio_key]
+        if audio_path and not os.path.exists(audio_path):
+            # The file was removed behind our back
+            del message.meta["audio_path"]
+            MemoryStore.log(bot_name).update(message)
+            audio_path = None
+
+        if audio_path:
             if st.button("▶️", help="Play audio", key=f"play_{audio_key}"):
                 pass  # audio_player will handle playback
             audio_player(audio_path, autoplay=False)
-        else:
-            if st.button("🔊", help="Generate audio", key=f"generate_{audio_key}"):
-                st.session_state[generating_key] = True
-                asyncio.create_task(_generate_audio_for_message(message, current_bot, audio_key, generating_key))
+        elif st.button("🔊", help="Generate audio", key=f"generate_{audio_key}"):
+            with st.spinner("Generating audio..."):
+                _generate_audio_for_message(message, MemoryStore.log(bot_name), current_bot, audio_key)
+            # Only this message changes: show its player without redrawing the page
+            st.rerun(scope="fragment")
 
     except Exception as e:
         st.error(f"Voice button error: {str(e)}")
 
 
-async def _generate_audio_for_message(message, current_bot, audio_key, generating_key):
+def _generate_audio_for_message(message, chat_log, current_bot, audio_key):
     """Generate audio for a specific message"""
+    token = CancellationRegistry.begin(f"tts:{audio_key}")
+    completed = False
     try:
+        # The voice engine (and torch) loads on the first synthesis of the session
+        voice_service = VoiceService.ensure_voice_service()
+        if voice_service is None or not voice_service.wait_for_init(timeout=VOICE_INIT_TIMEOUT):
+            error = voice_service.get_error() if voice_service is not None else None
+            st.error(f"Voice engine unavailable: {error or 'still loading, try again shortly'}")
+            return
+
         emotion = current_bot["voice"]["emotion"]
-        audio_path = st.session_state.voice_service.generate_speech(
-            message,
+        audio_path = voice_service.generate_speech(
+            message.content,
             emotion,
-            dialogue_only=True
+            dialogue_only=True,
+            cancel_token=token
         )
+        completed = True
 
         if audio_path:
-            st.session_state.audio_cache[audio_key] = audio_path
-            st.session_state[generating_key] = False
-            st.session_state.audio_generated = True
+            message.meta["audio_path"] = audio_path
+            chat_log.update(message)
         else:
             st.error("Failed to generate audio")
-            st.session_state[generating_key] = False
+
+    except GenerationCancelled:
+        pass
 
     except Exception as e:
         st.error(f"Voice generation failed: {str(e)}")
-        st.session_state[generating_key] = False
+
+    finally:
+        CancellationRegistry.finish(token, completed)
 
 
 def display_message_edit_interface():
@@ -273,12 +310,12 @@ async def handle_pending_edit(bot_controller):
 
     if edit_data.get('action') == 'save' and 'new_content' in edit_data:
         try:
-            print(f"DEBUG: Starting edit for message {edit_data['message_index']} in {edit_data['bot_name']}")
+            print(f"DEBUG: Starting edit for message {edit_data['message_id']} in {edit_data['bot_name']}")
 
-            # Apply the edit
-            await bot_controller.edit_user_message(
+            # Apply the edit (the edited message gets a new id)
+            edited_id = await bot_controller.edit_user_message(
                 edit_data['bot_name'],
-                edit_data['message_index'],
+                edit_data['message_id'],
                 edit_data['new_content']
             )
 
@@ -287,7 +324,7 @@ async def handle_pending_edit(bot_controller):
             # Regenerate the response
             await bot_controller.regenerate_after_edit(
                 edit_data['bot_name'],
-                edit_data['message_index']
+                edited_id
             )
 
             st.toast("Message updated and response regenerated!", icon="✅")
@@ -2,6 +2,7 @@ import streamlit as st
 from config import PAGES
 from components.avatar_utils import get_avatar_display
 from config import get_default_bots
+from services.memory_store import MemoryStore
 
 
 def get_sidebar_css():
@@ -162,6 +163,10 @@ async def create_sidebar():
             st.session_state.page = "group_chat"
             st.rerun()
 
+        if st.button(PAGES["diagnostics"], use_container_width=True, key="nav_diagnostics"):
+            st.session_state.page = "diagnostics"
+            st.rerun()
+
         st.divider()
         await _display_chat_list()
 
@@ -170,14 +175,13 @@ async def _display_chat_list():
     """Private method to display chat history list"""
     st.subheader("💬 Your Chats")
 
-    if 'chat_histories' not in st.session_state:
-        st.session_state.chat_histories = {}
-
-    if not st.session_state.chat_histories:
+    # Headers only: chats other than the open one are not loaded
+    chat_names = MemoryStore.chat_names()
+    if not chat_names:
         st.markdown('<div class="empty-chats">No chats yet<br>Start a conversation!</div>', unsafe_allow_html=True)
         return
 
-    for bot_name in list(st.session_state.chat_histories.keys()):
+    for bot_name in chat_names:
         # Find the bot in either default bots (from config) or user bots
         all_bots = get_default_bots() + st.session_state.user_bots
 
@@ -230,7 +234,7 @@ async def _display_chat_list():
                 if st.session_state.get('selected_bot') == bot_name:
                     st.session_state.selected_bot = None
                     st.session_state.page = "home"
-                del st.session_state.chat_histories[bot_name]
+                MemoryStore.delete_chat(bot_name)
                 st.rerun()
 
         # Add some spacing between chat entries
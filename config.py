@@ -1,3 +1,5 @@
+import os
+
 from models.bot import Bot
 from typing import List, Dict, Any
 
@@ -10,7 +12,8 @@ PAGES = {
     "image_studio": "🎨 Image Studio",
     "bot_setup": "🧙 Character Setup",
     "generate_concept": "🪄 Generate Concept",
-    "group_chat": "👥 Group Chat"
+    "group_chat": "👥 Group Chat",
+    "diagnostics": "🩺 Diagnostics"
 }
 
 PROFILE_SCHEMA = {
@@ -25,9 +28,116 @@ PROFILE_SCHEMA = {
 DEFAULT_LLM_CONFIG = {
     "model": "llama3:latest",
     "temperature": 0.7,
-    "num_predict": 2048
+    "num_predict": 2048,
+    "num_ctx": 8192
+}
+
+# Native Ollama client: one pooled keep-alive HTTP session per process.
+# Timeouts are (connect, read) in seconds; the read timeout applies between streamed chunks.
+OLLAMA_CONFIG = {
+    "base_url": "http://localhost:11434",
+    "connect_timeout": 3.05,
+    "read_timeout": 120,
+    "pool_maxsize": 8
+}
+
+# Process-wide LLM scheduler. max_concurrency should match the Ollama server's OLLAMA_NUM_PARALLEL;
+# extra requests wait in priority order (chat > greeting > enhance > batch).
+LLM_SCHEDULER_CONFIG = {
+    "max_concurrency": int(os.environ.get("OLLAMA_NUM_PARALLEL", "1")),
+    "wait_samples": 200  # Wait-time samples kept per priority class
+}
+
+# Pregenerated greetings for bots without a fixed personality["greeting"]
+GREETING_POOL_CONFIG = {
+    "pool_size": 3,
+    "refill_below": 2,  # Refill in the background once fewer greetings than this remain
+    "path": "cache/greetings.json"
+}
+
+# 🔄 Regenerate asks for several replies at once and keeps them as swipeable alternatives.
+# Candidates beyond the scheduler's max_concurrency would only queue, so at most that many are requested.
+REGENERATE_CONFIG = {
+    "candidates": 3,
+    "max_alternatives": 10  # Alternatives kept per message, oldest dropped first
+}
+
+# "Enhance all" on the create/edit bot forms runs every field's enhancement at once.
+# The timeout counts queue time too, so keep it above (fields / OLLAMA_NUM_PARALLEL) x one enhancement.
+ENHANCE_CONFIG = {
+    "field_timeout": 120
+}
+
+# Render chat replies token by token instead of waiting for the full response
+STREAMING_ENABLED = True
+
+# Conversation memory settings
+# mode "window" keeps the last window_size messages; mode "tokens" fits the history into the model's
+# num_ctx after reserving room for the dialog template, the new message and the reply.
+MEMORY_CONFIG = {
+    "mode": "tokens",
+    "window_size": 20,
+    "max_messages": 200,  # Storage cap for token mode
+    "reserve_tokens": 128,  # Safety margin for approximation error
+    "token_budgets": {},  # Optional per-model history budget overrides, e.g. {"phi3:latest": 1500}
+    "summarize": True,  # Fold evicted messages into a background "story so far" summary
+    "summary_max_words": 200
 }
 
+# Shared cache for one-shot generations (greetings, concepts, text enhancement).
+# Set sqlite_path to None to keep the cache in memory only.
+RESPONSE_CACHE_CONFIG = {
+    "max_entries": 256,
+    "ttl_seconds": 24 * 60 * 60,
+    "sqlite_path": "cache/llm_responses.db"
+}
+
+# Synthesized speech reused for identical requests (services/tts_cache.py): the index is shared by
+# every session and survives restarts. Set sqlite_path to None to synthesize every request.
+TTS_CACHE_CONFIG = {
+    "sqlite_path": "cache/tts_index.db",
+    "max_bytes": 512 * 1024 * 1024  # Least recently played files are deleted beyond this
+}
+
+# Chats persisted in SQLite (WAL mode), written through on every change; sqlite_path None keeps chats
+# in session memory only. window is how many recent messages a chat loads when opened (and per "load earlier")
+CONVERSATION_STORE_CONFIG = {
+    "sqlite_path": "cache/conversations.db",
+    "window": 50
+}
+
+# Chat page rendering: messages shown per rerun, and how many more each "load earlier" click shows
+CHAT_RENDER_CONFIG = {
+    "window": 30,
+    "step": 30
+}
+
+# Process-wide metrics (services/metrics.py). export_port serves /metrics (Prometheus text) and
+# /metrics.json on export_host; the METRICS_PORT env var overrides it and None or 0 disables export.
+METRICS_CONFIG = {
+    "export_host": "127.0.0.1",
+    "export_port": 9464,
+    "prefix": "fluffy_",  # Prometheus metric name prefix
+    "recent_samples": 200,  # Samples kept per histogram series for p50/p95 on the Diagnostics page
+    "session_size_every": 20,  # Measure session-state size every N full reruns of a session
+    "session_ttl": 300  # Seconds without a rerun before a session stops counting as active
+}
+
+# Opt-in rerun profiler (services/profiler.py): set the PROFILE_RERUNS env var or open the app with
+# ?profile=1. Each profiled full run samples the script thread's stack and writes one profile file.
+PROFILER_CONFIG = {
+    "env_var": "PROFILE_RERUNS",
+    "query_param": "profile",
+    "interval": 0.002,  # Seconds between stack samples
+    "output_dir": "cache/profiles",
+    "format": "speedscope",  # "speedscope" (open at speedscope.app) or "collapsed" (flamegraph.pl, inferno)
+    "keep_files": 200,  # Oldest profile files beyond this are deleted
+    "top_n": 10  # Slowest reruns remembered per page
+}
+
+# Number of samples kept per timing metric in st.session_state.performance_metrics
+METRICS_HISTORY_SIZE = 50
+
 # For Future DEV: Available models for selection in UI
 AVAILABLE_MODELS = [
     "llama3:latest",
@@ -3,6 +3,8 @@ import os
 import base64
 from datetime import datetime
 from config import DEFAULT_RULES, BOT_PRESETS
+from services.greeting_store import GreetingStore
+from controllers.voice_controller import VoiceService
 
 
 class BotManager:
@@ -46,6 +48,14 @@ class BotManager:
     @staticmethod
     def _delete_bot(bot_name):
         """Delete a bot from the user_bots list"""
+        from services.chain_cache import DialogChainCache
+        from services.memory_store import MemoryStore
+
+        for bot in st.session_state.user_bots:
+            if bot.name == bot_name:
+                DialogChainCache.invalidate(bot.bot_id)
+                MemoryStore.delete(bot.bot_id)
+
         st.session_state.user_bots = [
             bot for bot in st.session_state.user_bots if bot.name != bot_name
         ]
@@ -92,12 +102,11 @@ class BotManager:
         """Display voice/emotion selection options"""
         voice_data = {"enabled": False}  # Default return value
 
-        # Check if voice service is available
-        if not hasattr(st.session_state, 'voice_service') or st.session_state.voice_service is None:
+        # Listing emotions doesn't load the voice engine; it starts with the first synthesis
+        emotions = VoiceService.configured_emotions()
+        if not emotions:
             return voice_data
 
-        voice_service = st.session_state.voice_service
-
         # Simple toggle and dropdown
         enable_voice = st.toggle(
             "Enable Voice for this bot",
@@ -107,27 +116,18 @@ class BotManager:
         )
 
         if enable_voice:
-            try:
-                emotions = voice_service.get_available_emotions()
-                if not emotions:
-                    st.warning("No voice emotions available")
-                    return voice_data
-
-                emotion = st.selectbox(
-                    "Voice Emotion",
-                    options=emotions,
-                    index=emotions.index('neutral') if 'neutral' in emotions else 0,
-                    help="Select the emotional tone for your bot's voice",
-                    key="voice_emotion"
-                )
-
-                voice_data = {
-                    "enabled": True,
-                    "emotion": emotion
-                }
-            except Exception as e:
-                st.error(f"Error loading voice options: {str(e)}")
-                return {"enabled": False}
+            emotion = st.selectbox(
+                "Voice Emotion",
+                options=emotions,
+                index=emotions.index('neutral') if 'neutral' in emotions else 0,
+                help="Select the emotional tone for your bot's voice",
+                key="voice_emotion"
+            )
+
+            voice_data = {
+                "enabled": True,
+                "emotion": emotion
+            }
 
         return voice_data
 
@@ -250,6 +250,7 @@ class BotManager:
     def _finalize_bot_creation(bot):
         """Complete the bot creation process"""
         st.session_state.user_bots.append(bot)
+        GreetingStore.schedule(bot)
         st.success(f"Character '{bot.name}' created successfully!")
 
         # Clean up preset data if it exists
@@ -1,34 +1,42 @@
 import streamlit as st
-from functools import lru_cache
-
-from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain_core.messages import HumanMessage
+import time
+from typing import Optional
 
 from langchain.prompts import PromptTemplate
 from langchain.schema.runnable import RunnableSequence
 from langchain_core.exceptions import OutputParserException, LangChainException
-from langchain_community.llms import Ollama
-from config import get_default_bots, DEFAULT_LLM_CONFIG, DEFAULT_RULES
+from config import get_default_bots, DEFAULT_RULES, METRICS_HISTORY_SIZE, MEMORY_CONFIG
 from services.bot_attribute_helper import BotAttributeHelper
+from services.chain_cache import DialogChainCache
+from services.response_cache import get_response_cache
+from services.token_budget import TokenCounter
+from services.memory_summarizer import MemorySummarizer
+from services.memory_store import MemoryStore
+from services.model_router import ModelRouter
+from services.ollama_client import OllamaClient, get_ollama_client
+from services.conversation_context import ConversationContext
+from services.llm_scheduler import Priority, get_llm_scheduler
+from services.greeting_store import GreetingStore
+from services.cancellation import CancellationRegistry, GenerationCancelled
+from services.metrics import get_metrics
 import asyncio
 
+# Session timing metrics that are also recorded process-wide (services/metrics.py)
+_PROCESS_METRICS = {
+    "queue_wait": "llm_queue_wait_seconds",
+    "time_to_first_token": "llm_time_to_first_token_seconds",
+}
+
 
 class LLMChatController:
     def __init__(self):
-        self.llm = Ollama(**DEFAULT_LLM_CONFIG)
-        self.dialog_chain_factory = DialogChainFactory(self.llm)
         self._init_session_state()
         self._init_dialog_chain()
-        self._init_memory_buffer()
-
-    @lru_cache(maxsize=100)
-    def _init_memory_buffer(self):
-        """Initialize enhanced conversation memory using ChatMessageHistory"""
-        if "memory" not in st.session_state:
-            st.session_state.memory = {
-                'chat_history': ChatMessageHistory(),
-                'window_size': 50  # Remember last 50 exchanges
-            }
+
+    @property
+    def memory(self) -> dict:
+        """Conversation memory of the selected bot (each bot has its own)"""
+        return MemoryStore.get(self.memory_key)
 
     @staticmethod
     def _init_session_state():
@@ -39,61 +47,173 @@ class LLMChatController:
         if "performance_metrics" not in st.session_state:  # New
             st.session_state.performance_metrics = {
                 "cache_hits": 0,
-                "llm_errors": 0
+                "cache_misses": 0,
+                "llm_errors": 0,
+                "time_to_first_token": []
             }
 
+    @staticmethod
+    def _record_metric(name: str, value: float):
+        """Append a timing sample to the session performance metrics (and the process-wide ones)"""
+        metrics = st.session_state.performance_metrics
+        samples = metrics.setdefault(name, [])
+        samples.append(value)
+        if len(samples) > METRICS_HISTORY_SIZE:
+            del samples[:-METRICS_HISTORY_SIZE]
+        if name in _PROCESS_METRICS:
+            get_metrics().observe(_PROCESS_METRICS[name], value)
+
     def _init_dialog_chain(self):
-        """Initialize dialog chain using the factory pattern"""
+        """Initialize the LLM and dialog chain for the selected bot's model config"""
         bot_name = st.session_state.get('selected_bot', '')
         all_bots = get_default_bots() + st.session_state.user_bots
+        current_bot = BotAttributeHelper.find_bot_by_name(bot_name, all_bots)
 
-        self.dialog_chain = self.dialog_chain_factory.create_chain(bot_name, all_bots)
+        self.model_config = ModelRouter.resolve_config(current_bot)
+        self.llm = ModelRouter.get_llm(self.model_config)
+        self.dialog_chain_factory = DialogChainFactory(self.llm, self.model_config)
 
-    @staticmethod
-    def _process_memory(user_input: str, response: str):
-        """Update conversation memory using LangGraph-style persistence"""
-        try:
-            # Add messages to history
-            st.session_state.memory['chat_history'].add_user_message(user_input)
-            st.session_state.memory['chat_history'].add_ai_message(response)
+        self.memory_key = MemoryStore.key(current_bot, bot_name)
+        self.context_fingerprint = ConversationContext.fingerprint(current_bot, self.model_config)
+        self.dialog_chain = self.dialog_chain_factory.create_chain_for_bot(bot_name, current_bot)
+
+    def _record_exchange(self, user_input: str, response: str):
+        """
+        Append the reply (and the user message, unless the page already did) to the chat log and
+        memory, folding messages evicted from memory into the running summary
 
-            # Trim to maintain window size
-            messages = st.session_state.memory['chat_history'].messages
-            if len(messages) > st.session_state.memory['window_size']:
-                st.session_state.memory['chat_history'].messages = messages[-st.session_state.memory['window_size']:]
+        Returns:
+            The reply Message, or None if recording failed
+        """
+        try:
+            chat_log = MemoryStore.log(st.session_state.get('selected_bot'))
+            user_message = chat_log.last()
+            if user_message is None or user_message.role != "user" or user_message.content != user_input:
+                user_message = chat_log.append("user", user_input)
+            reply = chat_log.append("assistant", response, parent_id=user_message.id)
+
+            memory = self.memory
+            window = memory['chat_history']
+            window.add(user_message)
+            window.add(reply)
+            self._evict_memory(memory)
+            MemoryStore.save(st.session_state.get('selected_bot'), memory)
+            return reply
 
         except Exception as e:
             st.toast(f"Memory update failed: {str(e)}", icon="⚠️")
+            return None
+
+    def record_greeting(self, greeting: str):
+        """Start the chat log and memory with the bot's greeting"""
+        reply = MemoryStore.log(st.session_state.get('selected_bot')).append("assistant", greeting, greeting=True)
+        self.memory['chat_history'].add(reply)
+        return reply
+
+    def _evict_memory(self, memory: dict):
+        """Trim the memory window, folding evicted messages into the running summary"""
+        window = memory['chat_history']
+        size = len(window)
+        summarize = MEMORY_CONFIG.get('summarize', False)
+        if memory.get('mode', 'window') == 'window':
+            keep = memory['window_size']
+        else:
+            # Token mode caps storage; with summarization, messages that no longer fit the prompt are evicted
+            unfit = memory.pop('unfit_count', 0) if summarize else 0
+            keep = min(MEMORY_CONFIG['max_messages'], size - unfit)
+
+        if size > keep:
+            evicted = window.evict(size - keep)
+            if summarize:
+                MemorySummarizer.schedule(
+                    memory,
+                    self._format_messages(evicted),
+                    self.llm,
+                    st.session_state.get('selected_bot') or "AI"
+                )
+
+    @staticmethod
+    def _format_messages(messages):
+        """Format memory messages as 'User: ...' / 'AI: ...' lines"""
+        return [f"{'User' if msg.role == 'user' else 'AI'}: {msg.content}" for msg in messages]
+
+    def get_chat_history(self, token_budget: int = None):
+        """Get formatted chat history, keeping only the most recent messages that fit in token_budget"""
+        return self._build_history(token_budget)[0]
 
-    def get_chat_history(self):
-        """Get formatted chat history"""
+    def _build_history(self, token_budget: int = None):
+        """Format chat history and return (history_text, token_count)"""
         try:
-            if 'memory' not in st.session_state:
-                self._init_memory_buffer()
+            memory = self.memory
+            entries = memory['chat_history'].entries
 
-            messages = st.session_state.memory['chat_history'].messages
-            return "\n".join(
-                f"{'User' if isinstance(msg, HumanMessage) else 'AI'}: {msg.content}"
-                for msg in messages
-            )
+            if token_budget is None:
+                history = "\n".join(self._format_messages(entries))
+                return history, TokenCounter.count(history)
+
+            # Each message's cached token count, +3 for the "User:" / "AI:" prefix and the joining newline
+            kept, used = TokenCounter.fit_recent([message.tokens + 3 for message in entries], token_budget)
+
+            memory['unfit_count'] = len(entries) - kept
+            if kept < len(entries):
+                print(f"DEBUG: Token budget {token_budget} kept {kept}/{len(entries)} memory messages")
+            return "\n".join(self._format_messages(entries[len(entries) - kept:])), used
         except Exception as e:
             print(f"ERROR in get_chat_history: {str(e)}")
-            return ""  # Return empty history if there's an error
+            return "", 0  # Return empty history if there's an error
+
+    def _dialog_template(self) -> str:
+        """Raw dialog template text (without history) for prompt size accounting"""
+        prompt = getattr(self.dialog_chain, 'first', None)
+        return getattr(prompt, 'template', '') or ''
+
+    def _response_cache_key(self, prompt: str, context: str) -> str:
+        """Cache key for a one-shot generation with this controller's model settings"""
+        return get_response_cache().make_key(
+            prompt, context, self.model_config.get("model"), self.model_config.get("temperature")
+        )
+
+    @staticmethod
+    def _count_cache_lookup(hit: bool):
+        """Feed response cache hits/misses into the session performance metrics"""
+        metrics = st.session_state.performance_metrics
+        if hit:
+            metrics["cache_hits"] += 1
+        else:
+            metrics["cache_misses"] = metrics.get("cache_misses", 0) + 1
 
-    @lru_cache(maxsize=100)  # Cache up to 100 responses
-    def _cached_llm_invoke(self, prompt: str, bot_context: str) -> str:
+    def _cached_llm_invoke(self, prompt: str, bot_context: str, priority: Priority = Priority.BATCH) -> str:
         """Safe wrapper for LLM calls with caching"""
+        token = CancellationRegistry.begin(f"{priority.name.lower()}:{bot_context}")
+        completed = False
         try:
             combined_input = f"{bot_context}\n\n{prompt}"
 
             if not prompt.strip():
                 raise ValueError("Empty prompt provided")
 
-            response = self.llm.invoke(combined_input)
-            return response.strip()
+            cache = get_response_cache()
+            cache_key = self._response_cache_key(prompt, bot_context)
+            cached = cache.get(cache_key)
+            self._count_cache_lookup(cached is not None)
+            if cached is not None:
+                completed = True
+                return cached
+
+            with get_llm_scheduler().slot_sync(priority, cancel_token=token) as waited:
+                self._record_metric("queue_wait", waited)
+                response = self.llm.invoke(combined_input, cancel_token=token).strip()
+            cache.set(cache_key, response)
+            completed = True
+            return response
+
+        except GenerationCancelled as e:
+            print(f"DEBUG: {priority.name.lower()} generation cancelled ({e})")
+            return ""
 
         except (LangChainException, OutputParserException) as e:
             st.error(f"AI service error: {str(e)}")
+            st.session_state.performance_metrics["llm_errors"] += 1
             return "🔧 My circuits are acting up. Try again?"
 
         except ValueError as e:
@@ -101,49 +221,176 @@ class LLMChatController:
 
         except Exception as e:
             st.error(f"Unexpected error: {str(e)}")
+            st.session_state.performance_metrics["llm_errors"] += 1
             return "🌌 Whoops! Something unexpected happened."
 
+        finally:
+            CancellationRegistry.finish(token, completed)
+
+    def _prepare_chain_inputs(self, user_input: str):
+        """Build the dialog chain inputs for the selected bot, or None if no bot is selected"""
+        # Debug: Check if chat_histories exists and has the selected bot
+        if 'chat_histories' not in st.session_state:
+            st.session_state.chat_histories = {}
+
+        # Get current chat history
+        selected_bot = st.session_state.get('selected_bot')
+        if not selected_bot:
+            return None
+
+        chat_history = st.session_state.chat_histories.get(selected_bot, [])
+
+        # Debug: Print current state for troubleshooting
+        print(f"DEBUG: Selected bot: {selected_bot}")
+        print(f"DEBUG: Chat history length: {len(chat_history)}")
+        print(f"DEBUG: Memory messages: {len(self.memory['chat_history'])}")
+
+        # Fit the history into the model context after the template, the summary and the new message
+        story_so_far = MemorySummarizer.story_so_far(self.memory) or "Nothing yet - the story has just begun."
+        system_tokens = TokenCounter.count(self._dialog_template()) + TokenCounter.count(story_so_far)
+        input_tokens = TokenCounter.count(user_input)
+        token_budget = None
+        if self.memory.get('mode', 'window') == 'tokens':
+            token_budget = TokenCounter.history_budget(self.model_config, system_tokens, input_tokens)
+
+        history, history_tokens = self._build_history(token_budget)
+
+        prompt_tokens = system_tokens + history_tokens + input_tokens
+        self._record_metric("prompt_tokens", prompt_tokens)
+        print(f"DEBUG: Prompt size ~{prompt_tokens} tokens "
+              f"(template {system_tokens}, history {history_tokens}, input {input_tokens})")
+
+        return {
+            "user_input": user_input,
+            "chat_history": history,
+            "story_so_far": story_so_far
+        }
+
+    def _prepare_turn(self, user_input: str):
+        """
+        Build the prompt for the next turn, reusing Ollama's evaluated context when possible
+
+        Returns:
+            (prompt, context) where context is None for a full prompt, or None if no bot is selected
+        """
+        selected_bot = st.session_state.get('selected_bot')
+        if not selected_bot:
+            return None
+
+        # Only the new turn is sent on top of a stored context
+        turn_prompt = f"User: {user_input}\n\n{selected_bot}:"
+        context = ConversationContext.get(self.memory, self.context_fingerprint,
+                                          TokenCounter.count(turn_prompt), self.model_config)
+        if context is not None:
+            print(f"DEBUG: Reusing Ollama context ({len(context)} tokens)")
+            return turn_prompt, context
+
+        chain_inputs = self._prepare_chain_inputs(user_input)
+        if chain_inputs is None:
+            return None
+        return self.dialog_chain.first.format(**chain_inputs), None
+
+    def _generate_kwargs(self, context) -> dict:
+        """Extra /api/generate fields for a turn"""
+        extra = {"context": context} if context else {}
+        if self.model_config.get("keep_alive"):
+            extra["keep_alive"] = self.model_config["keep_alive"]
+        return extra
+
+    def _finish_turn(self, final_chunk: dict):
+        """Store the returned context and report how many prompt tokens the model evaluated"""
+        ConversationContext.store(self.memory, self.context_fingerprint, final_chunk.get("context"))
+
+        prompt_eval_count = final_chunk.get("prompt_eval_count")
+        if prompt_eval_count is not None:
+            self._record_metric("prompt_eval_tokens", prompt_eval_count)
+            print(f"DEBUG: Prompt eval tokens this turn: {prompt_eval_count}")
+
+    async def _generate_reply(self, prompt: str, context, token, options: dict = None) -> dict:
+        """One non-streaming /api/generate call for a prepared turn, holding a chat slot"""
+        async with get_llm_scheduler().slot(Priority.CHAT, cancel_token=token) as waited:
+            self._record_metric("queue_wait", waited)
+            return await get_ollama_client().agenerate(
+                self.model_config["model"], prompt, options or OllamaClient.build_options(self.model_config),
+                cancel_token=token, **self._generate_kwargs(context)
+            )
+
     async def generate_single_response(self, user_input: str) -> str:
         """Generate response with memory support"""
+        # A newer reply for this chat (new message, regenerate, edit) supersedes this one
+        token = CancellationRegistry.begin(f"chat:{st.session_state.get('selected_bot')}")
+        completed = False
         try:
-            # Debug: Check if chat_histories exists and has the selected bot
-            if 'chat_histories' not in st.session_state:
-                st.session_state.chat_histories = {}
-
-            # Get current chat history
-            selected_bot = st.session_state.get('selected_bot')
-            if not selected_bot:
+            turn = self._prepare_turn(user_input)
+            if turn is None:
+                completed = True
                 return "❌ No bot selected. Please select a bot first."
 
-            chat_history = st.session_state.chat_histories.get(selected_bot, [])
-
-            # Debug: Print current state for troubleshooting
-            print(f"DEBUG: Selected bot: {selected_bot}")
-            print(f"DEBUG: Chat history length: {len(chat_history)}")
-            print(f"DEBUG: Memory exists: {'memory' in st.session_state}")
-            if 'memory' in st.session_state:
-                print(f"DEBUG: Memory messages: {len(st.session_state.memory['chat_history'].messages)}")
-
-            # If this is the first exchange after greeting, ensure greeting is properly stored
-            if len(chat_history) == 2:  # [Greeting, User message]
-                greeting = chat_history[0][1]
-                self._process_memory(
-                    "(Conversation started)",
-                    f"{selected_bot}: {greeting}"
-                )
+            prompt, context = turn
+            result = await self._generate_reply(prompt, context, token)
+            response = result.get("response", "")
+            self._finish_turn(result)
+            self._record_exchange(user_input, response)
+            completed = True
+            return response
 
-            # Get formatted chat history
-            history = self.get_chat_history()
+        except GenerationCancelled as e:
+            # Superseded or abandoned: the caller's rerun discards the result
+            print(f"DEBUG: Reply generation cancelled ({e})")
+            return ""
 
-            # Prepare inputs
-            chain_inputs = {
-                "user_input": user_input,
-                "chat_history": history
-            }
+        except Exception as e:
+            import traceback
+            error_msg = f"Response generation failed: {str(e)}"
+            print(f"ERROR: {error_msg}")
+            print(traceback.format_exc())
+            st.error(error_msg)
+            st.session_state.performance_metrics["llm_errors"] += 1
+            return "❌ Sorry, I encountered an error. Please try again."
 
-            response = self.dialog_chain.invoke(chain_inputs)
-            self._process_memory(user_input, response)
-            return response
+        finally:
+            CancellationRegistry.finish(token, completed)
+
+    async def generate_candidates(self, user_input: str, count: int) -> list:
+        """
+        Generate several alternative replies to one message concurrently (used by regenerate).
+        Ollama serves them from its parallel slots; the first candidate goes into memory.
+
+        Args:
+            user_input: The user message to answer
+            count: Number of candidates
+
+        Returns:
+            List of reply texts (empty if cancelled)
+        """
+        token = CancellationRegistry.begin(f"chat:{st.session_state.get('selected_bot')}")
+        completed = False
+        try:
+            turn = self._prepare_turn(user_input)
+            if turn is None:
+                completed = True
+                return ["❌ No bot selected. Please select a bot first."]
+
+            prompt, context = turn
+            options = OllamaClient.build_options(self.model_config)
+            started = time.perf_counter()
+            results = await asyncio.gather(*(
+                # A fixed seed would make every candidate identical
+                self._generate_reply(prompt, context, token,
+                                     {**options, "seed": options["seed"] + i} if "seed" in options else options)
+                for i in range(count)
+            ))
+            print(f"DEBUG: {count} candidates in {time.perf_counter() - started:.2f}s")
+
+            responses = [result.get("response", "") for result in results]
+            self._finish_turn(results[0])
+            self._record_exchange(user_input, responses[0])
+            completed = True
+            return responses
+
+        except GenerationCancelled as e:
+            print(f"DEBUG: Candidate generation cancelled ({e})")
+            return []
 
         except Exception as e:
             import traceback
@@ -151,7 +398,70 @@ class LLMChatController:
             print(f"ERROR: {error_msg}")
             print(traceback.format_exc())
             st.error(error_msg)
-            return "❌ Sorry, I encountered an error. Please try again."
+            st.session_state.performance_metrics["llm_errors"] += 1
+            return ["❌ Sorry, I encountered an error. Please try again."]
+
+        finally:
+            # Cancels sibling candidates still running if one of them failed
+            CancellationRegistry.finish(token, completed)
+
+    async def stream_single_response(self, user_input: str):
+        """Stream response chunks as the model produces them, updating memory once the stream ends"""
+        # If the rerun that consumes this stream is interrupted, the generator is closed and
+        # finish(completed=False) aborts the HTTP stream so Ollama stops generating
+        token = CancellationRegistry.begin(f"chat:{st.session_state.get('selected_bot')}")
+        completed = False
+        try:
+            turn = self._prepare_turn(user_input)
+            if turn is None:
+                completed = True
+                yield "❌ No bot selected. Please select a bot first."
+                return
+
+            prompt, context = turn
+            started = time.perf_counter()
+            first_token_at = None
+            chunks = []
+
+            # Hold the slot for the whole stream; the queue wait counts towards time to first token
+            async with get_llm_scheduler().slot(Priority.CHAT, cancel_token=token) as waited:
+                self._record_metric("queue_wait", waited)
+                stream = get_ollama_client().astream_generate(
+                    self.model_config["model"], prompt, OllamaClient.build_options(self.model_config),
+                    cancel_token=token, **self._generate_kwargs(context)
+                )
+                async for part in stream:
+                    if part.get("done"):
+                        self._finish_turn(part)
+                    chunk = part.get("response", "")
+                    if not chunk:
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                        self._record_metric("time_to_first_token", first_token_at - started)
+                        print(f"DEBUG: Time to first token: {first_token_at - started:.2f}s")
+                    chunks.append(chunk)
+                    yield chunk
+
+            response = "".join(chunks)
+            print(f"DEBUG: Stream finished in {time.perf_counter() - started:.2f}s ({len(response)} chars)")
+            self._record_exchange(user_input, response)
+            completed = True
+
+        except GenerationCancelled as e:
+            print(f"DEBUG: Reply stream cancelled ({e})")
+
+        except Exception as e:
+            import traceback
+            error_msg = f"Response generation failed: {str(e)}"
+            print(f"ERROR: {error_msg}")
+            print(traceback.format_exc())
+            st.error(error_msg)
+            st.session_state.performance_metrics["llm_errors"] += 1
+            yield "❌ Sorry, I encountered an error. Please try again."
+
+        finally:
+            CancellationRegistry.finish(token, completed)
 
     async def generate_group_chat_response(self, bot, prompt: str, shared_history: str) -> str:
         """Specialized response generator for group chats - UPDATED FOR BOT OBJECTS"""
@@ -187,8 +497,16 @@ class LLMChatController:
 
                 {bot.name}:"""
 
-            # Generate response
-            response = self.llm.invoke(prompt_template)
+            # Generate response with this bot's own model config
+            token = CancellationRegistry.begin(f"group:{bot.name}")
+            completed = False
+            try:
+                async with get_llm_scheduler().slot(Priority.CHAT, cancel_token=token) as waited:
+                    self._record_metric("queue_wait", waited)
+                    response = await ModelRouter.llm_for_bot(bot).ainvoke(prompt_template, cancel_token=token)
+                completed = True
+            finally:
+                CancellationRegistry.finish(token, completed)
 
             # Update memories (handled by GroupChatManager)
             return response.strip()
@@ -200,45 +518,14 @@ class LLMChatController:
     async def generate_greeting(self):
         try:
             bot_name = st.session_state.get('selected_bot', 'StoryBot')
-            scenario_context = ""
 
             # Combine default bots and user bots
             all_bots = get_default_bots() + st.session_state.user_bots
-
-            # Helper function to safely get bot attributes
-            def _get_bot_attr(bot, attr, default=None):
-                if hasattr(bot, attr):
-                    return getattr(bot, attr, default)
-                elif isinstance(bot, dict):
-                    return bot.get(attr, default)
-                return default
-
-            current_bot = next((b for b in all_bots if _get_bot_attr(b, 'name') == bot_name), None)
+            current_bot = BotAttributeHelper.find_bot_by_name(bot_name, all_bots)
 
             if current_bot:
-                # Handle different personality structures
-                personality = _get_bot_attr(current_bot, 'personality', {})
-
-                tone = _get_bot_attr(personality, 'tone', 'neutral')
-                quirks = _get_bot_attr(personality, 'quirks', [])
-                if isinstance(quirks, str):
-                    quirks = [q.strip() for q in quirks.split(',') if q.strip()]
-
-                # Get scenario for context
-                scenario = _get_bot_attr(current_bot, 'scenario', '')
-                scenario_context = f"this Is the situation: {scenario}" if scenario else ""
-
-                prompt = f"""
-                    As {bot_name}, create a friendly 4-5 sentence greeting that:
-                    - Uses your emoji {_get_bot_attr(current_bot, 'emoji', '🤖')}
-                    - Mentions your name
-                    - Reflects your personality tone: {tone}
-                    - Includes one of your quirks: {', '.join(quirks) if quirks else 'none'}{scenario_context}
-                    - Thoughts appear in italics format
-                    - Dialogue in double quotes like "this"
-                    Only return the output,response 
-                    """
-                return self._cached_llm_invoke(prompt, _get_bot_attr(current_bot, "desc", "A helpful AI assistant"))
+                prompt, bot_context = GreetingStore.build_prompt(current_bot)
+                return self._cached_llm_invoke(prompt, bot_context, Priority.GREETING)
 
             # Default fallback if bot not found
             return f"Hello! I'm {bot_name}! Let's chat!"
@@ -248,11 +535,51 @@ class LLMChatController:
             # Safe fallback that doesn't depend on bot_name
             return "Hello! Let's chat!"
 
-    async def enhance_text(self, current_text: str, field_name: str, context: dict = None) -> str:
-        """Enhanced version with context support that returns ONLY the enhanced text"""
+    async def enhance_text(self, current_text: str, field_name: str, context: dict = None) -> Optional[str]:
+        """
+        Enhanced version with context support that returns ONLY the enhanced text, or None if the
+        call failed or was superseded (the caller keeps the field as it is)
+        """
         if not current_text.strip() and not context:
             return current_text
 
+        prompt = self._enhance_prompt(current_text, field_name, context)
+        enhanced = await self._async_llm_invoke(prompt, "Text enhancement", view=f"enhance:{field_name}", fallback="")
+        return enhanced or None
+
+    async def enhance_fields(self, fields: dict, timeout: float = None) -> dict:
+        """
+        Enhance several form fields concurrently; wall time is roughly that of the slowest field
+
+        Args:
+            fields: {field_name: current_text}
+            timeout: Seconds each field may take, queue wait included (None waits forever)
+
+        Returns:
+            {field_name: enhanced text, or None if that field failed or timed out}
+        """
+        async def enhance(field_name, text):
+            prompt = self._enhance_prompt(text, field_name)
+            try:
+                enhanced = await asyncio.wait_for(
+                    self._async_llm_invoke(prompt, "Text enhancement", view=f"enhance:{field_name}", fallback=""),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                # wait_for cancelled the call, which aborts its request to Ollama
+                print(f"WARNING: Enhancing {field_name} timed out after {timeout}s")
+                return None
+            return enhanced or None
+
+        names = [name for name, text in fields.items() if text and text.strip()]
+        started = time.perf_counter()
+        results = await asyncio.gather(*(enhance(name, fields[name]) for name in names))
+        print(f"DEBUG: Enhanced {len(names)} fields in {time.perf_counter() - started:.2f}s")
+        return dict(zip(names, results))
+
+    @staticmethod
+    def _enhance_prompt(current_text: str, field_name: str, context: dict = None) -> str:
+        """Prompt asking the model to improve one form field"""
         if field_name == "character greeting" and context:
             prompt = f"""Create an engaging greeting message for {context['name']} that:
             - Matches their personality: {context['personality']}
@@ -283,217 +610,134 @@ class LLMChatController:
 
             Enhanced text:"""
 
-        return await self._async_llm_invoke(prompt, "Text enhancement")
+        return prompt
 
     # Add this new async method for async calls
-    async def _async_llm_invoke(self, prompt: str, context: str) -> str:
-        """Async version of LLM invocation"""
+    async def _async_llm_invoke(self, prompt: str, context: str, priority: Priority = Priority.ENHANCE,
+                                view: str = None, fallback: str = None) -> str:
+        """Async version of LLM invocation; returns fallback (default: context) if the call fails"""
+        # Clicking ✨ again on the same field supersedes the previous request
+        token = CancellationRegistry.begin(view or f"{priority.name.lower()}:{context}")
+        completed = False
         try:
             combined_input = f"{context}\n\n{prompt}"
             if not prompt.strip():
                 raise ValueError("Empty prompt provided")
 
-            # Use async invoke if available
-            response = await self.llm.ainvoke(combined_input)
-            return response.strip()
+            cache = get_response_cache()
+            cache_key = self._response_cache_key(prompt, context)
+            cached = cache.get(cache_key)
+            self._count_cache_lookup(cached is not None)
+            if cached is not None:
+                completed = True
+                return cached
+
+            async with get_llm_scheduler().slot(priority, cancel_token=token) as waited:
+                self._record_metric("queue_wait", waited)
+                response = (await self.llm.ainvoke(combined_input, cancel_token=token)).strip()
+            cache.set(cache_key, response)
+            completed = True
+            return response
+
+        except GenerationCancelled as e:
+            print(f"DEBUG: Enhancement cancelled ({e})")
+            return context if fallback is None else fallback
 
         except Exception as e:
             st.error(f"Enhancement failed: {str(e)}")
-            return context  # Return original text if enhancement fails
+            st.session_state.performance_metrics["llm_errors"] += 1
+            return context if fallback is None else fallback  # Return original text if enhancement fails
+
+        finally:
+            CancellationRegistry.finish(token, completed)
 
     @staticmethod
     def clear_last_exchange():
-        """Remove the last Q&A pair from memory and session state - FIXED VERSION"""
+        """Remove the last Q&A pair from the chat log (and so from memory), keeping the greeting"""
         try:
             selected_bot = st.session_state.get('selected_bot')
+            if not selected_bot:
+                return
 
-            # Clear from session state chat history
-            if selected_bot and 'chat_histories' in st.session_state:
-                chat_history = st.session_state.chat_histories.get(selected_bot, [])
-                if len(chat_history) >= 2:
-                    # Only remove the last exchange (last user + assistant messages)
-                    # But be careful not to remove the greeting
-                    if len(chat_history) > 2:  # More than just greeting + one exchange
-                        st.session_state.chat_histories[selected_bot] = chat_history[:-2]
-                        print(
-                            f"DEBUG: Cleared last exchange from chat history. Remaining: {len(st.session_state.chat_histories[selected_bot])}")
-                    else:
-                        # If only greeting + one exchange, just remove the exchange but keep greeting
-                        st.session_state.chat_histories[selected_bot] = [chat_history[0]]
-                        print(f"DEBUG: Cleared exchange but kept greeting")
-
-            # Clear from memory
-            if 'memory' in st.session_state and st.session_state.memory['chat_history'].messages:
-                messages = st.session_state.memory['chat_history'].messages
-                if len(messages) >= 2:
-                    st.session_state.memory['chat_history'].messages = messages[:-2]
-                    print(
-                        f"DEBUG: Cleared 2 messages from memory. Remaining: {len(st.session_state.memory['chat_history'].messages)}")
+            chat_log = MemoryStore.log(selected_bot)
+            last_user = chat_log.last("user")
+            if last_user is not None:
+                removed = chat_log.truncate_after(last_user.id, inclusive=True)
+                print(f"DEBUG: Cleared last exchange ({len(removed)} messages). Remaining: {len(chat_log)}")
+            ConversationContext.invalidate(MemoryStore.for_bot_name(selected_bot))
 
         except Exception as e:
             print(f"Error clearing last exchange: {str(e)}")
 
-    # ========== NEW MESSAGE EDIT/DELETE METHODS ==========
+    # ========== MESSAGE EDIT/DELETE METHODS ==========
 
-    async def edit_user_message(self, bot_name: str, message_index: int, new_content: str):
-        """Edit a user message and clear subsequent messages - ASYNC VERSION"""
+    @staticmethod
+    def _user_message(bot_name: str, message_id: int):
+        """Look up a user message of a chat by id"""
+        if bot_name not in st.session_state.get('chat_histories', {}):
+            raise ValueError(f"Bot {bot_name} not found in chat histories")
+
+        message = MemoryStore.log(bot_name).get(message_id)
+        if message is None:
+            raise ValueError(f"Invalid message id: {message_id}")
+        if message.role != "user":
+            raise ValueError("Can only edit user messages")
+        return message
+
+    async def edit_user_message(self, bot_name: str, message_id: int, new_content: str) -> int:
+        """
+        Replace a user message and drop every message after it
+
+        Returns:
+            Id of the edited message (a new id: the old message and its memory entry are dropped)
+        """
         try:
-            if bot_name not in st.session_state.chat_histories:
-                raise ValueError(f"Bot {bot_name} not found in chat histories")
-
-            chat_history = st.session_state.chat_histories[bot_name]
-
-            # Validate index
-            if message_index >= len(chat_history) or message_index < 0:
-                raise ValueError(f"Invalid message index: {message_index}")
+            message = self._user_message(bot_name, message_id)
+            chat_log = MemoryStore.log(bot_name)
 
-            # Ensure it's a user message
-            role, old_content = chat_history[message_index]
-            if role != "user":
-                raise ValueError("Can only edit user messages")
+            # Removing the old message also removes it, and everything after it, from memory
+            chat_log.truncate_after(message.id, inclusive=True)
+            edited = chat_log.append("user", new_content)
+            ConversationContext.invalidate(MemoryStore.for_bot_name(bot_name))
 
-            # Update the message content
-            chat_history[message_index] = (role, new_content)
-
-            # Clear all messages after this one (non-blocking operation)
-            messages_to_remove = len(chat_history) - (message_index + 1)
-            if messages_to_remove > 0:
-                chat_history = chat_history[:message_index + 1]
-                st.session_state.chat_histories[bot_name] = chat_history
-
-            # Clear memory for removed messages (non-blocking)
-            await self._clear_memory_after_index(message_index // 2)  # Each exchange = 2 messages (user + assistant)
-
-            # Clear audio cache for removed messages (non-blocking)
-            await self._clear_audio_cache_after_index(bot_name, message_index)
-
-            print(f"DEBUG: Edited message at index {message_index}. Remaining messages: {len(chat_history)}")
+            print(f"DEBUG: Edited message {message_id} -> {edited.id}. Remaining messages: {len(chat_log)}")
+            return edited.id
 
         except Exception as e:
             print(f"Error editing message: {str(e)}")
             raise
 
-    async def delete_message(self, bot_name: str, message_index: int):
-        """Delete a message and all subsequent messages - ASYNC VERSION"""
+    async def delete_message(self, bot_name: str, message_id: int):
+        """Delete a message and all subsequent messages"""
         try:
-            if bot_name not in st.session_state.chat_histories:
+            if bot_name not in st.session_state.get('chat_histories', {}):
                 raise ValueError(f"Bot {bot_name} not found in chat histories")
 
-            chat_history = st.session_state.chat_histories[bot_name]
-
-            # Validate index
-            if message_index >= len(chat_history) or message_index < 0:
-                raise ValueError(f"Invalid message index: {message_index}")
-
-            # Calculate how many exchanges to remove from memory
-            # Each exchange = 2 messages (user + assistant)
-            exchanges_to_remove = (len(chat_history) - message_index + 1) // 2
-
-            # Keep messages up to the deletion point (non-blocking)
-            chat_history = chat_history[:message_index]
-            st.session_state.chat_histories[bot_name] = chat_history
-
-            # Clear memory for removed exchanges (non-blocking)
-            await self._clear_memory_after_index(len(chat_history) // 2)
+            chat_log = MemoryStore.log(bot_name)
+            if message_id not in chat_log:
+                raise ValueError(f"Invalid message id: {message_id}")
 
-            # Clear audio cache for removed messages (non-blocking)
-            await self._clear_audio_cache_after_index(bot_name, message_index)
+            # Memory windows drop removed messages, and their audio/alternatives go with them
+            chat_log.truncate_after(message_id, inclusive=True)
+            ConversationContext.invalidate(MemoryStore.for_bot_name(bot_name))
 
-            print(f"DEBUG: Deleted message at index {message_index}. Remaining messages: {len(chat_history)}")
+            print(f"DEBUG: Deleted message {message_id}. Remaining messages: {len(chat_log)}")
 
         except Exception as e:
             print(f"Error deleting message: {str(e)}")
             raise
 
-    @staticmethod
-    async def _clear_memory_after_index(exchange_index: int):
-        """Clear memory starting from a specific exchange index - ASYNC VERSION"""
-        try:
-            if 'memory' not in st.session_state:
-                return
-
-            messages = st.session_state.memory['chat_history'].messages
-            if not messages:
-                return
-
-            # Each exchange = 2 messages (user + assistant)
-            messages_to_keep = exchange_index * 2
-
-            if messages_to_keep < len(messages):
-                st.session_state.memory['chat_history'].messages = messages[:messages_to_keep]
-                print(f"DEBUG: Cleared memory after exchange {exchange_index}. Remaining messages: {messages_to_keep}")
-
-            # Small async sleep to yield control (non-blocking)
-            await asyncio.sleep(0.001)
-
-        except Exception as e:
-            print(f"Error clearing memory: {str(e)}")
-
-    @staticmethod
-    async def _clear_audio_cache_after_index( bot_name: str, message_index: int):
-        """Clear audio cache for messages after a specific index - ASYNC VERSION"""
-        try:
-            if "audio_cache" not in st.session_state:
-                return
-
-            keys_to_remove = []
-            for key in st.session_state.audio_cache:
-                if bot_name in key:
-                    # Extract index from key format: "audio_{bot_name}_{index}"
-                    try:
-                        key_index = int(key.split('_')[-1])
-                        if key_index >= message_index:
-                            keys_to_remove.append(key)
-                    except (ValueError, IndexError):
-                        continue
-
-            # Remove the keys (non-blocking batch operation)
-            for key in keys_to_remove:
-                # Also remove generating state if it exists
-                generating_key = f"generating_{key}"
-                if generating_key in st.session_state:
-                    del st.session_state[generating_key]
-                del st.session_state.audio_cache[key]
-
-            # Small async sleep to yield control (non-blocking)
-            await asyncio.sleep(0.001)
-
-            print(f"DEBUG: Cleared audio cache for {len(keys_to_remove)} messages after index {message_index}")
-
-        except Exception as e:
-            print(f"Error clearing audio cache: {str(e)}")
-
-    async def regenerate_after_edit(self, bot_name: str, user_message_index: int):
-        """Regenerate AI response after user message edit - ASYNC VERSION"""
+    async def regenerate_after_edit(self, bot_name: str, user_message_id: int):
+        """Generate the AI response to an edited user message (the last message of the chat)"""
         try:
-            if bot_name not in st.session_state.chat_histories:
-                raise ValueError(f"Bot {bot_name} not found in chat histories")
+            message = self._user_message(bot_name, user_message_id)
+            response = await self.generate_single_response(message.content)
 
-            chat_history = st.session_state.chat_histories[bot_name]
-
-            # Validate index and ensure it's a user message
-            if user_message_index >= len(chat_history) or user_message_index < 0:
-                raise ValueError(f"Invalid message index: {user_message_index}")
-
-            role, user_message = chat_history[user_message_index]
-            if role != "user":
-                raise ValueError("Can only regenerate after user messages")
-
-            # Generate new response (this is already async)
-            new_response = await self.generate_single_response(user_message)
-
-            # If there was a previous AI response after this user message, replace it
-            # Otherwise, add a new response
-            next_index = user_message_index + 1
-            if next_index < len(chat_history) and chat_history[next_index][0] == "assistant":
-                chat_history[next_index] = ("assistant", new_response)
-            else:
-                chat_history.append(("assistant", new_response))
-
-            # Update memory with the new exchange
-            self._process_memory(user_message, new_response)
-
-            return new_response
+            chat_log = MemoryStore.log(bot_name)
+            if response and chat_log.last() is message:
+                # Not recorded (error message): show it without adding it to memory
+                chat_log.append("assistant", response)
+            return response
 
         except Exception as e:
             print(f"Error regenerating after edit: {str(e)}")
@@ -503,18 +747,36 @@ class LLMChatController:
 class DialogChainFactory:
     """Factory class for creating dialog chains"""
 
-    def __init__(self, llm):
+    def __init__(self, llm, model_config=None):
         self.llm = llm
+        self.model_config = model_config or {}
 
     def create_chain(self, bot_name, all_bots):
         """Create a dialog chain for the specified bot"""
-        prompt_template = self._build_prompt_template(bot_name, all_bots)
+        current_bot = BotAttributeHelper.find_bot_by_name(bot_name, all_bots)
+        return self.create_chain_for_bot(bot_name, current_bot)
+
+    def create_chain_for_bot(self, bot_name, current_bot):
+        """Create a dialog chain for an already resolved bot, reusing the cached chain for unchanged bots"""
+        bot_id = BotAttributeHelper.get_bot_attr(current_bot, 'bot_id')
+
+        if not bot_id:
+            return self._compile_chain(bot_name, current_bot)
+
+        return DialogChainCache.get_or_create(
+            bot_id,
+            BotAttributeHelper.get_bot_attr(current_bot, 'updated_at'),
+            self.model_config,
+            lambda: self._compile_chain(bot_name, current_bot)
+        )
+
+    def _compile_chain(self, bot_name, current_bot):
+        """Build the prompt template and runnable sequence for a bot"""
+        prompt_template = self._build_prompt_template(bot_name, current_bot)
         return self._build_runnable_sequence(prompt_template)
 
-    def _build_prompt_template(self, bot_name, all_bots):
+    def _build_prompt_template(self, bot_name, current_bot):
         """Build the complete prompt template"""
-        current_bot = BotAttributeHelper.find_bot_by_name(bot_name, all_bots)
-
         if not current_bot:
             print(f"WARNING: Bot '{bot_name}' not found")
             return "Respond to the user: {{user_input}}"
@@ -561,6 +823,9 @@ class DialogChainFactory:
 - Never break character!
 - Never mention 'user_input' or ask for input - just respond as your character
 
+[Story So Far]
+{{story_so_far}}
+
 [Your Memory]
 {{chat_history}}
 
@@ -572,7 +837,7 @@ User: {{user_input}}
         """Build the LangChain runnable sequence"""
         try:
             prompt = PromptTemplate(
-                input_variables=["user_input", "chat_history"],
+                input_variables=["user_input", "chat_history", "story_so_far"],
                 template=prompt_template
             )
 
@@ -3,6 +3,14 @@ import requests
 import io
 from PIL import Image
 import base64
+import threading
+import time
+
+from services.metrics import get_metrics
+
+# The WebUI runs one txt2img at a time and /interrupt stops whichever one is running, so this
+# process sends one at a time too: a job may only interrupt while it holds this lock
+_txt2img_lock = threading.Lock()
 
 
 class ImageController:
@@ -31,8 +39,8 @@ class ImageController:
         return ["Default Model"]
 
     def generate_image(self, prompt, negative_prompt="", steps=20, cfg_scale=7, width=512, height=512,
-                       sampler="Euler a", model=None):
-        """Generate an image using Stable Diffusion API"""
+                       sampler="Euler a", model=None, cancel_token=None):
+        """Generate an image using Stable Diffusion API (cancel_token interrupts the running job)"""
         payload = {
             "prompt": prompt,
             "negative_prompt": negative_prompt,
@@ -43,18 +51,59 @@ class ImageController:
             "sampler_name": sampler
         }
 
+        if cancel_token is not None and cancel_token.cancelled:
+            return None, "Cancelled"
+
+        with _txt2img_lock:
+            started = time.perf_counter()
+            running = False
+            state_lock = threading.Lock()
+
+            def interrupt_if_running():
+                # Held while interrupting, so the next job can't start until the interrupt is sent
+                with state_lock:
+                    if running:
+                        self.interrupt()
+
+            if cancel_token is not None:
+                if cancel_token.cancelled:
+                    return None, "Cancelled"  # Cancelled while waiting for the server
+                running = True
+                # The WebUI keeps sampling after the client disconnects; ask it to stop explicitly
+                cancel_token.on_cancel(interrupt_if_running)
+            try:
+                response = requests.post(url=self.api_url, json=payload)
+            except Exception as e:
+                get_metrics().inc("image_errors_total", reason="connection")
+                return None, f"Connection Error: {str(e)}"
+            finally:
+                with state_lock:
+                    running = False
+
         try:
-            response = requests.post(url=self.api_url, json=payload)
+            if cancel_token is not None and cancel_token.cancelled:
+                return None, "Cancelled"
             if response.status_code == 200:
                 r = response.json()
                 image_data = r['images'][0]
                 image = Image.open(io.BytesIO(base64.b64decode(image_data.split(",", 1)[0])))
+                get_metrics().observe("image_generation_seconds", time.perf_counter() - started,
+                                      size=f"{width}x{height}")
                 return image, None
             else:
+                get_metrics().inc("image_errors_total", reason="api")
                 return None, f"API Error: {response.status_code}"
         except Exception as e:
+            get_metrics().inc("image_errors_total", reason="connection")
             return None, f"Connection Error: {str(e)}"
 
+    def interrupt(self):
+        """Interrupt the image job currently running on the Stable Diffusion server, whoever started it"""
+        try:
+            requests.post(self.api_url.replace("/txt2img", "/interrupt"), timeout=5)
+        except requests.RequestException as e:
+            print(f"WARNING: Could not interrupt image generation: {e}")
+
     def generate_avatar(self, character_name, appearance_desc, style="anime style"):
         """Generate avatar specifically for character with optimized settings"""
         # Optimized prompt for avatar generation
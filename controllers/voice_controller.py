@@ -1,17 +1,28 @@
+from __future__ import annotations
+
+import hashlib
 import re
 import sys
 import traceback
-import torch
-import torchaudio
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Dict, Tuple, Optional
-import datetime
+from typing import TYPE_CHECKING, Dict, Optional
 import streamlit as st
 import threading
+import time
 from queue import Queue
 import os
 import asyncio
 
+from services.cancellation import CancelToken, GenerationCancelled
+from services.metrics import get_metrics
+from services.tts_cache import TTSCache, get_tts_cache
+
+if TYPE_CHECKING:
+    import torch
+
+# torch, torchaudio and zonos take seconds to import; _setup_imports loads them when the
+# voice engine first starts, so pages that never speak don't pay for them
 os.environ["TORCHDYNAMO_DISABLE"] = "1"
 
 # Configuration
@@ -32,150 +43,126 @@ CONFIG = {
         "goth": "Goth_Ref.wav"
     },
     "audio_ref_dir": Path.home() / "Desktop" / "Python" / "FluffyAi" / "Audio" / "RefAudio",
-    "output_dir": Path.home() / "Desktop" / "Python" / "FluffyAi" / "Audio" / "Output"
+    "output_dir": Path.home() / "Desktop" / "Python" / "FluffyAi" / "Audio" / "Output",
+    # Speaker embeddings of the reference recordings, keyed by recording hash and model variant
+    "embedding_cache_dir": Path("cache") / "speaker_embeddings",
+    # Conditioning and sampling settings (Zonos' defaults, made explicit). Both are passed to the
+    # model and hashed into the TTS cache key, so changing either re-synthesizes instead of serving stale audio
+    "generation": {"language": "en-us"},
+    "sampling": {"max_new_tokens": 86 * 30, "cfg_scale": 2.0, "sampling_params": {"min_p": 0.1}}
 }
 
 
-class VoiceService:
+class VoiceEngine:
+    """
+    The Zonos model and the speaker embeddings of its emotion references, loaded once per process
+    and shared by every session.
+    Synthesis requests from all sessions go through one queue served by the engine's own thread,
+    so the model is never run concurrently and memory does not grow with the number of sessions.
+    """
+
     def __init__(self, model_type: str = "transformer") -> None:
-        """Initialize the TTS system"""
-        self._model_type = model_type  # Store the model type
-        self._initializing = False
-        self._ready = False
-        self._error: Optional[str] = None
-        self._init_queue = Queue()  # Initialize the queue
+        self.model_type = model_type
         self.config = CONFIG
         self.device: Optional[torch.device] = None
         self.model = None
-        self.emotion_refs: Optional[Dict[str, Tuple[torch.Tensor, int]]] = None
-        self.tts = False
-
-        # Start initialization
-        self._start_async_init()
-
-    def _start_async_init(self) -> None:
-        """Start asynchronous initialization"""
-        if not self._initializing and not self._ready:
-            self._initializing = True
-            thread = threading.Thread(target=self._async_init, daemon=True)
-            thread.start()
-
-    def _async_init(self) -> None:
-        """Actual initialization in background thread"""
+        self.speaker_embeddings: Optional[Dict[str, torch.Tensor]] = None  # emotion -> embedding
+        self.speaker_keys: Dict[str, str] = {}  # emotion -> hash of reference recording and model variant
+        self._error: Optional[str] = None
+        self._loaded = threading.Event()  # Set once loading finished, successfully or not
+        self._requests = Queue()  # (text, emotion, cancel_token, future, queued_at)
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start loading on a background thread (once); the same thread then serves requests"""
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._run, daemon=True, name=f"voice-engine-{self.model_type}").start()
+
+    def _run(self) -> None:
         try:
             self._setup_imports()
             self.device = self._get_device()
-            self.model = self._load_model(self._model_type)
-            self.emotion_refs = self._load_emotion_refs()
+            self.model = self._load_model(self.model_type)
+            self.speaker_embeddings = self._load_speaker_embeddings()
             self._ensure_output_dir()
-            self.tts = True
-            self._ready = True
-            print("VoiceService initialized successfully!")
-            print("Available emotions:", list(self.emotion_refs.keys()))
+            print("VoiceEngine initialized successfully!")
+            print("Available emotions:", list(self.speaker_embeddings.keys()))
         except Exception as init_error:
             self._error = str(init_error)
-            print(f"VoiceService initialization failed: {init_error}")
+            print(f"VoiceEngine initialization failed: {init_error}")
         finally:
-            self._initializing = False
-            self._init_queue.put(self._ready)  # Signal completion with status
-            st.rerun()  # Add this line to trigger Streamlit refresh
+            self._loaded.set()
+
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return  # Replaced after a failed load (reset_voice_engine)
+            text, emotion, cancel_token, future, queued_at = request
+            if not future.set_running_or_notify_cancel():
+                continue  # Caller gave up while queued
+            get_metrics().observe("tts_queue_wait_seconds", time.perf_counter() - queued_at)
+            try:
+                if self._error:
+                    raise RuntimeError(f"Voice engine unavailable: {self._error}")
+                future.set_result(self._synthesize(text, emotion, cancel_token))
+            except BaseException as request_error:  # pylint: disable=broad-except
+                future.set_exception(request_error)
 
     def is_initializing(self) -> bool:
-        """Check if service is initializing"""
-        return self._initializing
+        return self._started and not self._loaded.is_set()
 
     def is_ready(self) -> bool:
-        """Check if service is ready to use"""
-        return self._ready
+        return self._loaded.is_set() and self._error is None
 
     def get_error(self) -> Optional[str]:
-        """Get initialization error if any"""
         return self._error
 
-    async def wait_for_init_async(self, timeout: int = 30) -> bool:
-        """Async wait for initialization to complete"""
-        try:
-            # Convert the queue get to async
-            loop = asyncio.get_event_loop()
-            ready = await loop.run_in_executor(
-                None,
-                lambda: self._init_queue.get(timeout=timeout)
-            )
-            return ready
-        except Exception:  # pylint: disable=broad-except
-            return False
-
-    def wait_for_init(self, timeout: int = 30) -> bool:
-        """Wait for initialization to complete (for sync operations)"""
-        try:
-            self._init_queue.get(timeout=timeout)
-            return self._ready
-        except Exception:  # pylint: disable=broad-except
-            return False
-
-    @staticmethod
-    def ensure_voice_service() -> Optional['VoiceService']:
-        """Sync ensure voice service is initialized (lazy loading)"""
-        if st.session_state.voice_service is None and not st.session_state.voice_initializing:
-            try:
-                st.session_state.voice_initializing = True
-                st.session_state.voice_init_error = None
+    def wait_for_init(self, timeout: float = 30) -> bool:
+        """Block until loading finished (or timeout); True if the engine is usable"""
+        self._loaded.wait(timeout)
+        return self.is_ready()
 
-                # Show loading state if in a page that needs voice
-                if st.session_state.page in ["voice", "chat"]:
-                    with st.spinner("Initializing voice service..."):
-                        st.session_state.voice_service = VoiceService()
-                        st.session_state.voice_available = True
-                else:
-                    # Initialize silently for other pages
-                    st.session_state.voice_service = VoiceService()
-                    st.session_state.voice_available = True
+    def stop(self) -> None:
+        """End the serving thread once the requests already queued are answered"""
+        self._requests.put(None)
 
-            except Exception as service_error:  # pylint: disable=broad-except
-                st.session_state.voice_init_error = str(service_error)
-                st.session_state.voice_available = False
-                print(f"VoiceService initialization failed: {service_error}")
-            finally:
-                st.session_state.voice_initializing = False
+    def queue_depth(self) -> int:
+        return self._requests.qsize()
 
-        return st.session_state.voice_service
+    def collect_metrics(self, metrics):
+        """Metrics collector: publish pending synthesis requests as a gauge"""
+        metrics.set("tts_queue_depth", self.queue_depth(), model=self.model_type)
 
-    async def ensure_voice_service_async(self) -> Optional['VoiceService']:
-        """Async ensure voice service is initialized (lazy loading)"""
-        if st.session_state.voice_service is None and not st.session_state.voice_initializing:
-            try:
-                st.session_state.voice_initializing = True
-                st.session_state.voice_init_error = None
+    def submit(self, text: str, emotion: str, cancel_token: CancelToken = None) -> Future:
+        """
+        Queue a synthesis request
 
-                # Show loading state if in a page that needs voice
-                if st.session_state.page in ["voice", "chat"]:
-                    with st.spinner("Initializing voice service..."):
-                        st.session_state.voice_service = VoiceService()
-                        # Wait for initialization to complete
-                        if await self.wait_for_init_async():
-                            st.session_state.voice_available = True
-                        else:
-                            st.session_state.voice_available = False
-                else:
-                    # Initialize silently for other pages
-                    st.session_state.voice_service = VoiceService()
-                    if await self.wait_for_init_async():
-                        st.session_state.voice_available = True
-                    else:
-                        st.session_state.voice_available = False
+        Args:
+            text: Text to speak (already reduced to dialogue if wanted)
+            emotion: Emotion reference to speak with
+            cancel_token: Stops the request at its next checkpoint, queued or running
 
-            except Exception as service_error:  # pylint: disable=broad-except
-                st.session_state.voice_init_error = str(service_error)
-                st.session_state.voice_available = False
-                print(f"VoiceService initialization failed: {service_error}")
-            finally:
-                st.session_state.voice_initializing = False
-
-        return st.session_state.voice_service
+        Returns:
+            Future resolving to the output path, or raising GenerationCancelled / the synthesis error
+        """
+        self.start()
+        future = Future()
+        if self._loaded.is_set() and self._error:
+            future.set_exception(RuntimeError(f"Voice engine unavailable: {self._error}"))
+            return future
+        self._requests.put((text, emotion, cancel_token, future, time.perf_counter()))
+        return future
 
     @staticmethod
     def _setup_imports() -> None:
-        """Handle imports with fallback paths"""
+        """Import torch, torchaudio and zonos (with fallback paths) into the module globals"""
+        global torch, torchaudio
+        import torch
+        import torchaudio
         try:
             from zonos.model import Zonos
             from zonos.conditioning import make_cond_dict
@@ -221,10 +208,14 @@ class VoiceService:
             print(f"Failed to load model: {model_error}")
             raise
 
-    @staticmethod
-    def _load_emotion_refs() -> Dict[str, Tuple[torch.Tensor, int]]:
-        """Load all emotion reference audio files"""
-        emotion_refs: Dict[str, Tuple[torch.Tensor, int]] = {}
+    @property
+    def model_variant(self) -> str:
+        return f"Zyphra/Zonos-v0.1-{self.model_type}"
+
+    def _load_speaker_embeddings(self) -> Dict[str, torch.Tensor]:
+        """Speaker embedding of every emotion reference, computed once and kept for every request"""
+        CONFIG['embedding_cache_dir'].mkdir(parents=True, exist_ok=True)
+        speaker_embeddings: Dict[str, torch.Tensor] = {}
         for emotion, filename in CONFIG['audio_refs'].items():
             filepath = CONFIG['audio_ref_dir'] / filename
             if not filepath.exists():
@@ -232,95 +223,100 @@ class VoiceService:
                 continue
 
             try:
-                wav, sr = torchaudio.load(filepath)
-                emotion_refs[emotion] = (wav, sr)
-                print(f"Loaded reference audio for {emotion}")
+                key = self._speaker_key(filepath)
+                speaker_embeddings[emotion] = self._speaker_embedding(filepath, key)
+                self.speaker_keys[emotion] = key
+                print(f"Loaded speaker embedding for {emotion}")
             except Exception as audio_error:
                 print(f"Failed to load {emotion} reference audio: {audio_error}")
 
-        if not emotion_refs:
+        if not speaker_embeddings:
             raise ValueError("No emotion reference audio files could be loaded")
-        return emotion_refs
-
-    @staticmethod
-    def _ensure_output_dir() -> None:
-        """Ensure the output directory exists"""
-        CONFIG['output_dir'].mkdir(parents=True, exist_ok=True)
+        return speaker_embeddings
 
-    def get_available_emotions(self) -> list[str]:
-        """Return list of available emotions"""
-        try:
-            emotions = list(self.emotion_refs.keys()) if self.emotion_refs else []
-            return emotions
-        except Exception as emotion_error:
-            print(f"Error getting available emotions: {emotion_error}")
-            return []
+    def _speaker_key(self, filepath: Path) -> str:
+        """Hash of a reference recording's bytes and the model variant"""
+        file_hash = hashlib.sha256(filepath.read_bytes()).hexdigest()
+        return hashlib.sha256(f"{file_hash}:{self.model_variant}".encode("utf-8")).hexdigest()[:32]
 
-    @staticmethod
-    def extract_dialogue(text: str) -> str:
+    def _speaker_embedding(self, filepath: Path, key: str) -> torch.Tensor:
         """
-        Extract only the dialogue portions from text (content within quotes)
-        Adds trailing pauses to prevent audio cutoff
-        Returns empty string if no dialogue found.
-        """
-        # Find all text between quotes (including nested quotes)
-        dialogues = re.findall(r'"(.*?)"', text)
+        Speaker embedding of one reference recording, from the on-disk embedding cache when possible
 
-        if not dialogues:
-            return ""
-
-        # Join with pauses between dialogue segments
-        processed = "... ...".join(dialogues)
+        The cache file is named after the speaker key, so an edited recording or a different model
+        computes a fresh embedding instead of reusing a stale one.
+        """
+        cache_path = CONFIG['embedding_cache_dir'] / f"{key}.pt"
 
-        # Add trailing pauses to prevent audio cutoff
-        if processed.strip():
-            processed += " ... "
+        if cache_path.exists():
+            try:
+                return torch.load(cache_path, map_location=self.device)
+            except Exception as cache_error:  # pylint: disable=broad-except
+                print(f"WARNING: Ignoring unreadable speaker embedding {cache_path}: {cache_error}")
 
-        return processed
+        wav, sr = torchaudio.load(filepath)
+        started = time.perf_counter()
+        embedding = self.model.make_speaker_embedding(wav, sr)
+        print(f"DEBUG: Computed speaker embedding for {filepath.name} in "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms")
 
-    async def generate_speech_async(self, text: str, emotion: str, dialogue_only: bool = True) -> Optional[str]:
-        """Async version: Generate speech from text with the selected emotion"""
         try:
-            # Run the blocking operation in a thread pool
-            loop = asyncio.get_event_loop()
-            output_path = await loop.run_in_executor(
-                None,
-                lambda: self.generate_speech(text, emotion, dialogue_only)
-            )
-            return output_path
-        except Exception as speech_error:
-            print(f"[ERROR] During async speech generation: {speech_error}")
-            raise
+            # Write then rename so a crash never leaves a truncated file under the final name
+            partial_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            torch.save(embedding.detach().cpu(), partial_path)
+            os.replace(partial_path, cache_path)
+        except (OSError, RuntimeError) as cache_error:
+            print(f"WARNING: Could not cache speaker embedding for {filepath.name}: {cache_error}")
+        return embedding
 
-    def generate_speech(self, text: str, emotion: str, dialogue_only: bool = True) -> Optional[str]:
-        """Generate speech from text with the selected emotion"""
+    @staticmethod
+    def _ensure_output_dir() -> None:
+        """Ensure the output directory exists"""
+        CONFIG['output_dir'].mkdir(parents=True, exist_ok=True)
+
+    def get_available_emotions(self) -> list[str]:
+        """Return list of available emotions"""
+        return list(self.speaker_embeddings.keys()) if self.speaker_embeddings else []
+
+    def output_key(self, processed_text: str, emotion: str) -> Optional[str]:
+        """TTS cache key of a request, or None until the engine has loaded the emotion's speaker"""
+        speaker = self.speaker_keys.get(emotion)
+        if speaker is None:
+            return None
+        settings = {"generation": CONFIG['generation'], "sampling": CONFIG['sampling']}
+        return TTSCache.make_key(processed_text, emotion, speaker, self.model_variant, settings)
+
+    def cached_output(self, processed_text: str, emotion: str) -> Optional[str]:
+        """Path of earlier audio for an identical request, if the TTS cache still has it"""
+        cache = get_tts_cache()
+        key = self.output_key(processed_text, emotion)
+        if cache is None or key is None:
+            return None
+        return cache.get(key)
+
+    def _synthesize(self, processed_text: str, emotion: str, cancel_token: CancelToken = None) -> str:
+        """Run one request on the engine thread; raises GenerationCancelled if cancelled"""
+        def checkpoint():
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+
+        started = time.perf_counter()
         try:
-            # Pre-process text if we only want dialogue
-            if dialogue_only:
-                processed_text = self.extract_dialogue(text)
-                if not processed_text:
-                    print("[INFO] No dialogue found in text - nothing to synthesize")
-                    return None
-                print(f"[DEBUG] Extracted dialogue: {processed_text}")
-            else:
-                processed_text = text
+            # An identical request queued earlier may have produced this audio already
+            cached = self.cached_output(processed_text, emotion)
+            get_metrics().inc("tts_cache_requests_total", result="hit" if cached else "miss")
+            if cached:
+                return cached
 
             print(f"\nGenerating speech from: {processed_text}")
 
             print(f"\n[DEBUG] Starting speech generation with emotion: {emotion}")
 
-            # 1. Get reference audio
-            print(f"[DEBUG] Getting reference audio for {emotion}")
-            if not self.emotion_refs or emotion not in self.emotion_refs:
+            # 1-2. Speaker embedding of the emotion's reference audio (computed when the engine loaded)
+            checkpoint()
+            if not self.speaker_embeddings or emotion not in self.speaker_embeddings:
                 raise ValueError(f"Emotion '{emotion}' not found in available emotions")
-
-            wav, sr = self.emotion_refs[emotion]
-            print(f"[DEBUG] Reference audio shape: {wav.shape}, sample rate: {sr}")
-
-            # 2. Create speaker embedding
-            print("[DEBUG] Creating speaker embedding...")
-            speaker = self.model.make_speaker_embedding(wav, sr)
-            print(f"[DEBUG] Speaker embedding created. Type: {type(speaker)}")
+            speaker = self.speaker_embeddings[emotion]
 
             # 3. Prepare conditioning
             print("[DEBUG] Preparing conditioning...")
@@ -328,7 +324,7 @@ class VoiceService:
             cond_dict = make_cond_dict(  # type: ignore
                 text=processed_text,
                 speaker=speaker,
-                language="en-us"
+                **CONFIG['generation']
             )
             print(f"[DEBUG] Conditioning dict: {cond_dict.keys()}")
 
@@ -337,12 +333,22 @@ class VoiceService:
             conditioning = self.model.prepare_conditioning(cond_dict)
             print(f"[DEBUG] Conditioning type: {type(conditioning)}")
 
-            # 5. Generate speech codes
+            # 5. Generate speech codes (the callback stops the sampling loop once cancelled)
+            checkpoint()
             print("[DEBUG] Generating speech codes...")
-            codes = self.model.generate(conditioning)
+            if cancel_token is not None:
+                codes = self.model.generate(
+                    conditioning,
+                    callback=lambda frame, step, max_steps: not cancel_token.cancelled,
+                    **CONFIG['sampling']
+                )
+                checkpoint()
+            else:
+                codes = self.model.generate(conditioning, **CONFIG['sampling'])
             print(f"[DEBUG] Codes generated. Type: {type(codes)}, shape: {getattr(codes, 'shape', 'N/A')}")
 
             # 6. Decode to waveform
+            checkpoint()
             print("[DEBUG] Decoding to waveform...")
             decoder_output = self.model.autoencoder.decode(codes)
             print(f"[DEBUG] Decoder output type: {type(decoder_output)}")
@@ -365,9 +371,9 @@ class VoiceService:
             wavs = wavs.cpu()
             print(f"[DEBUG] After CPU move - shape: {wavs.shape}")
 
-            # 7. Save output
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = CONFIG['output_dir'] / f"{emotion}_output_{timestamp}.wav"
+            # 7. Save output, named after the request's cache key so different requests never collide
+            key = self.output_key(processed_text, emotion)
+            output_path = CONFIG['output_dir'] / f"{emotion}_{key[:24]}.wav"
             print(f"[DEBUG] Saving to: {output_path}")
 
             # Ensure correct shape [channels, samples]
@@ -380,16 +386,223 @@ class VoiceService:
             else:
                 raise ValueError(f"Unexpected waveform shape: {wavs.shape}")
 
-            torchaudio.save(str(output_path), wavs, self.model.autoencoder.sampling_rate)
+            # Write then rename: another app process sharing the index never sees a half-written file
+            partial_path = output_path.with_name(f"{output_path.stem}.{os.getpid()}.partial.wav")
+            torchaudio.save(str(partial_path), wavs, self.model.autoencoder.sampling_rate, format="wav")
+            os.replace(partial_path, output_path)
             print(f"[SUCCESS] Generated speech saved to {output_path}")
+
+            cache = get_tts_cache()
+            if cache is not None:
+                cache.put(key, str(output_path), emotion, processed_text)
+
+            elapsed = time.perf_counter() - started
+            audio_seconds = wavs.shape[-1] / self.model.autoencoder.sampling_rate
+            get_metrics().observe("tts_seconds", elapsed, emotion=emotion)
+            if audio_seconds:
+                get_metrics().observe("tts_real_time_factor", elapsed / audio_seconds, emotion=emotion)
             return str(output_path)
 
+        except GenerationCancelled as cancelled:
+            print(f"[INFO] Speech generation cancelled ({cancelled})")
+            raise
+
         except Exception as speech_error:
+            get_metrics().inc("tts_errors_total")
             print(f"[ERROR] During speech generation: {speech_error}", file=sys.stderr)
             print("[DEBUG] Exception details:", file=sys.stderr)
             print(traceback.format_exc(), file=sys.stderr)
             raise
 
+
+_engines: Dict[str, VoiceEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_voice_engine(model_type: str = CONFIG["model_type"]) -> VoiceEngine:
+    """Return the process-wide voice engine for a model type, starting it on first use"""
+    with _engines_lock:
+        engine = _engines.get(model_type)
+        if engine is None:
+            engine = _engines[model_type] = VoiceEngine(model_type)
+            get_metrics().add_collector(engine.collect_metrics)
+    engine.start()
+    return engine
+
+
+def reset_voice_engine(model_type: str = CONFIG["model_type"]) -> None:
+    """Drop a voice engine whose loading failed, so the next use loads the model again"""
+    with _engines_lock:
+        engine = _engines.get(model_type)
+        if engine is None or engine.get_error() is None:
+            return
+        del _engines[model_type]
+    get_metrics().remove_collector(engine.collect_metrics)
+    engine.stop()
+    print(f"DEBUG: Dropped failed voice engine ({model_type}); the next request reloads it")
+
+
+class VoiceService:
+    """
+    A session's handle to the shared VoiceEngine. It holds only the model type, so keeping it in
+    st.session_state costs nothing, and every handle of a model type speaks through the same engine.
+    """
+
+    def __init__(self, model_type: str = CONFIG["model_type"]) -> None:
+        """Attach to the shared engine (starting it if this is the first session to use voice)"""
+        self._model_type = model_type
+        self.config = CONFIG
+        get_voice_engine(model_type)
+
+    @property
+    def engine(self) -> VoiceEngine:
+        return get_voice_engine(self._model_type)
+
+    def is_initializing(self) -> bool:
+        """Check if service is initializing"""
+        return self.engine.is_initializing()
+
+    def is_ready(self) -> bool:
+        """Check if service is ready to use"""
+        return self.engine.is_ready()
+
+    def get_error(self) -> Optional[str]:
+        """Get initialization error if any"""
+        return self.engine.get_error()
+
+    def retry(self) -> None:
+        """After a failed load, load the engine again (for every session of this model type)"""
+        reset_voice_engine(self._model_type)
+        get_voice_engine(self._model_type)  # Starts loading now rather than on the next request
+
+    async def wait_for_init_async(self, timeout: int = 30) -> bool:
+        """Async wait for initialization to complete"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.engine.wait_for_init, timeout)
+
+    def wait_for_init(self, timeout: int = 30) -> bool:
+        """Wait for initialization to complete (for sync operations)"""
+        return self.engine.wait_for_init(timeout)
+
+    @staticmethod
+    def ensure_voice_service() -> Optional['VoiceService']:
+        """Sync ensure voice service is initialized (lazy loading)"""
+        if st.session_state.get('voice_service') is None and not st.session_state.get('voice_initializing'):
+            try:
+                st.session_state.voice_initializing = True
+                st.session_state.voice_init_error = None
+                st.session_state.voice_service = VoiceService()
+                st.session_state.voice_available = True
+
+            except Exception as service_error:  # pylint: disable=broad-except
+                st.session_state.voice_init_error = str(service_error)
+                st.session_state.voice_available = False
+                print(f"VoiceService initialization failed: {service_error}")
+            finally:
+                st.session_state.voice_initializing = False
+
+        return st.session_state.voice_service
+
+    @staticmethod
+    def configured_emotions() -> list[str]:
+        """Emotions with a reference recording on disk; listing them doesn't start the voice engine"""
+        service = st.session_state.get('voice_service')
+        if service is not None and service.is_ready():
+            return service.get_available_emotions()
+        return [emotion for emotion, filename in CONFIG['audio_refs'].items()
+                if (CONFIG['audio_ref_dir'] / filename).exists()]
+
+    async def ensure_voice_service_async(self) -> Optional['VoiceService']:
+        """Async ensure voice service is initialized (lazy loading)"""
+        service = VoiceService.ensure_voice_service()
+        if service is not None:
+            st.session_state.voice_available = await service.wait_for_init_async()
+        return service
+
+    def get_available_emotions(self) -> list[str]:
+        """Return list of available emotions"""
+        try:
+            return self.engine.get_available_emotions()
+        except Exception as emotion_error:
+            print(f"Error getting available emotions: {emotion_error}")
+            return []
+
+    @staticmethod
+    def extract_dialogue(text: str) -> str:
+        """
+        Extract only the dialogue portions from text (content within quotes)
+        Adds trailing pauses to prevent audio cutoff
+        Returns empty string if no dialogue found.
+        """
+        # Find all text between quotes (including nested quotes)
+        dialogues = re.findall(r'"(.*?)"', text)
+
+        if not dialogues:
+            return ""
+
+        # Join with pauses between dialogue segments
+        processed = "... ...".join(dialogues)
+
+        # Add trailing pauses to prevent audio cutoff
+        if processed.strip():
+            processed += " ... "
+
+        return processed
+
+    def _prepare_text(self, text: str, dialogue_only: bool) -> Optional[str]:
+        """Text to synthesize, or None if dialogue_only and the text has no dialogue"""
+        if not dialogue_only:
+            return text
+        processed_text = self.extract_dialogue(text)
+        if not processed_text:
+            print("[INFO] No dialogue found in text - nothing to synthesize")
+            return None
+        print(f"[DEBUG] Extracted dialogue: {processed_text}")
+        return processed_text
+
+    def _cached_output(self, processed_text: str, emotion: str) -> Optional[str]:
+        """Earlier audio for an identical request, returned without queueing behind other sessions"""
+        cached = self.engine.cached_output(processed_text, emotion)
+        if cached:
+            get_metrics().inc("tts_cache_requests_total", result="hit")
+            print(f"[DEBUG] TTS cache hit: {cached}")
+        return cached
+
+    async def generate_speech_async(self, text: str, emotion: str, dialogue_only: bool = True,
+                                    cancel_token: CancelToken = None) -> Optional[str]:
+        """Async version: Generate speech from text with the selected emotion"""
+        processed_text = self._prepare_text(text, dialogue_only)
+        if processed_text is None:
+            return None
+        cached = self._cached_output(processed_text, emotion)
+        if cached:
+            return cached
+        future = self.engine.submit(processed_text, emotion, cancel_token)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Stop the request at its next checkpoint instead of letting it finish unseen
+            if cancel_token is not None:
+                cancel_token.cancel("abandoned")
+            future.cancel()
+            raise
+        except GenerationCancelled:
+            raise
+        except Exception as speech_error:
+            print(f"[ERROR] During async speech generation: {speech_error}")
+            raise
+
+    def generate_speech(self, text: str, emotion: str, dialogue_only: bool = True,
+                        cancel_token: CancelToken = None) -> Optional[str]:
+        """Generate speech from text with the selected emotion; raises GenerationCancelled if cancelled"""
+        processed_text = self._prepare_text(text, dialogue_only)
+        if processed_text is None:
+            return None
+        cached = self._cached_output(processed_text, emotion)
+        if cached:
+            return cached
+        return self.engine.submit(processed_text, emotion, cancel_token).result()
+
     async def preview_voice_async(self, text: str, emotion: str) -> Optional[str]:
         """Async version: Generate a voice preview with the given text and emotion"""
         try:
@@ -415,6 +628,7 @@ if __name__ == "__main__":
     try:
         # Initialize and run the TTS system
         tts = VoiceService(CONFIG["model_type"])
+        tts.wait_for_init(timeout=600)
 
         # Example usage:
         emotions = tts.get_available_emotions()
@@ -426,4 +640,4 @@ if __name__ == "__main__":
             print("Generated audio at:", output_path)
     except Exception as main_error:  # pylint: disable=broad-except
         print(f"Failed to initialize Zonos TTS: {main_error}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
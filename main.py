@@ -1,41 +1,26 @@
 import streamlit as st
-from langchain_community.chat_message_histories import ChatMessageHistory
-
-# Import controllers
-from controllers.voice_controller import VoiceService
+from config import get_default_bots
+from services.memory_store import MemoryStore
+from services.greeting_store import GreetingStore
+from services.cancellation import CancellationRegistry
+from services.rerun_metrics import RerunMetrics
+from services.profiler import RerunProfiler
+from services.metrics import start_metrics_server
 
 # Import services
 from components.sidebar import create_sidebar
-
-# Import views (pages)
-from views.pages.home import home_page
-from views.pages.profile import profile_page
-from views.pages.chat import chat_page
-from views.pages.bot_setup import bot_setup_page
-from views.pages.generate_concept import generate_concept_page
-from views.pages.create_bot import create_bot_page
-from views.pages.my_bots import my_bots_page
-from views.pages.edit_bot import edit_bot_page
-from views.pages.voice import voice_page
-from views.pages.group_chat import group_chat_page
 from services.image_service import ImageService
-from views.pages.image_studio import image_studio_page
 
+# Pages (and the controllers, LangChain and torch behind them) are imported when first routed to
+from views.pages import ROUTES, load_page
 
 # Import bot card CSS
 from components.bot_card import get_bot_card_css
 
-# Initialize the service (add to your service initialization section)
-image_service = ImageService(upload_dir="images/avatars", max_size_mb=5)
-st.session_state.image_service = image_service
-
 
 def initialize_chat_memory():
     """Initialize and return a properly configured conversation memory"""
-    return {
-        'chat_history': ChatMessageHistory(),
-        'window_size': 20  # Keep last 20 messages
-    }
+    return MemoryStore.new_memory()
 
 
 def initialize_session_state():
@@ -46,20 +31,11 @@ def initialize_session_state():
         st.session_state.selected_bot = None
     if 'greeting_sent' not in st.session_state:
         st.session_state.greeting_sent = False
-    if 'memory' not in st.session_state:
-        st.session_state.memory = initialize_chat_memory()
+    if 'memories' not in st.session_state:
+        st.session_state.memories = {}
     if 'image_service' not in st.session_state:
         st.session_state.image_service = ImageService(upload_dir="images/avatars", max_size_mb=5)
-    if 'voice_service' not in st.session_state:
-        try:
-            st.session_state.voice_service = VoiceService()
-            st.session_state.voice_available = True
-            print("VoiceService initialized successfully!")
-            print("Available emotions:", st.session_state.voice_service.get_available_emotions())
-        except Exception as e:
-            print(f"VoiceService initialization failed: {e}")
-            st.session_state.voice_service = None
-            st.session_state.voice_available = False
+    # voice_service is created by VoiceService.ensure_voice_service() on first use, not per session here
 
     if 'group_chat' not in st.session_state:
         st.session_state.group_chat = {
@@ -76,6 +52,11 @@ def initialize_session_state():
         st.session_state.user_bots = []
     if 'chat_histories' not in st.session_state:
         st.session_state.chat_histories = {}
+    if 'greetings_warmed' not in st.session_state:
+        # Fill greeting pools in the background so first chats open instantly
+        published_bots = [bot for bot in st.session_state.user_bots if getattr(bot, 'is_public', False)]
+        GreetingStore.warm(get_default_bots() + published_bots)
+        st.session_state.greetings_warmed = True
     if 'profile_data' not in st.session_state:
         st.session_state.profile_data = {
             "username": "user_123",
@@ -115,39 +96,39 @@ document.addEventListener('DOMContentLoaded', function() {
 
 
 async def main():
-    # Initialize application
-    initialize_session_state()
-    apply_global_styles()
-
-    # Create sidebar navigation
-    await create_sidebar()
-
-    # Page routing
-    if st.session_state.page == "home":
-        await home_page()
-    elif st.session_state.page == "profile":
-        await profile_page()
-    elif st.session_state.page == "chat":
-        await chat_page(st.session_state.selected_bot)
-    elif st.session_state.page == "bot_setup":
-        await bot_setup_page()
-    elif st.session_state.page == "generate_concept":
-        await generate_concept_page()
-    elif st.session_state.page == "create_bot":
-        await create_bot_page()
-    elif st.session_state.page == "my_bots":
-        await my_bots_page()
-    elif st.session_state.page == "edit_bot":
-        await edit_bot_page()
-    elif st.session_state.page == "voice":
-        await voice_page()
-    elif st.session_state.page == "image_studio":  # Add this condition
-        await image_studio_page()
-    elif st.session_state.page == "group_chat":
-        await group_chat_page()
-    else:
+    # Full script runs; fragment-only reruns are timed by the fragments themselves
+    with RerunMetrics.track("app"), RerunProfiler.rerun():
+        # Initialize application
+        start_metrics_server()
+        with RerunProfiler.phase("init"):
+            initialize_session_state()
+        with RerunProfiler.phase("styles"):
+            apply_global_styles()
+
+        # Create sidebar navigation
+        with RerunProfiler.phase("sidebar"):
+            await create_sidebar()
+
+        # Jobs started on another page are no longer wanted
+        CancellationRegistry.enter_page(st.session_state.page)
+
+        # Page routing
+        with RerunProfiler.phase("page"):
+            await _route_page()
+
+
+async def _route_page():
+    """Render the current page, importing its module on first visit"""
+    page = st.session_state.page
+    if page not in ROUTES:
         st.warning("Please select a page")
-        await home_page()
+        page = "home"
+
+    page_function = load_page(page)
+    if page == "chat":
+        await page_function(st.session_state.selected_bot)
+    else:
+        await page_function()
 
 
 if __name__ == "__main__":
@@ -139,6 +139,10 @@ class Bot:
         # Update timestamp
         self.updated_at = datetime.now().isoformat()
 
+        # Compiled dialog chains for the previous revision are now stale
+        from services.chain_cache import DialogChainCache
+        DialogChainCache.invalidate(self.bot_id)
+
     def is_published(self) -> bool:
         """Backward compatibility - check if bot is public"""
         return self.is_public
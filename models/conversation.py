@@ -0,0 +1,237 @@
+# models/conversation.py
+"""
+Conversation log with stable message ids.
+A chat is a ConversationLog of Message objects: ids never change or get reused, so edits, deletes and
+per-message data (audio, regenerate alternatives) are addressed by id instead of list position.
+Conversation memory is a ConversationWindow over the same Message objects, not a parallel copy.
+"""
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from services.token_budget import TokenCounter
+
+
+class Message:
+    """One chat message; content changes invalidate its cached token count and LangChain message"""
+
+    __slots__ = ("id", "role", "_content", "parent_id", "created_at", "meta", "removed", "_tokens", "_lc")
+
+    def __init__(self, message_id: int, role: str, content: str, parent_id: Optional[int] = None,
+                 created_at: float = None, meta: Dict[str, Any] = None):
+        self.id = message_id
+        self.role = role
+        self._content = content
+        self.parent_id = parent_id
+        self.created_at = created_at or time.time()
+        self.meta = meta or {}  # e.g. audio_path, alternatives, greeting
+        self.removed = False  # Set when truncated out of its log; windows drop it
+        self._tokens = None
+        self._lc = None
+
+    @property
+    def content(self) -> str:
+        return self._content
+
+    @content.setter
+    def content(self, value: str):
+        self._content = value
+        self._tokens = None
+        self._lc = None
+
+    @property
+    def tokens(self) -> int:
+        """Approximate token count of the content, cached"""
+        if self._tokens is None:
+            self._tokens = TokenCounter.count(self._content)
+        return self._tokens
+
+    def to_langchain(self):
+        """HumanMessage / AIMessage view of this message, cached"""
+        if self._lc is None:
+            # Imported here so loading a chat log doesn't pull in LangChain before a prompt is built
+            from langchain_core.messages import AIMessage, HumanMessage
+            cls = HumanMessage if self.role == "user" else AIMessage
+            self._lc = cls(content=self._content)
+        return self._lc
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "role": self.role,
+            "content": self._content,
+            "parent_id": self.parent_id,
+            "created_at": self.created_at,
+            "meta": self.meta
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Message':
+        return cls(data["id"], data["role"], data["content"], data.get("parent_id"),
+                   data.get("created_at"), data.get("meta"))
+
+
+class ConversationLog:
+    """
+    Ordered messages of one chat with O(1) append, lookup by id and truncate-after-id.
+    A log may hold only the most recent part of a stored conversation: `earlier` counts the older
+    messages not loaded yet, and every change is reported to `observer` (if set) so it can be persisted;
+    observer.message_added may return the id the message was stored under.
+    """
+
+    def __init__(self, messages: List[Message] = None, next_id: int = 1, earlier: int = 0):
+        self._messages = []
+        self._positions = {}  # message id -> index in _messages, offset by _base
+        self._base = 0  # Goes negative as earlier messages are prepended
+        self._next_id = next_id
+        self.earlier = earlier
+        self.observer = None  # e.g. conversation_store.StoredConversation
+        for message in messages or []:
+            self._positions[message.id] = len(self._messages)
+            self._messages.append(message)
+            self._next_id = max(self._next_id, message.id + 1)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._messages)
+
+    def __getitem__(self, index: int) -> Message:
+        return self._messages[index]
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._positions
+
+    @property
+    def next_id(self) -> int:
+        return self._next_id
+
+    def append(self, role: str, content: str, parent_id: Optional[int] = None, **meta) -> Message:
+        """
+        Add a message at the end
+
+        Args:
+            role: "user" or "assistant"
+            content: Message text
+            parent_id: Message this one answers (defaults to the current last message)
+            **meta: Per-message metadata
+
+        Returns:
+            The new Message
+        """
+        if parent_id is None and self._messages:
+            parent_id = self._messages[-1].id
+        message = Message(self._next_id, role, content, parent_id, meta=meta)
+        if self.observer is not None:
+            # A store may allocate a different id (another session appended to the same chat meanwhile)
+            message.id = self.observer.message_added(self, message) or message.id
+        self._next_id = max(self._next_id, message.id + 1)
+        self._positions[message.id] = self._base + len(self._messages)
+        self._messages.append(message)
+        return message
+
+    def prepend(self, messages: List[Message]):
+        """Add earlier messages (oldest first) in front of the loaded ones"""
+        self._base -= len(messages)
+        for offset, message in enumerate(messages):
+            self._positions[message.id] = self._base + offset
+        self._messages[:0] = messages
+        self.earlier = max(0, self.earlier - len(messages))
+
+    def update(self, message: Message):
+        """Report an in-place change to a message's content or meta"""
+        if self.observer is not None and message.id in self._positions:
+            self.observer.message_updated(self, message)
+
+    def get(self, message_id: int) -> Optional[Message]:
+        position = self._positions.get(message_id)
+        return self._messages[position - self._base] if position is not None else None
+
+    def index_of(self, message_id: int) -> int:
+        """Position of a message in the loaded part of the log (raises KeyError for unknown ids)"""
+        return self._positions[message_id] - self._base
+
+    def last(self, role: str = None) -> Optional[Message]:
+        """Most recent message, optionally of a given role"""
+        for message in reversed(self._messages):
+            if role is None or message.role == role:
+                return message
+        return None
+
+    def truncate_after(self, message_id: int, inclusive: bool = False) -> List[Message]:
+        """
+        Drop every message after message_id (and message_id itself if inclusive)
+
+        Returns:
+            The removed messages, oldest first
+        """
+        cut = self.index_of(message_id) + (0 if inclusive else 1)
+        removed = self._messages[cut:]
+        del self._messages[cut:]
+        for message in removed:
+            message.removed = True
+            del self._positions[message.id]
+        if removed and self.observer is not None:
+            self.observer.messages_removed(self, removed[0].id)
+        return removed
+
+    def clear(self) -> List[Message]:
+        """Drop all messages, including earlier ones not loaded; ids keep counting up"""
+        removed = list(self._messages)
+        for message in removed:
+            message.removed = True
+        self._messages = []
+        self._positions = {}
+        self._base = 0
+        self.earlier = 0
+        if self.observer is not None:
+            self.observer.messages_removed(self, None)
+        return removed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"next_id": self._next_id, "messages": [message.to_dict() for message in self._messages]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ConversationLog':
+        return cls([Message.from_dict(item) for item in data.get("messages", [])], data.get("next_id", 1))
+
+
+class ConversationWindow:
+    """
+    The part of a log that is in conversation memory: references to Message objects, oldest first.
+    Truncated messages drop out and edits show through, because nothing is copied.
+    """
+
+    def __init__(self):
+        self._entries = []
+
+    def _live(self) -> List[Message]:
+        if any(message.removed for message in self._entries):
+            self._entries = [message for message in self._entries if not message.removed]
+        return self._entries
+
+    @property
+    def entries(self) -> List[Message]:
+        """Messages in the window, oldest first"""
+        return list(self._live())
+
+    @property
+    def messages(self) -> list:
+        """LangChain messages in the window, oldest first"""
+        return [message.to_langchain() for message in self._live()]
+
+    def __len__(self) -> int:
+        return len(self._live())
+
+    def add(self, message: Message):
+        self._entries.append(message)
+
+    def evict(self, count: int) -> List[Message]:
+        """Drop the oldest count messages from the window (they stay in the log)"""
+        live = self._live()
+        evicted = live[:count]
+        self._entries = live[count:]
+        return evicted
+
+    def clear(self):
+        self._entries = []
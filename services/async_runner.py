@@ -0,0 +1,40 @@
+"""
+Run coroutines from synchronous Streamlit code.
+Fragments (st.fragment) are plain functions: on a fragment-only rerun Streamlit calls them directly,
+outside main()'s event loop, while on a full run they are called from inside it.
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+
+def run_async(coro):
+    """
+    Run a coroutine to completion and return its result
+
+    Args:
+        coro: Coroutine to run; it may call st.* as usual
+
+    Returns:
+        The coroutine's result
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        # Fragment-only rerun: no loop on this thread yet
+        return asyncio.run(coro)
+
+    # Called from inside main()'s loop: finish on a helper thread that writes to the same script run
+    # (and the same container, via the copied context) while this thread waits
+    ctx = get_script_run_ctx()
+    context = contextvars.copy_context()
+
+    def _run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return context.run(asyncio.run, coro)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="run-async") as executor:
+        return executor.submit(_run).result()
@@ -0,0 +1,137 @@
+"""
+Cancellation tokens for in-flight LLM, TTS and image jobs.
+Each job gets a token scoped to its Streamlit session and view. Starting a new job for the same view
+supersedes the old one, leaving a page cancels that page's jobs, and a script run that unwinds early
+cancels whatever it started. Cancelling runs registered callbacks, e.g. closing an HTTP stream.
+"""
+import threading
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a job whose token was cancelled"""
+
+
+class CancelToken:
+    """Thread-safe, one-shot cancellation flag with callbacks"""
+
+    def __init__(self, session_id: str, view: str, page: str = None):
+        self.session_id = session_id
+        self.view = view
+        self.page = page
+        self.reason = None
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        """Cancel the job and run its callbacks once"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        print(f"DEBUG: Cancelled {self.view} ({reason})")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"WARNING: Cancel callback failed: {e}")
+
+    def on_cancel(self, callback):
+        """Run callback when the token is cancelled (immediately if it already is)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise GenerationCancelled(self.reason)
+
+
+class CancellationRegistry:
+    """Process-wide map of (session, view) -> live token"""
+
+    _tokens = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _session_id() -> str:
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx else "no-session"
+
+    @classmethod
+    def begin(cls, view: str, page: str = None) -> CancelToken:
+        """
+        Create the token for a new job, superseding any job still running for the same view
+
+        Args:
+            view: Job scope within the session, e.g. "chat:StoryBot" or "tts:audio_StoryBot_3"
+            page: Page the job belongs to (defaults to the current page)
+
+        Returns:
+            Fresh CancelToken
+        """
+        session_id = cls._session_id()
+        if page is None and get_script_run_ctx():
+            page = st.session_state.get('page')
+        token = CancelToken(session_id, view, page)
+
+        with cls._lock:
+            previous = cls._tokens.get((session_id, view))
+            cls._tokens[(session_id, view)] = token
+
+        if previous is not None:
+            previous.cancel("superseded")
+        return token
+
+    @classmethod
+    def finish(cls, token: CancelToken, completed: bool = True):
+        """
+        Unregister a job's token; a job that did not complete is cancelled so its resources are freed
+
+        Args:
+            token: Token returned by begin()
+            completed: False if the job is being abandoned (exception, rerun, early exit)
+        """
+        if not completed:
+            token.cancel("abandoned")
+
+        with cls._lock:
+            key = (token.session_id, token.view)
+            if cls._tokens.get(key) is token:
+                del cls._tokens[key]
+
+    @classmethod
+    def enter_page(cls, page: str):
+        """Cancel this session's jobs that belong to other pages"""
+        session_id = cls._session_id()
+        with cls._lock:
+            stale = [token for (sid, _), token in cls._tokens.items()
+                     if sid == session_id and token.page is not None and token.page != page]
+            for token in stale:
+                del cls._tokens[(token.session_id, token.view)]
+
+        for token in stale:
+            token.cancel(f"left page {token.page}")
+
+    @classmethod
+    def cancel_session(cls, session_id: str = None):
+        """Cancel every job of a session"""
+        session_id = session_id or cls._session_id()
+        with cls._lock:
+            stale = [key for key in cls._tokens if key[0] == session_id]
+            tokens = [cls._tokens.pop(key) for key in stale]
+
+        for token in tokens:
+            token.cancel("session ended")
@@ -0,0 +1,83 @@
+"""
+Process-wide cache of compiled dialog chains.
+Chains are keyed by bot revision (bot_id + updated_at) and the model config they are bound to,
+so reruns and bot switches reuse an existing RunnableSequence instead of rebuilding it.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+
+class DialogChainCache:
+    """Bounded, thread-safe store of compiled dialog chains shared by every session"""
+
+    MAX_ENTRIES = 64
+
+    _chains = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def make_key(bot_id, updated_at, model_config):
+        """
+        Build the cache key for a bot revision
+
+        Args:
+            bot_id: Stable bot identifier
+            updated_at: Bot revision timestamp (changes on every edit)
+            model_config: LLM config the chain is bound to
+
+        Returns:
+            Hashable cache key
+        """
+        return bot_id, updated_at, json.dumps(model_config or {}, sort_keys=True, default=str)
+
+    @classmethod
+    def get_or_create(cls, bot_id, updated_at, model_config, builder):
+        """
+        Return the cached chain for this bot revision, building it with `builder` on a miss
+
+        Args:
+            bot_id: Stable bot identifier
+            updated_at: Bot revision timestamp
+            model_config: LLM config the chain is bound to
+            builder: Zero-argument callable that compiles the chain
+
+        Returns:
+            Compiled dialog chain
+        """
+        key = cls.make_key(bot_id, updated_at, model_config)
+
+        with cls._lock:
+            chain = cls._chains.get(key)
+            if chain is not None:
+                cls._chains.move_to_end(key)
+                return chain
+
+        # Build outside the lock so a slow build doesn't block other sessions
+        chain = builder()
+
+        with cls._lock:
+            # Older revisions of this bot can never be hit again
+            for stale_key in [k for k in cls._chains if k[0] == bot_id and k != key]:
+                del cls._chains[stale_key]
+
+            cls._chains[key] = chain
+            cls._chains.move_to_end(key)
+            while len(cls._chains) > cls.MAX_ENTRIES:
+                cls._chains.popitem(last=False)
+
+        print(f"DEBUG: Compiled dialog chain for bot {bot_id} (cached chains: {len(cls._chains)})")
+        return chain
+
+    @classmethod
+    def invalidate(cls, bot_id):
+        """Drop every cached chain for a bot"""
+        with cls._lock:
+            for key in [k for k in cls._chains if k[0] == bot_id]:
+                del cls._chains[key]
+
+    @classmethod
+    def clear(cls):
+        """Drop all cached chains"""
+        with cls._lock:
+            cls._chains.clear()
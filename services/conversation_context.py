@@ -0,0 +1,76 @@
+"""
+Reuse of Ollama's evaluated conversation state between turns.
+/api/generate returns a `context` token array covering the prompt and reply; sending it back with only the
+new user turn lets the model skip re-evaluating the system prompt and history.
+The context is stored in the bot's memory and dropped whenever history is rewritten.
+"""
+import json
+
+from config import MEMORY_CONFIG
+from services.bot_attribute_helper import BotAttributeHelper
+
+
+class ConversationContext:
+    """Stores the last Ollama context per conversation memory"""
+
+    @staticmethod
+    def fingerprint(bot, model_config: dict) -> str:
+        """
+        Identify what a context was evaluated against
+
+        Args:
+            bot: Bot object or dict (bot revision changes the system prompt)
+            model_config: Effective model config
+
+        Returns:
+            String that changes whenever a stored context can no longer be reused
+        """
+        return json.dumps([
+            BotAttributeHelper.get_bot_attr(bot, 'bot_id') if bot else None,
+            BotAttributeHelper.get_bot_attr(bot, 'updated_at') if bot else None,
+            model_config
+        ], sort_keys=True, default=str)
+
+    @staticmethod
+    def get(memory: dict, fingerprint: str, turn_tokens: int, model_config: dict):
+        """
+        Return the stored context if it can take one more turn, otherwise drop it
+
+        Args:
+            memory: Conversation memory dict
+            fingerprint: Current fingerprint (see fingerprint())
+            turn_tokens: Tokens in the new user turn
+            model_config: Effective model config (uses num_ctx and num_predict)
+
+        Returns:
+            Ollama context token list, or None when the full prompt must be rebuilt
+        """
+        stored = memory.get('ollama_context')
+        if not stored:
+            return None
+
+        if stored['fingerprint'] != fingerprint:
+            ConversationContext.invalidate(memory)
+            return None
+
+        num_ctx = model_config.get("num_ctx", 2048)
+        reply_reserve = min(model_config.get("num_predict", 0), num_ctx // 2)
+        needed = len(stored['tokens']) + turn_tokens + reply_reserve + MEMORY_CONFIG.get("reserve_tokens", 0)
+        if needed > num_ctx:
+            # Full: rebuild from the token-budgeted history and summary instead of letting Ollama truncate
+            print(f"DEBUG: Ollama context full ({len(stored['tokens'])} tokens), rebuilding prompt")
+            ConversationContext.invalidate(memory)
+            return None
+
+        return stored['tokens']
+
+    @staticmethod
+    def store(memory: dict, fingerprint: str, tokens):
+        """Remember the context returned by the last completed turn"""
+        if tokens:
+            memory['ollama_context'] = {'fingerprint': fingerprint, 'tokens': tokens}
+
+    @staticmethod
+    def invalidate(memory: dict):
+        """Forget the stored context (history was edited, deleted or cleared)"""
+        memory.pop('ollama_context', None)
@@ -0,0 +1,280 @@
+"""
+Persistent conversation store: chats and their messages in SQLite (WAL mode).
+Every change to a stored ConversationLog is written through as it happens, so a session only needs
+the chat it has open in memory: the sidebar reads conversation headers, and the chat page loads the
+most recent window of messages, with earlier ones fetched on demand.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from config import CONVERSATION_STORE_CONFIG
+from models.conversation import ConversationLog, Message
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    bot_name TEXT NOT NULL,
+    next_id INTEGER NOT NULL DEFAULT 1,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    summary TEXT NOT NULL DEFAULT '',
+    memory_from INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (owner, bot_name)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    conversation_id INTEGER NOT NULL REFERENCES conversations (id) ON DELETE CASCADE,
+    message_id INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    parent_id INTEGER,
+    created_at REAL NOT NULL,
+    meta TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (conversation_id, message_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS conversations_by_owner ON conversations (owner, updated_at);
+"""
+
+
+class StoredConversation:
+    """Observer attached to a loaded ConversationLog; writes each change through to the store"""
+
+    def __init__(self, store: 'ConversationStore', owner: str, bot_name: str, conversation_id: int = None):
+        self.store = store
+        self.owner = owner
+        self.bot_name = bot_name
+        self.conversation_id = conversation_id  # Created with the first message
+
+    def message_added(self, log: ConversationLog, message: Message) -> Optional[int]:
+        return self.store._insert(self, log, message)
+
+    def message_updated(self, log: ConversationLog, message: Message):
+        self.store._update(self, message)
+
+    def messages_removed(self, log: ConversationLog, from_id: Optional[int]):
+        self.store._remove(self, from_id)
+
+
+class ConversationStore:
+    """Conversation headers and messages of every chat, keyed by (owner, bot_name)"""
+
+    def __init__(self, sqlite_path: str, window: int = 50):
+        self.window = window
+        self._lock = threading.Lock()
+        self._db = self._open_db(sqlite_path)
+
+    @staticmethod
+    def _open_db(sqlite_path: str):
+        """Open (and create if needed) the database in WAL mode"""
+        directory = os.path.dirname(sqlite_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(sqlite_path, check_same_thread=False)
+        # WAL lets readers (other processes, backups) run alongside the write-through appends;
+        # NORMAL sync is durable across app crashes and only fsyncs at checkpoints
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("PRAGMA foreign_keys=ON")
+        db.executescript(_SCHEMA)
+        db.commit()
+        return db
+
+    # ---- reads ----
+
+    def headers(self, owner: str) -> List[dict]:
+        """
+        Conversation headers for the sidebar, most recently active first (no messages are loaded)
+
+        Returns:
+            [{"bot_name", "message_count", "updated_at"}]
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT bot_name, message_count, updated_at FROM conversations "
+                "WHERE owner = ? AND message_count > 0 ORDER BY updated_at DESC", (owner,)
+            ).fetchall()
+        return [{"bot_name": name, "message_count": count, "updated_at": updated} for name, count, updated in rows]
+
+    def load(self, owner: str, bot_name: str) -> Tuple[ConversationLog, str, int]:
+        """
+        Open a chat: its most recent window of messages, bound to the store for write-through
+
+        Returns:
+            (log, summary, memory_from): the log is empty for a new chat; summary and memory_from
+            (id of the oldest message still in conversation memory) are as last saved by save_memory
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, next_id, message_count, summary, memory_from FROM conversations "
+                "WHERE owner = ? AND bot_name = ?", (owner, bot_name)
+            ).fetchone()
+            if row is None:
+                log, summary, memory_from, conversation_id = ConversationLog(), "", 0, None
+            else:
+                conversation_id, next_id, count, summary, memory_from = row
+                messages = self._fetch(conversation_id, None, self.window)
+                log = ConversationLog(messages, next_id, earlier=max(0, count - len(messages)))
+        log.observer = StoredConversation(self, owner, bot_name, conversation_id)
+        return log, summary, memory_from
+
+    def load_earlier(self, log: ConversationLog, count: int = None) -> int:
+        """
+        Prepend up to count messages older than the first loaded one
+
+        Returns:
+            Number of messages loaded
+        """
+        binding = log.observer
+        if not isinstance(binding, StoredConversation) or binding.conversation_id is None or not log.earlier:
+            return 0
+        before = log[0].id if len(log) else log.next_id
+        with self._lock:
+            messages = self._fetch(binding.conversation_id, before, count or self.window)
+        log.prepend(messages)
+        if len(messages) < (count or self.window):
+            log.earlier = 0
+        return len(messages)
+
+    def _fetch(self, conversation_id: int, before_id: Optional[int], limit: int) -> List[Message]:
+        """Up to limit messages before before_id (or the newest ones), oldest first; caller holds the lock"""
+        rows = self._db.execute(
+            "SELECT message_id, role, content, parent_id, created_at, meta FROM messages "
+            "WHERE conversation_id = ? AND message_id < ? ORDER BY message_id DESC LIMIT ?",
+            (conversation_id, before_id if before_id is not None else 2 ** 62, limit)
+        ).fetchall()
+        return [Message(message_id, role, content, parent_id, created_at, json.loads(meta))
+                for message_id, role, content, parent_id, created_at, meta in reversed(rows)]
+
+    # ---- writes ----
+
+    def _write(self, description: str, statements):
+        """Run (sql, params) statements in one transaction; failures are logged, the chat keeps working"""
+        with self._lock:
+            try:
+                with self._db:
+                    for sql, params in statements:
+                        self._db.execute(sql, params)
+            except sqlite3.Error as e:
+                print(f"WARNING: Conversation store {description} failed: {e}")
+
+    def _conversation_id(self, binding: StoredConversation) -> Optional[int]:
+        """Id of the conversation row, creating it on first write"""
+        if binding.conversation_id is None:
+            now = time.time()
+            with self._lock:
+                try:
+                    with self._db:
+                        self._db.execute(
+                            "INSERT OR IGNORE INTO conversations (owner, bot_name, created_at, updated_at) "
+                            "VALUES (?, ?, ?, ?)", (binding.owner, binding.bot_name, now, now)
+                        )
+                        binding.conversation_id = self._db.execute(
+                            "SELECT id FROM conversations WHERE owner = ? AND bot_name = ?",
+                            (binding.owner, binding.bot_name)
+                        ).fetchone()[0]
+                except sqlite3.Error as e:
+                    print(f"WARNING: Conversation store create failed: {e}")
+        return binding.conversation_id
+
+    def _insert(self, binding: StoredConversation, log: ConversationLog, message: Message) -> Optional[int]:
+        """
+        Store a new message under an id allocated here, so two sessions appending to the same chat
+        never reuse one (a plain INSERT makes any remaining collision fail instead of overwriting)
+
+        Returns:
+            The stored message id, or None if the write failed
+        """
+        conversation_id = self._conversation_id(binding)
+        if conversation_id is None:
+            return None
+        with self._lock:
+            try:
+                with self._db:
+                    # IMMEDIATE takes the write lock before reading, so other processes can't allocate the same id
+                    self._db.execute("BEGIN IMMEDIATE")
+                    next_id, max_id = self._db.execute(
+                        "SELECT next_id, (SELECT COALESCE(MAX(message_id), 0) FROM messages WHERE conversation_id = ?) "
+                        "FROM conversations WHERE id = ?", (conversation_id, conversation_id)
+                    ).fetchone()
+                    message_id = max(message.id, next_id, max_id + 1)
+                    self._db.execute(
+                        "INSERT INTO messages (conversation_id, message_id, role, content, parent_id, created_at, meta) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (conversation_id, message_id, message.role, message.content, message.parent_id,
+                         message.created_at, json.dumps(message.meta))
+                    )
+                    self._db.execute(
+                        "UPDATE conversations SET next_id = ?, message_count = message_count + 1, updated_at = ? "
+                        "WHERE id = ?", (message_id + 1, time.time(), conversation_id)
+                    )
+                return message_id
+            except sqlite3.Error as e:
+                print(f"WARNING: Conversation store append failed: {e}")
+                return None
+
+    def _update(self, binding: StoredConversation, message: Message):
+        if binding.conversation_id is None:
+            return
+        self._write("update", [
+            ("UPDATE messages SET content = ?, meta = ? WHERE conversation_id = ? AND message_id = ?",
+             (message.content, json.dumps(message.meta), binding.conversation_id, message.id)),
+        ])
+
+    def _remove(self, binding: StoredConversation, from_id: Optional[int]):
+        if binding.conversation_id is None:
+            return
+        conversation_id = binding.conversation_id
+        statements = [
+            ("DELETE FROM messages WHERE conversation_id = ? AND message_id >= ?", (conversation_id, from_id or 0)),
+            ("UPDATE conversations SET updated_at = ?, "
+             "message_count = (SELECT COUNT(*) FROM messages WHERE conversation_id = ?) WHERE id = ?",
+             (time.time(), conversation_id, conversation_id)),
+        ]
+        if from_id is None:
+            # Cleared chat: the saved memory summary no longer applies
+            statements.append(("UPDATE conversations SET summary = '', memory_from = 0 WHERE id = ?",
+                               (conversation_id,)))
+        self._write("truncate", statements)
+
+    def save_memory(self, owner: str, bot_name: str, summary: str, memory_from: int):
+        """
+        Keep a chat's memory state so it can be rebuilt after unloading or a restart
+
+        Args:
+            owner: Chat owner
+            bot_name: Chat bot
+            summary: Running summary of the messages evicted from memory
+            memory_from: Id of the oldest message still in memory (older ones are covered by the summary)
+        """
+        self._write("memory", [
+            ("UPDATE conversations SET summary = ?, memory_from = ? WHERE owner = ? AND bot_name = ?",
+             (summary or "", memory_from, owner, bot_name)),
+        ])
+
+    def delete(self, owner: str, bot_name: str):
+        """Delete a chat and all of its messages"""
+        self._write("delete", [
+            ("DELETE FROM conversations WHERE owner = ? AND bot_name = ?", (owner, bot_name)),
+        ])
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def get_conversation_store() -> Optional[ConversationStore]:
+    """Return the process-wide conversation store, or None if persistence is disabled or unavailable"""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None and CONVERSATION_STORE_CONFIG.get("sqlite_path"):
+            try:
+                _shared_store = ConversationStore(**CONVERSATION_STORE_CONFIG)
+            except sqlite3.Error as e:
+                print(f"WARNING: Conversation store unavailable, chats are kept in memory only: {e}")
+                CONVERSATION_STORE_CONFIG["sqlite_path"] = None
+        return _shared_store
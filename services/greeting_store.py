@@ -0,0 +1,195 @@
+"""
+Warm pool of pregenerated greetings for bots without a fixed personality["greeting"].
+A background worker fills each bot's pool at startup and after a bot is created or edited, the pools are
+persisted to disk, and the chat page takes a greeting instantly, triggering a refill when a pool runs low.
+"""
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import GREETING_POOL_CONFIG
+from services.bot_attribute_helper import BotAttributeHelper
+from services.llm_scheduler import Priority, get_llm_scheduler
+from services.model_router import ModelRouter
+
+# One worker: pregeneration is background work and should not fan out against Ollama
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="greeting-pregen")
+
+
+class GreetingStore:
+    """Process-wide greeting pools keyed by bot, invalidated by a hash of the greeting prompt"""
+
+    _pools = None  # key -> {"revision": str, "greetings": [str]}
+    _pending = set()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def build_prompt(bot):
+        """
+        Build the greeting prompt for a bot
+
+        Args:
+            bot: Bot object or dict
+
+        Returns:
+            (prompt, bot_context) tuple
+        """
+        get = BotAttributeHelper.get_bot_attr
+        bot_name = get(bot, 'name', 'StoryBot')
+        personality = get(bot, 'personality', {}) or {}
+
+        tone = get(personality, 'tone', 'neutral')
+        quirks = get(personality, 'quirks', [])
+        if isinstance(quirks, str):
+            quirks = [q.strip() for q in quirks.split(',') if q.strip()]
+
+        scenario = get(bot, 'scenario', '')
+        scenario_context = f"this Is the situation: {scenario}" if scenario else ""
+
+        prompt = f"""
+                    As {bot_name}, create a friendly 4-5 sentence greeting that:
+                    - Uses your emoji {get(bot, 'emoji', '🤖')}
+                    - Mentions your name
+                    - Reflects your personality tone: {tone}
+                    - Includes one of your quirks: {', '.join(quirks) if quirks else 'none'}{scenario_context}
+                    - Thoughts appear in italics format
+                    - Dialogue in double quotes like "this"
+                    Only return the output,response
+                    """
+        return prompt, get(bot, "desc", "A helpful AI assistant")
+
+    @staticmethod
+    def needs_generated_greeting(bot) -> bool:
+        """True if the bot has no fixed greeting of its own"""
+        personality = BotAttributeHelper.get_bot_attr(bot, 'personality', {}) or {}
+        return not BotAttributeHelper.get_bot_attr(personality, 'greeting', '')
+
+    @staticmethod
+    def _key(bot) -> str:
+        return BotAttributeHelper.get_bot_attr(bot, 'bot_id') or BotAttributeHelper.get_bot_attr(bot, 'name')
+
+    @staticmethod
+    def _revision(bot) -> str:
+        """Changes whenever an edit changes what the greeting prompt (or the bot's model) would produce"""
+        prompt, bot_context = GreetingStore.build_prompt(bot)
+        payload = json.dumps([prompt, bot_context, ModelRouter.resolve_config(bot)], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    # ---- persistence ----
+
+    @classmethod
+    def _load(cls):
+        """Load persisted pools on first use (called with the lock held)"""
+        if cls._pools is not None:
+            return
+        cls._pools = {}
+        path = GREETING_POOL_CONFIG["path"]
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cls._pools = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"WARNING: Could not load greeting pool: {e}")
+
+    @classmethod
+    def _save(cls):
+        """Write the pools atomically (called with the lock held)"""
+        path = GREETING_POOL_CONFIG["path"]
+        if not path:
+            return
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(cls._pools, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"WARNING: Could not save greeting pool: {e}")
+
+    # ---- public API ----
+
+    @classmethod
+    def take(cls, bot):
+        """
+        Pop a pregenerated greeting for a bot, scheduling a refill if the pool runs low
+
+        Args:
+            bot: Bot object or dict
+
+        Returns:
+            Greeting text, or None if the pool is empty
+        """
+        key, revision = cls._key(bot), cls._revision(bot)
+        with cls._lock:
+            cls._load()
+            pool = cls._pools.get(key)
+            greeting = None
+            if pool and pool["revision"] == revision and pool["greetings"]:
+                greeting = pool["greetings"].pop(0)
+                cls._save()
+            remaining = len(pool["greetings"]) if pool and pool["revision"] == revision else 0
+
+        if remaining < GREETING_POOL_CONFIG["refill_below"]:
+            cls.schedule(bot)
+        return greeting
+
+    @classmethod
+    def schedule(cls, bot):
+        """Queue a background fill of a bot's pool (no-op for bots with a fixed greeting)"""
+        if not bot or not cls.needs_generated_greeting(bot):
+            return
+
+        # Keyed by revision too, so an edit made while an old fill runs still gets its own fill
+        job = (cls._key(bot), cls._revision(bot))
+        with cls._lock:
+            if job in cls._pending:
+                return
+            cls._pending.add(job)
+        _executor.submit(cls._fill, bot, job)
+
+    @classmethod
+    def warm(cls, bots):
+        """Schedule fills for every bot that needs generated greetings"""
+        for bot in bots:
+            cls.schedule(bot)
+
+    @classmethod
+    def _fill(cls, bot, job):
+        """Worker: generate greetings until the bot's pool is full"""
+        key, revision = job
+        try:
+            with cls._lock:
+                cls._load()
+                pool = cls._pools.get(key)
+                if not pool or pool["revision"] != revision:
+                    # New bot or edited bot: old greetings no longer match
+                    pool = cls._pools[key] = {"revision": revision, "greetings": []}
+                missing = GREETING_POOL_CONFIG["pool_size"] - len(pool["greetings"])
+
+            if missing <= 0:
+                return
+
+            prompt, bot_context = cls.build_prompt(bot)
+            llm = ModelRouter.llm_for_bot(bot)
+            for _ in range(missing):
+                with get_llm_scheduler().slot_sync(Priority.GREETING):
+                    greeting = llm.invoke(f"{bot_context}\n\n{prompt}").strip()
+                if not greeting:
+                    continue
+                with cls._lock:
+                    # Skip if the bot was edited while we were generating
+                    if cls._pools.get(key, {}).get("revision") == revision:
+                        cls._pools[key]["greetings"].append(greeting)
+                        cls._save()
+
+            print(f"DEBUG: Greeting pool for {BotAttributeHelper.get_bot_attr(bot, 'name')} filled")
+        except Exception as e:
+            print(f"ERROR: Greeting pregeneration failed: {str(e)}")
+        finally:
+            with cls._lock:
+                cls._pending.discard(job)
@@ -2,7 +2,6 @@ import os
 import uuid
 from datetime import datetime
 import streamlit as st
-from PIL import Image
 import io
 
 
@@ -35,6 +34,7 @@ class ImageService:
 
         # Verify it's actually an image
         try:
+            from PIL import Image  # Loaded on first upload rather than at app start
             image = Image.open(io.BytesIO(uploaded_file.getvalue()))
             image.verify()  # Verify that it is, in fact, an image
             return True
@@ -63,6 +63,7 @@ class ImageService:
             filepath = os.path.join(self.upload_dir, filename)
 
             # Read and process the image
+            from PIL import Image
             image = Image.open(io.BytesIO(uploaded_file.getvalue()))
 
             # Resize image if too large (max 400x400)
@@ -118,6 +119,7 @@ class ImageService:
         """Get image preview for display"""
         if file_info and "filepath" in file_info and os.path.exists(file_info["filepath"]):
             try:
+                from PIL import Image
                 image = Image.open(file_info["filepath"])
                 return image
             except Exception as e:
@@ -0,0 +1,250 @@
+"""
+Process-wide priority scheduler for LLM calls.
+Every Streamlit session runs its own event loop on its own thread, so slots are granted across threads:
+at most max_concurrency calls reach Ollama at once and waiting calls are served by priority, then FIFO.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from enum import IntEnum
+
+from config import LLM_SCHEDULER_CONFIG
+from services.cancellation import CancelToken, GenerationCancelled
+from services.metrics import get_metrics
+
+
+class Priority(IntEnum):
+    """Priority classes, lower value is served first"""
+    CHAT = 0
+    GREETING = 1
+    ENHANCE = 2
+    BATCH = 3
+
+
+class _Waiter:
+    """A queued request for a slot, woken on its own event loop or thread"""
+
+    __slots__ = ("priority", "loop", "future", "event", "queued_at", "cancelled")
+
+    def __init__(self, priority: Priority, loop=None):
+        self.priority = priority
+        self.loop = loop
+        self.future = loop.create_future() if loop else None
+        self.event = None if loop else threading.Event()
+        self.queued_at = time.perf_counter()
+        self.cancelled = False
+
+
+class LLMScheduler:
+    """Bounded-concurrency, priority-ordered gate shared by every session"""
+
+    def __init__(self, max_concurrency: int = 1, wait_samples: int = 200):
+        self.max_concurrency = max(1, max_concurrency)
+        self._lock = threading.Lock()
+        self._queue = []  # heap of (priority, seq, waiter)
+        self._seq = itertools.count()
+        self._active = 0
+        self._waits = {priority: deque(maxlen=wait_samples) for priority in Priority}
+        self._completed = {priority: 0 for priority in Priority}
+        # Cancelled while waiting (never reached Ollama) / while running (slot freed early)
+        self._cancelled_queued = {priority: 0 for priority in Priority}
+        self._cancelled_running = {priority: 0 for priority in Priority}
+
+    # ---- acquire / release ----
+
+    def _try_acquire(self, waiter: _Waiter) -> bool:
+        """Take a slot now if one is free and nobody more urgent is waiting; otherwise enqueue"""
+        with self._lock:
+            while self._queue and self._queue[0][2].cancelled:
+                heapq.heappop(self._queue)
+            if self._active < self.max_concurrency and not self._queue:
+                self._active += 1
+                return True
+            heapq.heappush(self._queue, (waiter.priority, next(self._seq), waiter))
+            return False
+
+    def _release(self):
+        """Free a slot and hand it to the most urgent live waiter"""
+        with self._lock:
+            self._active -= 1
+            while self._queue and self._active < self.max_concurrency:
+                _, _, waiter = heapq.heappop(self._queue)
+                if waiter.cancelled:
+                    continue
+                self._active += 1
+                self._wake(waiter)
+
+    def _wake(self, waiter: _Waiter):
+        """Grant a slot to a waiter (called with the lock held)"""
+        if waiter.event is not None:
+            waiter.event.set()
+            return
+        try:
+            waiter.loop.call_soon_threadsafe(self._deliver, waiter)
+        except RuntimeError:
+            # The waiter's event loop is closed: nobody will use the slot
+            self._active -= 1
+
+    def _deliver(self, waiter: _Waiter):
+        """Runs on the waiter's loop; gives the slot back if the waiter gave up meanwhile"""
+        if waiter.future.done():
+            self._release()
+        else:
+            waiter.future.set_result(None)
+
+    def _record_wait(self, waiter: _Waiter) -> float:
+        waited = time.perf_counter() - waiter.queued_at
+        with self._lock:
+            self._waits[waiter.priority].append(waited)
+            self._completed[waiter.priority] += 1
+        return waited
+
+    def _count_cancel(self, priority: Priority, running: bool):
+        with self._lock:
+            counts = self._cancelled_running if running else self._cancelled_queued
+            counts[priority] += 1
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.BATCH, cancel_token: CancelToken = None):
+        """
+        Hold one LLM slot for the duration of the block
+
+        Args:
+            priority: Priority class of the call
+            cancel_token: Optional token; cancelling it while queued gives up the place in line
+
+        Yields:
+            Seconds spent waiting for the slot
+        """
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(priority, loop)
+        if not self._try_acquire(waiter):
+            if cancel_token is not None:
+                cancel_token.on_cancel(lambda: self._cancel_waiter(waiter))
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                with self._lock:
+                    waiter.cancelled = True
+                    granted = waiter.future.done() and not waiter.future.cancelled()
+                if granted:
+                    self._release()
+                # Otherwise either still queued (skipped on release) or _deliver returns the slot
+                self._count_cancel(priority, running=False)
+                if cancel_token is not None and cancel_token.cancelled:
+                    raise GenerationCancelled(cancel_token.reason) from None
+                raise
+
+        waited = self._record_wait(waiter)
+        try:
+            yield waited
+        finally:
+            if cancel_token is not None and cancel_token.cancelled:
+                self._count_cancel(priority, running=True)
+            self._release()
+
+    @staticmethod
+    def _cancel_waiter(waiter: _Waiter):
+        """Wake a queued async waiter with a cancellation (from any thread)"""
+        def cancel():
+            if not waiter.future.done():
+                waiter.future.cancel()
+        try:
+            waiter.loop.call_soon_threadsafe(cancel)
+        except RuntimeError:
+            pass
+
+    @contextmanager
+    def slot_sync(self, priority: Priority = Priority.BATCH, cancel_token: CancelToken = None):
+        """
+        Blocking variant of slot() for worker threads and synchronous callers.
+        Do not call it from a coroutine whose own event loop is holding a slot in another task.
+        """
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+
+        waiter = _Waiter(priority)
+        if not self._try_acquire(waiter):
+            if cancel_token is not None:
+                cancel_token.on_cancel(waiter.event.set)
+            waiter.event.wait()
+
+            if cancel_token is not None and cancel_token.cancelled:
+                with self._lock:
+                    # The event may have been set by a grant that raced the cancellation
+                    granted = not any(queued is waiter for _, _, queued in self._queue)
+                    waiter.cancelled = True
+                if granted:
+                    self._release()
+                self._count_cancel(priority, running=False)
+                raise GenerationCancelled(cancel_token.reason)
+
+        waited = self._record_wait(waiter)
+        try:
+            yield waited
+        finally:
+            if cancel_token is not None and cancel_token.cancelled:
+                self._count_cancel(priority, running=True)
+            self._release()
+
+    # ---- metrics ----
+
+    def stats(self) -> dict:
+        """
+        Snapshot of scheduler load
+
+        Returns:
+            Dict with in_flight, queue_depth per priority and wait-time summaries per priority
+        """
+        with self._lock:
+            depth = {priority.name.lower(): 0 for priority in Priority}
+            for priority, _, waiter in self._queue:
+                if not waiter.cancelled:
+                    depth[Priority(priority).name.lower()] += 1
+
+            waits = {}
+            for priority, samples in self._waits.items():
+                ordered = sorted(samples)
+                waits[priority.name.lower()] = {
+                    "count": self._completed[priority],
+                    "avg_ms": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+                    "p95_ms": ordered[int(0.95 * (len(ordered) - 1))] * 1000 if ordered else 0.0,
+                    "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+                    "cancelled_queued": self._cancelled_queued[priority],
+                    "cancelled_running": self._cancelled_running[priority],
+                }
+
+            return {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._active,
+                "queue_depth": depth,
+                "wait": waits,
+            }
+
+    def collect_metrics(self, metrics):
+        """Metrics collector: publish slot usage and queue depth as gauges"""
+        stats = self.stats()
+        metrics.set("llm_in_flight", stats["in_flight"])
+        for priority, depth in stats["queue_depth"].items():
+            metrics.set("llm_queue_depth", depth, priority=priority)
+
+
+_shared_scheduler = None
+_shared_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Return the process-wide scheduler, creating it on first use"""
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = LLMScheduler(**LLM_SCHEDULER_CONFIG)
+            get_metrics().add_collector(_shared_scheduler.collect_metrics)
+        return _shared_scheduler
@@ -0,0 +1,229 @@
+"""
+Per-bot conversation memory kept in session state.
+Each chat owns its own bounded memory, keyed by bot_id, so switching chats is a dictionary lookup
+and clearing or editing one chat never touches another bot's prompt.
+A memory's chat_history is a ConversationWindow over the chat's ConversationLog (kept in
+st.session_state.chat_histories by bot name), so truncating or editing the log updates memory too.
+With the conversation store enabled only the open chat is kept in session state; the others live
+in SQLite and are reloaded, memory included, when opened again.
+Stored chats belong to a generated user id kept in the ?uid= query param, so a reload or bookmark
+reopens them and other visitors never see them.
+"""
+import re
+import uuid
+
+import streamlit as st
+
+from config import MEMORY_CONFIG, get_default_bots
+from models.conversation import ConversationLog, ConversationWindow
+from services.bot_attribute_helper import BotAttributeHelper
+from services.conversation_store import get_conversation_store
+from services.memory_summarizer import MemorySummarizer
+from services.conversation_context import ConversationContext
+
+_OWNER_PARAM = "uid"
+_OWNER_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class MemoryStore:
+    """Session-scoped store of conversation memories keyed by bot_id"""
+
+    @staticmethod
+    def new_memory() -> dict:
+        """Create an empty conversation memory"""
+        return {
+            'chat_history': ConversationWindow(),
+            'window_size': MEMORY_CONFIG['window_size'],
+            'mode': MEMORY_CONFIG['mode'],
+            'summary': ""
+        }
+
+    @staticmethod
+    def _memories() -> dict:
+        if 'memories' not in st.session_state:
+            st.session_state.memories = {}
+        return st.session_state.memories
+
+    @staticmethod
+    def _owner() -> str:
+        """Whose chats these are in the conversation store: this browser's user id, created on first use"""
+        owner = st.session_state.get('user_id')
+        if owner is None:
+            owner = st.query_params.get(_OWNER_PARAM, "")
+            if not _OWNER_PATTERN.match(owner):
+                owner = uuid.uuid4().hex
+                st.query_params[_OWNER_PARAM] = owner
+            st.session_state.user_id = owner
+        return owner
+
+    @staticmethod
+    def _unloaded() -> dict:
+        """Memories of unloaded chats whose summary folds are still running, by memory key"""
+        if 'unloaded_memories' not in st.session_state:
+            st.session_state.unloaded_memories = {}
+        return st.session_state.unloaded_memories
+
+    @staticmethod
+    def log(bot_name: str) -> ConversationLog:
+        """Return the conversation log of a chat, loading (or creating) it on first use"""
+        if 'chat_histories' not in st.session_state:
+            st.session_state.chat_histories = {}
+        chat_log = st.session_state.chat_histories.get(bot_name)
+        if chat_log is not None:
+            return chat_log
+
+        store = get_conversation_store()
+        if store is None:
+            chat_log = st.session_state.chat_histories[bot_name] = ConversationLog()
+            return chat_log
+
+        chat_log, summary, memory_from = store.load(MemoryStore._owner(), bot_name)
+        st.session_state.chat_histories[bot_name] = chat_log
+
+        # Reopened before its summary folds finished: keep that memory so their results land in it
+        key = MemoryStore.key_for_name(bot_name)
+        memory = MemoryStore._unloaded().pop(key, None)
+        if memory is not None:
+            memory.pop('unloaded', None)
+            memory['chat_history'].clear()
+            MemoryStore._memories()[key] = memory
+        else:
+            memory = MemoryStore.get(key)
+
+        # Rebuild memory: the messages it held (within the loaded window) plus the summary of older ones
+        if not len(memory['chat_history']):
+            for message in chat_log:
+                if message.id >= memory_from:
+                    memory['chat_history'].add(message)
+            memory['summary'] = memory.get('summary') or summary
+        return chat_log
+
+    @staticmethod
+    def open_chat(bot_name: str) -> ConversationLog:
+        """
+        Make bot_name the open chat: with the conversation store enabled every other chat is unloaded
+        from session state (it is already persisted), then this one is loaded
+        """
+        if get_conversation_store() is not None:
+            for other in [name for name in st.session_state.get('chat_histories', {}) if name != bot_name]:
+                MemoryStore._unload(other)
+        return MemoryStore.log(bot_name)
+
+    @staticmethod
+    def _unload(bot_name: str):
+        """Drop one chat's log and memory from session state, saving its memory state to the store"""
+        store = get_conversation_store()
+        owner = MemoryStore._owner()
+        chat_log = st.session_state.chat_histories.pop(bot_name)
+        key = MemoryStore.key_for_name(bot_name)
+        memory = MemoryStore._memories().pop(key, None)
+        print(f"DEBUG: Unloaded chat {bot_name}")
+        if memory is None:
+            return
+        memory_from = MemoryStore._memory_from(memory, chat_log)
+        store.save_memory(owner, bot_name, MemorySummarizer.story_so_far(memory), memory_from)
+        if not memory.get('pending_summary'):
+            return
+
+        # Let queued folds finish instead of discarding them, then save the summary they produced
+        unloaded = MemoryStore._unloaded()
+        unloaded[key] = memory
+        memory['unloaded'] = True
+
+        def save_folded(folded: dict):
+            if folded.get('unloaded'):  # Not reopened meanwhile
+                store.save_memory(owner, bot_name, MemorySummarizer.story_so_far(folded), memory_from)
+                if unloaded.get(key) is folded:
+                    del unloaded[key]
+
+        MemorySummarizer.when_folded(memory, save_folded)
+
+    @staticmethod
+    def _memory_from(memory: dict, chat_log: ConversationLog) -> int:
+        """Id of the oldest message still in memory (the next id if memory holds none)"""
+        entries = memory['chat_history'].entries
+        return entries[0].id if entries else chat_log.next_id
+
+    @staticmethod
+    def save(bot_name: str, memory: dict):
+        """Persist a chat's memory state (summary and window start) to the conversation store"""
+        store = get_conversation_store()
+        chat_log = st.session_state.get('chat_histories', {}).get(bot_name)
+        if store is None or chat_log is None:
+            return
+        store.save_memory(MemoryStore._owner(), bot_name, MemorySummarizer.story_so_far(memory),
+                          MemoryStore._memory_from(memory, chat_log))
+
+    @staticmethod
+    def chat_names() -> list:
+        """Names of the bots this user has chats with, most recently active first"""
+        loaded = [name for name, chat_log in st.session_state.get('chat_histories', {}).items() if len(chat_log)]
+        store = get_conversation_store()
+        if store is None:
+            return loaded
+        names = [header['bot_name'] for header in store.headers(MemoryStore._owner())]
+        return names + [name for name in loaded if name not in names]
+
+    @staticmethod
+    def delete_chat(bot_name: str):
+        """Delete a chat: its log, its memory and its stored messages"""
+        st.session_state.get('chat_histories', {}).pop(bot_name, None)
+        key = MemoryStore.key_for_name(bot_name)
+        MemoryStore.delete(key)
+        unloaded = MemoryStore._unloaded().pop(key, None)
+        if unloaded is not None:
+            unloaded.pop('unloaded', None)  # Its pending summary must not be saved into a new chat
+        store = get_conversation_store()
+        if store is not None:
+            store.delete(MemoryStore._owner(), bot_name)
+
+    @staticmethod
+    def key(bot, bot_name: str = None) -> str:
+        """
+        Memory key for a bot
+
+        Args:
+            bot: Bot object or dict (may be None)
+            bot_name: Fallback when the bot has no id
+
+        Returns:
+            bot_id, or the bot name for bots without one
+        """
+        return BotAttributeHelper.get_bot_attr(bot, 'bot_id') or bot_name
+
+    @staticmethod
+    def key_for_name(bot_name: str) -> str:
+        """Resolve a bot name to its memory key"""
+        all_bots = get_default_bots() + st.session_state.get('user_bots', [])
+        return MemoryStore.key(BotAttributeHelper.find_bot_by_name(bot_name, all_bots), bot_name)
+
+    @staticmethod
+    def get(key: str) -> dict:
+        """Return the memory for a key, creating it on first use"""
+        memories = MemoryStore._memories()
+        memory = memories.get(key)
+        if memory is None:
+            memory = memories[key] = MemoryStore.new_memory()
+        return memory
+
+    @staticmethod
+    def for_bot_name(bot_name: str) -> dict:
+        """Return the memory of the bot with this name"""
+        return MemoryStore.get(MemoryStore.key_for_name(bot_name))
+
+    @staticmethod
+    def clear(key: str):
+        """Empty one bot's memory, including its running summary"""
+        memory = MemoryStore._memories().get(key)
+        if memory is not None:
+            memory['chat_history'].clear()
+            MemorySummarizer.reset(memory)
+            ConversationContext.invalidate(memory)
+
+    @staticmethod
+    def delete(key: str):
+        """Drop one bot's memory entirely"""
+        memory = MemoryStore._memories().pop(key, None)
+        if memory is not None:
+            # Discard results of summaries still queued for this memory
+            MemorySummarizer.reset(memory)
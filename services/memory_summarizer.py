@@ -0,0 +1,121 @@
+"""
+Rolling summarization of conversation memory.
+Messages evicted from the memory window are folded into a running "story so far" summary on a
+background worker, so the reply is never delayed and prompt length stays bounded.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from config import MEMORY_CONFIG
+from services.llm_scheduler import Priority, get_llm_scheduler
+
+# A single worker keeps summary updates for a conversation in order
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summarizer")
+
+
+class MemorySummarizer:
+    """Folds evicted exchanges into memory['summary'] in the background"""
+
+    @staticmethod
+    def story_so_far(memory: dict) -> str:
+        """
+        Text for the [Story So Far] block: the running summary plus any evicted lines
+        that are still waiting to be folded in
+
+        Args:
+            memory: Conversation memory dict
+
+        Returns:
+            Story so far text (may be empty)
+        """
+        parts = []
+        if memory.get('summary'):
+            parts.append(memory['summary'])
+        for batch in memory.get('pending_summary', []):
+            parts.extend(batch)
+        return "\n".join(parts)
+
+    @staticmethod
+    def schedule(memory: dict, evicted_lines: list, llm, bot_name: str = "AI"):
+        """
+        Queue evicted lines to be folded into the memory summary
+
+        Args:
+            memory: Conversation memory dict (updated in place by the worker)
+            evicted_lines: Formatted history lines that just left the window
+            llm: LLM used to write the summary
+            bot_name: Character name, used in the summarization prompt
+        """
+        if not evicted_lines:
+            return
+
+        # Keep the evicted lines visible until the worker has folded them in
+        batch = list(evicted_lines)
+        memory.setdefault('pending_summary', []).append(batch)
+        # Tag the job with the current generation; reset() bumps it, so a Clear Chat while the job
+        # is queued discards its result
+        generation = memory.setdefault('summary_generation', 0)
+
+        _executor.submit(MemorySummarizer._fold, memory, batch, generation, llm, bot_name)
+
+    @staticmethod
+    def when_folded(memory: dict, callback):
+        """
+        Call callback(memory) once the folds already queued for this memory are done: on the worker
+        right after them (it runs jobs in order), or now if none are pending
+        """
+        if memory.get('pending_summary'):
+            _executor.submit(callback, memory)
+        else:
+            callback(memory)
+
+    @staticmethod
+    def reset(memory: dict):
+        """Forget the summary and drop results of any queued summarization jobs"""
+        memory['summary'] = ""
+        memory['pending_summary'] = []
+        memory['summary_generation'] = memory.get('summary_generation', 0) + 1
+
+    @staticmethod
+    def _last_words(text: str, max_words: int) -> str:
+        """The last max_words words of text (line breaks kept), marked with "..." if trimmed"""
+        words = list(re.finditer(r"\S+", text))
+        if len(words) <= max_words:
+            return text
+        return "..." + text[words[-max_words].start():]
+
+    @staticmethod
+    def _fold(memory: dict, batch: list, generation: int, llm, bot_name: str):
+        """Worker: merge one batch of evicted lines into the running summary"""
+        previous = memory.get('summary', "")
+        prompt = f"""You maintain the running summary of a role-play conversation with {bot_name}.
+
+[Story So Far]
+{previous or "(nothing yet)"}
+
+[New Events]
+{chr(10).join(batch)}
+
+Rewrite the story so far so it also covers the new events.
+- Keep names, facts, promises and unresolved threads
+- Write in past tense, third person
+- At most {MEMORY_CONFIG.get('summary_max_words', 200)} words
+Return ONLY the updated summary."""
+
+        try:
+            # Background work: never delays a waiting chat reply
+            with get_llm_scheduler().slot_sync(Priority.BATCH):
+                summary = llm.invoke(prompt).strip()
+        except Exception as e:
+            print(f"ERROR: Memory summarization failed: {str(e)}")
+            # Keep the raw lines rather than losing them, trimmed to the summary budget so repeated
+            # failures can't grow the [Story So Far] block without bound
+            summary = MemorySummarizer._last_words("\n".join(filter(None, [previous] + batch)),
+                                                   MEMORY_CONFIG.get('summary_max_words', 200))
+
+        if memory.get('summary_generation', 0) != generation:
+            return
+
+        memory['summary'] = summary
+        memory['pending_summary'] = [b for b in memory.get('pending_summary', []) if b is not batch]
+        print(f"DEBUG: Folded {len(batch)} evicted messages into memory summary ({len(summary)} chars)")
@@ -0,0 +1,73 @@
+"""
+Alternative replies for assistant messages, produced by regenerate.
+Kept in the message's metadata, so they live and die with the message in its ConversationLog.
+"""
+from config import REGENERATE_CONFIG
+from models.conversation import Message
+from services.memory_store import MemoryStore
+from services.conversation_context import ConversationContext
+
+
+class MessageAlternatives:
+    """Helpers for message.meta["alternatives"] = {"candidates": [str], "selected": int}"""
+
+    @staticmethod
+    def get(message: Message):
+        """
+        Alternatives for a message
+
+        Returns:
+            {"candidates": [str], "selected": int}, or None if the message has none to switch between
+        """
+        entry = message.meta.get("alternatives")
+        if not entry or len(entry["candidates"]) < 2:
+            return None
+        return entry
+
+    @staticmethod
+    def add(message: Message, previous: Message, candidates: list):
+        """
+        Record regenerated candidates on the reply that shows the first of them,
+        keeping the reply they replace as an alternative
+
+        Args:
+            message: The new reply
+            previous: The reply it replaces (its own alternatives are carried over)
+            candidates: New replies; the first one is what message shows
+        """
+        kept = list(previous.meta.get("alternatives", {}).get("candidates", []))
+        if previous.content and previous.content not in kept:
+            kept.append(previous.content)
+
+        new = []
+        for candidate in candidates:
+            if candidate and candidate not in kept and candidate not in new:
+                new.append(candidate)
+        merged = (kept + new)[-REGENERATE_CONFIG["max_alternatives"]:]
+        if message.content not in merged:
+            merged.append(message.content)
+        message.meta["alternatives"] = {"candidates": merged, "selected": merged.index(message.content)}
+
+    @staticmethod
+    def select(bot_name: str, message: Message, position: int) -> str:
+        """
+        Show another candidate without calling the LLM; memory sees it too, since it references the message
+
+        Args:
+            bot_name: Chat the message belongs to
+            message: Message with alternatives
+            position: Candidate to show
+
+        Returns:
+            The selected reply text
+        """
+        entry = message.meta["alternatives"]
+        position %= len(entry["candidates"])
+        entry["selected"] = position
+        message.content = entry["candidates"][position]
+
+        # Ollama's stored context was built from the old reply; audio was generated for the old text
+        ConversationContext.invalidate(MemoryStore.for_bot_name(bot_name))
+        message.meta.pop("audio_path", None)
+        MemoryStore.log(bot_name).update(message)
+        return message.content
@@ -0,0 +1,301 @@
+"""
+Process-wide instrumentation: counters, gauges and histograms with labels.
+LLM latency and throughput, prompt sizes, TTS real-time factor, image generation time, cache hit
+rates, rerun durations and session-state size are recorded here from every session. The Diagnostics
+page reads them, and an optional HTTP endpoint exports them as Prometheus text (/metrics) or JSON
+(/metrics.json) for scraping.
+"""
+import json
+import math
+import os
+import sys
+import threading
+import types
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_CONFIG
+
+_SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+_TOKENS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384)
+_RATE = (1, 2, 5, 10, 20, 40, 80, 160, 320)
+_RATIO = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16)
+_BYTES = (1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7, 1e8)
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    "llm_request_seconds": ("histogram", "Ollama request wall time, first byte sent to last chunk", _SECONDS),
+    "llm_tokens_per_second": ("histogram", "Ollama generation speed (eval_count / eval_duration)", _RATE),
+    "llm_prompt_tokens": ("histogram", "Prompt size in tokens as evaluated by Ollama", _TOKENS),
+    "llm_completion_tokens_total": ("counter", "Tokens generated by Ollama", None),
+    "llm_errors_total": ("counter", "Failed Ollama requests", None),
+    "llm_queue_wait_seconds": ("histogram", "Time spent waiting for an LLM scheduler slot", _SECONDS),
+    "llm_time_to_first_token_seconds": ("histogram", "Streamed chat: request start to first token", _SECONDS),
+    "tts_seconds": ("histogram", "Speech synthesis wall time", _SECONDS),
+    "tts_real_time_factor": ("histogram", "Synthesis time divided by audio duration (<1 is faster than real time)",
+                             _RATIO),
+    "tts_errors_total": ("counter", "Failed speech generations", None),
+    "tts_cache_requests_total": ("counter", "Speech requests by TTS cache result", None),
+    "tts_queue_wait_seconds": ("histogram", "Time a speech request waited for the shared voice engine", _SECONDS),
+    "tts_queue_depth": ("gauge", "Speech requests waiting for the shared voice engine", None),
+    "image_generation_seconds": ("histogram", "Stable Diffusion request wall time", _SECONDS),
+    "image_errors_total": ("counter", "Failed image generations", None),
+    "cache_requests_total": ("counter", "Response cache lookups by result", None),
+    "rerun_seconds": ("histogram", "Streamlit script runs and fragment reruns by scope and page", _SECONDS),
+    "session_state_bytes": ("histogram", "Approximate deep size of a session's st.session_state", _BYTES),
+    "active_sessions": ("gauge", "Sessions that reran within the last session_ttl seconds", None),
+    "llm_in_flight": ("gauge", "LLM calls currently holding a scheduler slot", None),
+    "llm_queue_depth": ("gauge", "LLM calls waiting for a scheduler slot, by priority", None),
+}
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count", "recent")
+
+    def __init__(self, buckets, recent_size):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=recent_size)  # For percentiles on the Diagnostics page
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] if ordered else 0.0
+
+
+class MetricsRegistry:
+    """Thread-safe store of the metrics in METRICS, one series per label set"""
+
+    def __init__(self, definitions: dict = None, recent_size: int = 200):
+        self.definitions = definitions or METRICS
+        self.recent_size = recent_size
+        self._series = {name: {} for name in self.definitions}  # name -> {labels tuple: value or _Histogram}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def add_collector(self, collect):
+        """Register a callback that refreshes gauges (collect(registry)) right before every snapshot"""
+        self._collectors.append(collect)
+
+    def remove_collector(self, collect):
+        """Unregister a callback added with add_collector"""
+        if collect in self._collectors:
+            self._collectors.remove(collect)
+
+    @staticmethod
+    def _labels(labels: dict) -> tuple:
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        """Add to a counter"""
+        key = self._labels(labels)
+        with self._lock:
+            series = self._series[name]
+            series[key] = series.get(key, 0.0) + amount
+
+    def set(self, name: str, value: float, **labels):
+        """Set a gauge"""
+        key = self._labels(labels)
+        with self._lock:
+            self._series[name][key] = float(value)
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one histogram sample"""
+        key = self._labels(labels)
+        with self._lock:
+            series = self._series[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.definitions[name][2], self.recent_size)
+            histogram.observe(value)
+
+    def snapshot(self) -> dict:
+        """
+        Every metric with its series
+
+        Returns:
+            {name: {"type", "help", "series": [{"labels", "value"}]}}; histogram series carry
+            count, sum, mean, p50, p95, max and cumulative buckets instead of value
+        """
+        for collect in list(self._collectors):
+            try:
+                collect(self)
+            except Exception as e:
+                print(f"WARNING: Metrics collector failed: {e}")
+
+        result = {}
+        with self._lock:
+            for name, (kind, help_text, _) in self.definitions.items():
+                series = []
+                for key, value in self._series[name].items():
+                    entry = {"labels": dict(key)}
+                    if kind == "histogram":
+                        ordered = sorted(value.recent)
+                        cumulative, running = {}, 0
+                        for bound, count in zip(list(value.buckets) + [math.inf], value.counts):
+                            running += count
+                            cumulative["+Inf" if bound == math.inf else _format_number(bound)] = running
+                        entry.update({
+                            "count": value.count,
+                            "sum": value.sum,
+                            "mean": value.sum / value.count if value.count else 0.0,
+                            "p50": _percentile(ordered, 0.50),
+                            "p95": _percentile(ordered, 0.95),
+                            "max": ordered[-1] if ordered else 0.0,
+                            "buckets": cumulative,
+                        })
+                    else:
+                        entry["value"] = value
+                    series.append(entry)
+                result[name] = {"type": kind, "help": help_text, "series": series}
+        return result
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for name, metric in self.snapshot().items():
+            full_name = f"{METRICS_CONFIG['prefix']}{name}"
+            lines.append(f"# HELP {full_name} {metric['help']}")
+            lines.append(f"# TYPE {full_name} {metric['type']}")
+            for entry in metric["series"]:
+                labels = entry["labels"]
+                if metric["type"] != "histogram":
+                    lines.append(f"{full_name}{_format_labels(labels)} {_format_number(entry['value'])}")
+                    continue
+                for bound, count in entry["buckets"].items():
+                    lines.append(f"{full_name}_bucket{_format_labels(dict(labels, le=bound))} {count}")
+                lines.append(f"{full_name}_sum{_format_labels(labels)} {_format_number(entry['sum'])}")
+                lines.append(f"{full_name}_count{_format_labels(labels)} {entry['count']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._series = {name: {} for name in self.definitions}
+
+
+def _format_number(value) -> str:
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels.keys(), escaped)) + "}"
+
+
+def deep_sizeof(obj, limit: int = 50000) -> int:
+    """
+    Approximate memory held by an object graph (containers, instance dicts and slots)
+
+    Args:
+        obj: Root object
+        limit: Stop after this many objects, so a huge session can't stall the rerun
+
+    Returns:
+        Size in bytes
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack and len(seen) < limit:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, (type, types.ModuleType)):
+            continue
+        seen.add(id(item))
+        try:
+            total += sys.getsizeof(item)
+        except TypeError:
+            continue
+
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        elif not isinstance(item, (str, bytes, bytearray, int, float, bool)):
+            if hasattr(item, "__dict__"):
+                stack.append(vars(item))
+            for slot in getattr(type(item), "__slots__", ()):
+                if hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return total
+
+
+_shared_registry = None
+_shared_registry_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry, creating it on first use"""
+    global _shared_registry
+    with _shared_registry_lock:
+        if _shared_registry is None:
+            _shared_registry = MetricsRegistry(recent_size=METRICS_CONFIG["recent_samples"])
+        return _shared_registry
+
+
+class _ExportHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body, content_type = get_metrics().to_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body, content_type = get_metrics().to_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+_export_server = None
+_export_lock = threading.Lock()
+
+
+def start_metrics_server():
+    """
+    Serve /metrics and /metrics.json on the configured export port (METRICS_PORT overrides it,
+    0 disables export), once per process
+
+    Returns:
+        The server, or None if export is disabled or the port is taken
+    """
+    global _export_server
+    with _export_lock:
+        port = int(os.environ.get("METRICS_PORT", METRICS_CONFIG.get("export_port") or 0))
+        if _export_server is not None or not port:
+            return _export_server
+        try:
+            _export_server = ThreadingHTTPServer((METRICS_CONFIG["export_host"], port), _ExportHandler)
+        except OSError as e:
+            print(f"WARNING: Metrics export disabled, cannot bind port {port}: {e}")
+            METRICS_CONFIG["export_port"] = None
+            os.environ.pop("METRICS_PORT", None)
+            return None
+        _export_server.daemon_threads = True
+        threading.Thread(target=_export_server.serve_forever, daemon=True, name="metrics-export").start()
+        print(f"DEBUG: Metrics export on http://{METRICS_CONFIG['export_host']}:{port}/metrics")
+        return _export_server
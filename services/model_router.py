@@ -0,0 +1,83 @@
+"""
+Routes each bot to an LLM built from its own model_config.
+Effective configs are DEFAULT_LLM_CONFIG overlaid with the bot's settings, and LLM clients are pooled
+per distinct config so bots sharing a preset share a client.
+"""
+import json
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from config import DEFAULT_LLM_CONFIG
+from services.bot_attribute_helper import BotAttributeHelper
+
+if TYPE_CHECKING:
+    from services.ollama_client import OllamaLLM
+
+# Keys OllamaLLM accepts; anything else in a bot's model_config is ignored
+_LLM_KEYS = ("model", "temperature", "num_predict", "num_ctx", "top_k", "top_p", "repeat_penalty", "seed",
+             "keep_alive")
+
+# Older bots store the reply length as max_tokens
+_KEY_ALIASES = {"max_tokens": "num_predict"}
+
+
+class ModelRouter:
+    """Resolves per-bot model configs and keeps a bounded pool of LLM clients"""
+
+    MAX_CLIENTS = 8
+
+    _llms = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def resolve_config(bot) -> dict:
+        """
+        Effective model config for a bot
+
+        Args:
+            bot: Bot object or dict (None gives the defaults)
+
+        Returns:
+            DEFAULT_LLM_CONFIG updated with the bot's model_config
+        """
+        config = dict(DEFAULT_LLM_CONFIG)
+        bot_config = (BotAttributeHelper.get_bot_attr(bot, 'model_config') if bot else None) or {}
+
+        for key, value in bot_config.items():
+            alias = _KEY_ALIASES.get(key)
+            if alias:
+                # An explicit num_predict beats a legacy max_tokens
+                if alias in bot_config:
+                    continue
+                key = alias
+            if key in _LLM_KEYS and value is not None:
+                config[key] = value
+        return config
+
+    @classmethod
+    def get_llm(cls, model_config: dict) -> 'OllamaLLM':
+        """Return the pooled LLM for a resolved config, creating it on first use"""
+        key = json.dumps(model_config, sort_keys=True, default=str)
+
+        with cls._lock:
+            llm = cls._llms.get(key)
+            if llm is not None:
+                cls._llms.move_to_end(key)
+                return llm
+
+            # LangChain loads with the first LLM, not when greeting or page modules import the router
+            from services.ollama_client import OllamaLLM
+            llm = OllamaLLM(**{k: v for k, v in model_config.items() if k in _LLM_KEYS})
+            cls._llms[key] = llm
+            while len(cls._llms) > cls.MAX_CLIENTS:
+                cls._llms.popitem(last=False)
+
+        print(f"DEBUG: Created LLM for {model_config.get('model')} "
+              f"(num_predict={model_config.get('num_predict')}, pooled: {len(cls._llms)})")
+        return llm
+
+    @classmethod
+    def llm_for_bot(cls, bot) -> 'OllamaLLM':
+        """Shortcut for get_llm(resolve_config(bot))"""
+        return cls.get_llm(cls.resolve_config(bot))
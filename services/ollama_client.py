@@ -0,0 +1,375 @@
+"""
+Lightweight native client for the Ollama HTTP API (/api/generate and /api/chat).
+Every caller shares one pooled keep-alive session per process, streamed replies are parsed as NDJSON,
+and every request carries explicit (connect, read) timeouts.
+OllamaLLM adapts the client to LangChain so existing prompt | llm chains keep working.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+from config import OLLAMA_CONFIG
+from services.cancellation import CancelToken, GenerationCancelled
+from services.metrics import get_metrics
+
+# Generation options sent to Ollama under "options" (everything else in a model config is ignored)
+_OPTION_KEYS = ("temperature", "num_predict", "num_ctx", "top_k", "top_p", "repeat_penalty", "seed", "stop")
+
+_STREAM_END = object()
+
+
+class OllamaError(Exception):
+    """Raised when Ollama is unreachable or answers with an error"""
+
+
+class OllamaClient:
+    """Thin wrapper around a pooled requests.Session talking to one Ollama server"""
+
+    def __init__(self, base_url: str = None, connect_timeout: float = 3.05, read_timeout: float = 120,
+                 pool_maxsize: int = 8):
+        self.base_url = (base_url or "http://localhost:11434").rstrip("/")
+        if not self.base_url.startswith("http"):
+            self.base_url = f"http://{self.base_url}"
+        self.timeout = (connect_timeout, read_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @staticmethod
+    def build_options(model_config: dict) -> dict:
+        """Pick the Ollama generation options out of a model config"""
+        return {key: model_config[key] for key in _OPTION_KEYS if model_config.get(key) is not None}
+
+    def _post(self, path: str, payload: dict, stream: bool) -> requests.Response:
+        started = time.perf_counter()
+        try:
+            response = self.session.post(f"{self.base_url}{path}", json=payload, stream=stream,
+                                         timeout=self.timeout)
+        except requests.RequestException as e:
+            get_metrics().inc("llm_errors_total", endpoint=path)
+            raise OllamaError(f"Ollama request to {path} failed: {e}") from e
+
+        if response.status_code != 200:
+            try:
+                detail = response.json().get("error", response.text)
+            except ValueError:
+                detail = response.text
+            response.close()
+            get_metrics().inc("llm_errors_total", endpoint=path)
+            raise OllamaError(f"Ollama returned {response.status_code} for {path}: {detail}")
+        response.started_at = started  # For _record_timings
+        response.endpoint = path
+        return response
+
+    @staticmethod
+    def _record_timings(response: requests.Response, final: dict):
+        """Feed the timings of a finished request (its done=True object) into the metrics"""
+        metrics = get_metrics()
+        model = final.get("model", "")
+        metrics.observe("llm_request_seconds", time.perf_counter() - response.started_at,
+                        endpoint=response.endpoint, model=model)
+        if final.get("prompt_eval_count"):
+            metrics.observe("llm_prompt_tokens", final["prompt_eval_count"], model=model)
+        if final.get("eval_count"):
+            metrics.inc("llm_completion_tokens_total", final["eval_count"], model=model)
+            if final.get("eval_duration"):
+                metrics.observe("llm_tokens_per_second", final["eval_count"] / (final["eval_duration"] / 1e9),
+                                model=model)
+
+    def _iter_ndjson(self, response: requests.Response, cancel_token: CancelToken = None) -> Iterator[dict]:
+        """Yield one decoded object per NDJSON line, closing the response when done or cancelled"""
+        if cancel_token is not None:
+            # Closing the connection makes Ollama stop generating; it also unblocks a pending read
+            cancel_token.on_cancel(response.close)
+        try:
+            for line in response.iter_lines():
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise OllamaError(chunk["error"])
+                if chunk.get("done"):
+                    self._record_timings(response, chunk)
+                    yield chunk
+                    break
+                yield chunk
+        except GenerationCancelled:
+            raise
+        except Exception as e:
+            if cancel_token is not None and cancel_token.cancelled:
+                raise GenerationCancelled(cancel_token.reason) from e
+            get_metrics().inc("llm_errors_total", endpoint=response.endpoint)
+            if isinstance(e, requests.RequestException):
+                raise OllamaError(f"Ollama stream interrupted: {e}") from e
+            raise
+        finally:
+            response.close()
+
+    def _collect(self, chunks: Iterator[dict], text_of, set_text) -> dict:
+        """Fold a cancellable stream into the same final object a non-streaming call returns"""
+        parts = []
+        final = {}
+        for chunk in chunks:
+            parts.append(text_of(chunk))
+            final = chunk
+        return set_text(dict(final), "".join(parts))
+
+    # ---- /api/generate ----
+
+    def generate(self, model: str, prompt: str, options: dict = None, cancel_token: CancelToken = None,
+                 **extra) -> dict:
+        """
+        Run a non-streaming completion
+
+        Args:
+            model: Ollama model tag
+            prompt: Full prompt text
+            options: Generation options (temperature, num_predict, ...)
+            cancel_token: Optional token; the request is streamed internally so it can be aborted
+            **extra: Additional top-level request fields (system, context, keep_alive, ...)
+
+        Returns:
+            Final response object (text in "response")
+        """
+        if cancel_token is not None:
+            return self._collect(
+                self.stream_generate(model, prompt, options, cancel_token=cancel_token, **extra),
+                lambda chunk: chunk.get("response", ""),
+                lambda final, text: {**final, "response": text}
+            )
+
+        payload = {"model": model, "prompt": prompt, "stream": False, "options": options or {}, **extra}
+        response = self._post("/api/generate", payload, stream=False)
+        try:
+            final = response.json()
+        finally:
+            response.close()
+        self._record_timings(response, final)
+        return final
+
+    def stream_generate(self, model: str, prompt: str, options: dict = None, cancel_token: CancelToken = None,
+                        **extra) -> Iterator[dict]:
+        """Stream a completion; yields NDJSON chunks, the last one has done=True and the timings"""
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        payload = {"model": model, "prompt": prompt, "stream": True, "options": options or {}, **extra}
+        return self._iter_ndjson(self._post("/api/generate", payload, stream=True), cancel_token)
+
+    # ---- /api/chat ----
+
+    def chat(self, model: str, messages: List[dict], options: dict = None, cancel_token: CancelToken = None,
+             **extra) -> dict:
+        """
+        Run a non-streaming chat completion
+
+        Args:
+            model: Ollama model tag
+            messages: [{"role": ..., "content": ...}] oldest first
+            options: Generation options
+            cancel_token: Optional token; the request is streamed internally so it can be aborted
+            **extra: Additional top-level request fields
+
+        Returns:
+            Final response object (text in ["message"]["content"])
+        """
+        if cancel_token is not None:
+            return self._collect(
+                self.stream_chat(model, messages, options, cancel_token=cancel_token, **extra),
+                lambda chunk: chunk.get("message", {}).get("content", ""),
+                lambda final, text: {**final, "message": {"role": "assistant", "content": text}}
+            )
+
+        payload = {"model": model, "messages": messages, "stream": False, "options": options or {}, **extra}
+        response = self._post("/api/chat", payload, stream=False)
+        try:
+            final = response.json()
+        finally:
+            response.close()
+        self._record_timings(response, final)
+        return final
+
+    def stream_chat(self, model: str, messages: List[dict], options: dict = None, cancel_token: CancelToken = None,
+                    **extra) -> Iterator[dict]:
+        """Stream a chat completion; yields NDJSON chunks"""
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        payload = {"model": model, "messages": messages, "stream": True, "options": options or {}, **extra}
+        return self._iter_ndjson(self._post("/api/chat", payload, stream=True), cancel_token)
+
+    # ---- async ----
+
+    async def agenerate(self, model: str, prompt: str, options: dict = None, **extra) -> dict:
+        """Async generate; the blocking request runs on the default executor"""
+        return await self._in_executor(lambda: self.generate(model, prompt, options, **extra),
+                                       extra.get("cancel_token"))
+
+    async def achat(self, model: str, messages: List[dict], options: dict = None, **extra) -> dict:
+        """Async chat; the blocking request runs on the default executor"""
+        return await self._in_executor(lambda: self.chat(model, messages, options, **extra),
+                                       extra.get("cancel_token"))
+
+    @staticmethod
+    async def _in_executor(call, cancel_token: CancelToken = None):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(None, call)
+        except asyncio.CancelledError:
+            # The awaiting task went away: abort the request instead of letting it run to completion
+            if cancel_token is not None:
+                cancel_token.cancel("abandoned")
+            raise
+
+    async def astream_generate(self, model: str, prompt: str, options: dict = None,
+                               **extra) -> AsyncIterator[dict]:
+        """Async stream of generate chunks"""
+        async for chunk in self._astream(lambda: self.stream_generate(model, prompt, options, **extra)):
+            yield chunk
+
+    async def astream_chat(self, model: str, messages: List[dict], options: dict = None,
+                           **extra) -> AsyncIterator[dict]:
+        """Async stream of chat chunks"""
+        async for chunk in self._astream(lambda: self.stream_chat(model, messages, options, **extra)):
+            yield chunk
+
+    @staticmethod
+    async def _astream(open_stream) -> AsyncIterator[dict]:
+        """Read a blocking chunk stream on a worker thread and hand chunks to the event loop"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def emit(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # The event loop is already gone (Streamlit rerun ended)
+                stop.set()
+
+        def pump():
+            try:
+                stream = open_stream()
+                try:
+                    for chunk in stream:
+                        if stop.is_set():
+                            break
+                        emit(chunk)
+                finally:
+                    # Closing the generator closes the HTTP response and frees the pooled connection
+                    stream.close()
+                emit(_STREAM_END)
+            except Exception as e:
+                emit(e)
+
+        loop.run_in_executor(None, pump)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # The consumer stopped early (or finished): let the worker drop the connection
+            stop.set()
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_ollama_client() -> OllamaClient:
+    """Return the process-wide Ollama client, creating it on first use"""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            # OLLAMA_HOST wins over the config, matching the ollama CLI
+            config = dict(OLLAMA_CONFIG, base_url=os.environ.get("OLLAMA_HOST") or OLLAMA_CONFIG["base_url"])
+            _shared_client = OllamaClient(**config)
+        return _shared_client
+
+
+class OllamaLLM(LLM):
+    """LangChain LLM backed by the shared native client, a drop-in for langchain_community's Ollama"""
+
+    model: str = "llama3:latest"
+    temperature: Optional[float] = None
+    num_predict: Optional[int] = None
+    num_ctx: Optional[int] = None
+    top_k: Optional[int] = None
+    top_p: Optional[float] = None
+    repeat_penalty: Optional[float] = None
+    seed: Optional[int] = None
+    keep_alive: Optional[str] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "ollama-native"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, **self._options()}
+
+    @property
+    def client(self) -> OllamaClient:
+        return get_ollama_client()
+
+    def _options(self, stop: Optional[List[str]] = None) -> dict:
+        options = OllamaClient.build_options({key: getattr(self, key, None) for key in _OPTION_KEYS})
+        if stop:
+            options["stop"] = stop
+        return options
+
+    def _extra(self) -> dict:
+        return {"keep_alive": self.keep_alive} if self.keep_alive else {}
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None,
+              run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        result = self.client.generate(self.model, prompt, self._options(stop),
+                                      cancel_token=kwargs.get("cancel_token"), **self._extra())
+        return result.get("response", "")
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None,
+                     run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        result = await self.client.agenerate(self.model, prompt, self._options(stop),
+                                             cancel_token=kwargs.get("cancel_token"), **self._extra())
+        return result.get("response", "")
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        for chunk in self.client.stream_generate(self.model, prompt, self._options(stop),
+                                                 cancel_token=kwargs.get("cancel_token"), **self._extra()):
+            text = chunk.get("response", "")
+            if not text:
+                continue
+            generation = GenerationChunk(text=text)
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=generation)
+            yield generation
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        async for chunk in self.client.astream_generate(self.model, prompt, self._options(stop),
+                                                        cancel_token=kwargs.get("cancel_token"), **self._extra()):
+            text = chunk.get("response", "")
+            if not text:
+                continue
+            generation = GenerationChunk(text=text)
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=generation)
+            yield generation
@@ -0,0 +1,246 @@
+"""
+Opt-in rerun profiler, enabled with the PROFILE_RERUNS env var or the ?profile=1 query param.
+While enabled, every full script run is sampled: a daemon thread records the script thread's stack
+every few milliseconds, and main() marks its phases (styles, sidebar, page) so the flame graph is
+split by phase. Each run is written to PROFILER_CONFIG['output_dir'] as a speedscope or
+collapsed-stacks file, and the slowest runs per page are kept process-wide for the Diagnostics page.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+from config import PROFILER_CONFIG
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_ENABLED_VALUES = {"1", "true", "yes", "on"}
+
+# Profile of the run in progress on this thread, if any
+_active = threading.local()
+
+# page -> slowest profiled runs, slowest first
+_slowest = {}
+_slowest_lock = threading.Lock()
+
+
+class _StackSampler:
+    """Samples one thread's Python stack from a daemon thread"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = []  # [(perf_counter time, seconds since previous sample, stack outermost first)]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="rerun-profiler")
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        previous = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.samples.append((now, now - previous, tuple(reversed(stack))))
+            previous = now
+
+
+class _RunProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.ended = None
+        self.phases = []  # [(name, start, end)]
+        self.sampler = _StackSampler(threading.get_ident(), PROFILER_CONFIG["interval"])
+
+    def phase_at(self, moment: float) -> str:
+        for name, start, end in self.phases:
+            if start <= moment <= end:
+                return name
+        return "other"
+
+
+def _frame_label(frame) -> str:
+    name, filename, line = frame
+    if filename.startswith(_ROOT):
+        filename = os.path.relpath(filename, _ROOT)
+    elif "site-packages" + os.sep in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    else:
+        filename = os.path.basename(filename)
+    return f"{name} ({filename}:{line})"
+
+
+def _trim(stack: tuple) -> tuple:
+    """Drop the Streamlit runner frames above the first frame of this app"""
+    for index, (_, filename, _) in enumerate(stack):
+        if filename.startswith(_ROOT):
+            return stack[index:]
+    return stack
+
+
+class RerunProfiler:
+    """Samples full script runs while profiling is enabled"""
+
+    @staticmethod
+    def enabled() -> bool:
+        """True if the env var is set or the page was opened with the profiling query param"""
+        if os.environ.get(PROFILER_CONFIG["env_var"], "").lower() in _ENABLED_VALUES:
+            return True
+        try:
+            return st.query_params.get(PROFILER_CONFIG["query_param"], "").lower() in _ENABLED_VALUES
+        except Exception:
+            return False
+
+    @staticmethod
+    @contextmanager
+    def rerun():
+        """Profile one full script run (no-op when profiling is off or a run is already profiled)"""
+        if getattr(_active, "profile", None) is not None or not RerunProfiler.enabled():
+            yield
+            return
+
+        profile = _active.profile = _RunProfile()
+        profile.sampler.start()
+        try:
+            yield
+        finally:
+            # st.rerun() / st.stop() unwind through here too; the partial run is still worth keeping
+            profile.ended = time.perf_counter()
+            profile.sampler.stop()
+            _active.profile = None
+            seconds = profile.ended - profile.started
+            try:
+                RerunProfiler._record(profile, seconds, st.session_state.get('page', 'home'))
+            except Exception as e:
+                print(f"WARNING: Could not save rerun profile: {e}")
+
+    @staticmethod
+    @contextmanager
+    def phase(name: str):
+        """Mark a phase of the profiled run; samples taken inside it are grouped under [name]"""
+        profile = getattr(_active, "profile", None)
+        if profile is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            profile.phases.append((name, start, time.perf_counter()))
+
+    @staticmethod
+    def slowest(page: str = None) -> list:
+        """
+        Slowest profiled runs since startup
+
+        Args:
+            page: Only this page's runs; all pages when None
+
+        Returns:
+            [{"page", "ms", "started_at", "phases", "hot", "samples", "file"}], slowest first
+        """
+        with _slowest_lock:
+            if page is not None:
+                return list(_slowest.get(page, []))
+            runs = [run for page_runs in _slowest.values() for run in page_runs]
+        return sorted(runs, key=lambda run: run["ms"], reverse=True)
+
+    @staticmethod
+    def _record(profile: _RunProfile, seconds: float, page: str):
+        stacks = []  # [(seconds, labels outermost first)]
+        self_time = {}
+        for moment, weight, stack in profile.sampler.samples:
+            if moment > profile.ended:
+                break  # Taken while the sampler was shutting down
+            stack = _trim(stack)
+            labels = [f"[{profile.phase_at(moment)}]"] + [_frame_label(frame) for frame in stack]
+            stacks.append((weight, labels))
+            self_time[labels[-1]] = self_time.get(labels[-1], 0.0) + weight
+
+        path = RerunProfiler._write(stacks, page, seconds, profile.started_at)
+        run = {
+            "page": page,
+            "ms": seconds * 1000,
+            "started_at": profile.started_at,
+            "phases": {name: (end - start) * 1000 for name, start, end in profile.phases},
+            "hot": [(label, weight * 1000) for label, weight in
+                    sorted(self_time.items(), key=lambda item: item[1], reverse=True)[:5]],
+            "samples": len(stacks),
+            "file": path,
+        }
+        with _slowest_lock:
+            runs = _slowest.setdefault(page, [])
+            runs.append(run)
+            runs.sort(key=lambda item: item["ms"], reverse=True)
+            del runs[PROFILER_CONFIG["top_n"]:]
+        print(f"DEBUG: Profiled {page} rerun: {run['ms']:.1f} ms, {len(stacks)} samples -> {path}")
+
+    @staticmethod
+    def _write(stacks: list, page: str, seconds: float, started_at: float) -> str:
+        """Write one run in the configured format and prune old files; returns the file path"""
+        directory = PROFILER_CONFIG["output_dir"]
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(started_at)) + f"{started_at % 1:.3f}"[1:]
+        title = f"{page} rerun {stamp} ({seconds * 1000:.0f} ms)"
+
+        if PROFILER_CONFIG["format"] == "collapsed":
+            path = os.path.join(directory, f"{stamp}-{page}.collapsed.txt")
+            totals = {}
+            for weight, labels in stacks:
+                key = ";".join(labels)
+                totals[key] = totals.get(key, 0.0) + weight
+            # Weights in microseconds so the flame graph is proportional to wall time
+            body = "".join(f"{key} {max(1, round(weight * 1e6))}\n" for key, weight in totals.items())
+        else:
+            path = os.path.join(directory, f"{stamp}-{page}.speedscope.json")
+            frames, index, samples, weights = [], {}, [], []
+            for weight, labels in stacks:
+                ids = []
+                for label in labels:
+                    if label not in index:
+                        index[label] = len(frames)
+                        frames.append({"name": label})
+                    ids.append(index[label])
+                samples.append(ids)
+                weights.append(weight * 1000)
+            body = json.dumps({
+                "$schema": "https://www.speedscope.app/file-format-schema.json",
+                "name": title,
+                "exporter": "rerun-profiler",
+                "shared": {"frames": frames},
+                "profiles": [{
+                    "type": "sampled",
+                    "name": title,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }],
+            })
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(body)
+
+        files = sorted((os.path.join(directory, name) for name in os.listdir(directory)), key=os.path.getmtime)
+        for old in files[:-PROFILER_CONFIG["keep_files"]]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        return path
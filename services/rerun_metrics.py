@@ -0,0 +1,103 @@
+"""
+Rerun counts and durations per scope: "app" for full script runs, "fragment:<name>" for
+fragment-only reruns. A fragment that runs as part of a full run is counted in the full run.
+Kept in st.session_state.rerun_metrics so each interaction's cost can be inspected, and recorded
+process-wide (services/metrics.py) by scope and page together with session-state size.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from config import METRICS_CONFIG, METRICS_HISTORY_SIZE
+from services.metrics import deep_sizeof, get_metrics
+
+# Scope of the run being timed on this thread, if any
+_active_scope = contextvars.ContextVar("active_rerun_scope", default=None)
+
+# session id -> time of its last full run, for the active_sessions gauge
+_last_seen = {}
+_last_seen_lock = threading.Lock()
+
+
+class RerunMetrics:
+    """Times script runs and fragment reruns into session state"""
+
+    @staticmethod
+    @contextmanager
+    def track(scope: str):
+        """
+        Time one run of a scope (no-op when nested inside a run that is already timed)
+
+        Args:
+            scope: "app" or "fragment:<name>"
+        """
+        if _active_scope.get() is not None:
+            yield
+            return
+
+        reset = _active_scope.set(scope)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            # st.rerun() / st.stop() unwind through here too; the run still happened
+            elapsed = time.perf_counter() - started
+            _active_scope.reset(reset)
+            RerunMetrics._record(scope, elapsed)
+
+    @staticmethod
+    def _record(scope: str, seconds: float):
+        metrics = st.session_state.setdefault('rerun_metrics', {"counts": {}, "seconds": {}})
+        metrics["counts"][scope] = metrics["counts"].get(scope, 0) + 1
+        samples = metrics["seconds"].setdefault(scope, [])
+        samples.append(seconds)
+        if len(samples) > METRICS_HISTORY_SIZE:
+            del samples[:-METRICS_HISTORY_SIZE]
+        print(f"DEBUG: Rerun {scope} #{metrics['counts'][scope]} took {seconds * 1000:.1f} ms")
+
+        get_metrics().observe("rerun_seconds", seconds, scope=scope, page=st.session_state.get('page', ''))
+        if scope == "app":
+            RerunMetrics._count_session()
+            if metrics["counts"][scope] % METRICS_CONFIG["session_size_every"] == 1:
+                get_metrics().observe("session_state_bytes", RerunMetrics.session_state_bytes())
+
+    @staticmethod
+    def _count_session():
+        """Mark this session active and refresh the active_sessions gauge"""
+        ctx = get_script_run_ctx()
+        now = time.time()
+        with _last_seen_lock:
+            _last_seen[ctx.session_id if ctx else "no-session"] = now
+            for session_id, seen in list(_last_seen.items()):
+                if now - seen > METRICS_CONFIG["session_ttl"]:
+                    del _last_seen[session_id]
+            active = len(_last_seen)
+        get_metrics().set("active_sessions", active)
+
+    @staticmethod
+    def session_state_bytes() -> int:
+        """Approximate deep size of this session's st.session_state"""
+        return deep_sizeof({key: st.session_state[key] for key in st.session_state.keys()})
+
+    @staticmethod
+    def summary() -> dict:
+        """
+        Per-scope rerun statistics for this session
+
+        Returns:
+            {scope: {"count", "last_ms", "mean_ms"}}
+        """
+        metrics = st.session_state.get('rerun_metrics', {"counts": {}, "seconds": {}})
+        result = {}
+        for scope, count in metrics["counts"].items():
+            samples = metrics["seconds"].get(scope) or [0.0]
+            result[scope] = {
+                "count": count,
+                "last_ms": samples[-1] * 1000,
+                "mean_ms": sum(samples) / len(samples) * 1000
+            }
+        return result
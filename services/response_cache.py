@@ -0,0 +1,142 @@
+"""
+Shared response cache for deterministic one-shot LLM generations (greetings, concepts, text enhancement).
+Entries live in a bounded in-memory LRU with a TTL, optionally backed by SQLite so hits survive restarts.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config import RESPONSE_CACHE_CONFIG
+from services.metrics import get_metrics
+
+
+class ResponseCache:
+    """Bounded LRU + TTL cache keyed by a hash of prompt, context, model and temperature"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600, sqlite_path: str = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (created_at, value)
+        self._lock = threading.Lock()
+        self._db = self._open_db(sqlite_path) if sqlite_path else None
+
+    @staticmethod
+    def make_key(prompt: str, context: str, model: str, temperature) -> str:
+        """Hash the inputs that determine a generation into a cache key"""
+        payload = "\x1f".join([prompt or "", context or "", str(model), str(temperature)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _open_db(sqlite_path: str):
+        """Open (and create if needed) the on-disk cache tier"""
+        try:
+            directory = os.path.dirname(sqlite_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            print(f"WARNING: Response cache disk tier unavailable: {e}")
+            return None
+
+    def _is_expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None on a miss"""
+        value, tier = self._lookup(key)
+        if tier is None:
+            get_metrics().inc("cache_requests_total", result="miss")
+        else:
+            get_metrics().inc("cache_requests_total", result="hit", tier=tier)
+        return value
+
+    def _lookup(self, key: str):
+        """(value, "memory" | "disk") for a hit, (None, None) for a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if not self._is_expired(created_at):
+                    self._entries.move_to_end(key)
+                    return value, "memory"
+                del self._entries[key]
+
+            if self._db is None:
+                return None, None
+
+            try:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None, None
+
+                value, created_at = row
+                if self._is_expired(created_at):
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                    return None, None
+
+                # Promote disk hits into the memory tier
+                self._store_in_memory(key, created_at, value)
+                return value, "disk"
+            except sqlite3.Error as e:
+                print(f"WARNING: Response cache read failed: {e}")
+                return None, None
+
+    def set(self, key: str, value: str):
+        """Store a response in both tiers"""
+        created_at = time.time()
+        with self._lock:
+            self._store_in_memory(key, created_at, value)
+
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, value, created_at)
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"WARNING: Response cache write failed: {e}")
+
+    def _store_in_memory(self, key: str, created_at: float, value: str):
+        self._entries[key] = (created_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM responses")
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"WARNING: Response cache clear failed: {e}")
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache, creating it on first use"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache(**RESPONSE_CACHE_CONFIG)
+        return _shared_cache
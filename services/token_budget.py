@@ -0,0 +1,85 @@
+"""
+Token counting and context budgeting for conversation memory.
+Uses a cheap, cached tokenizer approximation so the prompt can be fitted to the model's num_ctx
+without loading a real tokenizer.
+"""
+import re
+from functools import lru_cache
+
+from config import MEMORY_CONFIG
+
+# Words, numbers and individual punctuation marks
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+# Average characters per sub-word token for llama-style BPE vocabularies
+_CHARS_PER_TOKEN = 4
+
+
+class TokenCounter:
+    """Approximate token counts and history budgets for Ollama models"""
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def count(text: str) -> int:
+        """
+        Approximate the number of tokens in a string
+
+        Args:
+            text: Text to measure
+
+        Returns:
+            Estimated token count
+        """
+        if not text:
+            return 0
+
+        tokens = 0
+        for piece in _TOKEN_PATTERN.findall(text):
+            # Long words split into several sub-word tokens
+            tokens += max(1, -(-len(piece) // _CHARS_PER_TOKEN))
+        return tokens
+
+    @staticmethod
+    def history_budget(model_config: dict, system_prompt_tokens: int, user_input_tokens: int) -> int:
+        """
+        Number of tokens available for chat history in the next prompt
+
+        Args:
+            model_config: Effective LLM config (uses model, num_ctx and num_predict)
+            system_prompt_tokens: Tokens used by the dialog template without history
+            user_input_tokens: Tokens used by the new user message
+
+        Returns:
+            History token budget (never negative)
+        """
+        override = MEMORY_CONFIG.get("token_budgets", {}).get(model_config.get("model"))
+        if override is not None:
+            return override
+
+        num_ctx = model_config.get("num_ctx", 2048)
+        # Leave room for the reply, but never let the reply reservation eat more than half the context
+        reply_reserve = min(model_config.get("num_predict", 0), num_ctx // 2)
+        available = (num_ctx - reply_reserve - system_prompt_tokens - user_input_tokens
+                     - MEMORY_CONFIG.get("reserve_tokens", 0))
+        return max(0, available)
+
+    @staticmethod
+    def fit_recent(costs, budget: int):
+        """
+        Count how many of the most recent items fit in the token budget
+
+        Args:
+            costs: Token cost of each item, oldest first
+            budget: Maximum number of tokens
+
+        Returns:
+            (kept_count, token_count): the last kept_count items fit, using token_count tokens
+        """
+        kept = 0
+        used = 0
+        for cost in reversed(costs):
+            if used + cost > budget:
+                break
+            kept += 1
+            used += cost
+        return kept, used
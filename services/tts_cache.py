@@ -0,0 +1,123 @@
+"""
+Content-addressed cache of synthesized speech.
+A request's key is a hash of everything that determines the audio: spoken text, emotion, speaker
+reference, model variant, and conditioning and sampling settings. The voice engine names output
+files after the key, so different requests never share a file name. A SQLite index, shared by every session and kept
+across restarts, maps keys to files and evicts the least recently played ones beyond max_bytes.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from config import TTS_CACHE_CONFIG
+
+
+class TTSCache:
+    """Index of synthesized WAV files by request key"""
+
+    def __init__(self, sqlite_path: str, max_bytes: int = 512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = self._open_db(sqlite_path)
+
+    @staticmethod
+    def make_key(text: str, emotion: str, speaker: str, model_variant: str, settings: dict) -> str:
+        """Hash the inputs that determine a synthesis into a cache key"""
+        payload = json.dumps([text, emotion, speaker, model_variant, settings], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _open_db(sqlite_path: str):
+        directory = os.path.dirname(sqlite_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(sqlite_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")  # Several app processes may share one index
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS outputs (key TEXT PRIMARY KEY, path TEXT NOT NULL, emotion TEXT NOT NULL, "
+            "text TEXT NOT NULL, bytes INTEGER NOT NULL, created_at REAL NOT NULL, last_used_at REAL NOT NULL, "
+            "hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS outputs_by_use ON outputs (last_used_at)")
+        db.commit()
+        return db
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of the cached audio for a key, or None on a miss (a file deleted from disk is a miss)"""
+        with self._lock:
+            try:
+                row = self._db.execute("SELECT path FROM outputs WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                with self._db:
+                    if not os.path.exists(row[0]):
+                        self._db.execute("DELETE FROM outputs WHERE key = ?", (key,))
+                        return None
+                    self._db.execute("UPDATE outputs SET last_used_at = ?, hits = hits + 1 WHERE key = ?",
+                                     (time.time(), key))
+                return row[0]
+            except sqlite3.Error as e:
+                print(f"WARNING: TTS cache lookup failed: {e}")
+                return None
+
+    def put(self, key: str, path: str, emotion: str, text: str):
+        """Index a freshly written file, then evict the least recently used files beyond max_bytes"""
+        now = time.time()
+        with self._lock:
+            try:
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO outputs (key, path, emotion, text, bytes, created_at, last_used_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)", (key, path, emotion, text, os.path.getsize(path), now, now)
+                    )
+                self._evict()
+            except (sqlite3.Error, OSError) as e:
+                print(f"WARNING: TTS cache store failed: {e}")
+
+    def _evict(self):
+        """Delete least recently used files until the cache fits max_bytes; caller holds the lock"""
+        total = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM outputs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, path, size in self._db.execute("SELECT key, path, bytes FROM outputs ORDER BY last_used_at"):
+            if total <= self.max_bytes:
+                break
+            evicted.append(key)
+            total -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # Already gone
+        with self._db:
+            self._db.executemany("DELETE FROM outputs WHERE key = ?", [(key,) for key in evicted])
+        print(f"DEBUG: TTS cache evicted {len(evicted)} files")
+
+    def stats(self) -> dict:
+        """{"files", "bytes", "hits"} over the whole index"""
+        with self._lock:
+            files, size, hits = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0), COALESCE(SUM(hits), 0) FROM outputs"
+            ).fetchone()
+        return {"files": files, "bytes": size, "hits": hits}
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_tts_cache() -> Optional[TTSCache]:
+    """Return the process-wide TTS cache, or None if it is disabled or unavailable"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None and TTS_CACHE_CONFIG.get("sqlite_path"):
+            try:
+                _shared_cache = TTSCache(**TTS_CACHE_CONFIG)
+            except sqlite3.Error as e:
+                print(f"WARNING: TTS cache unavailable, every request will be synthesized: {e}")
+                TTS_CACHE_CONFIG["sqlite_path"] = None
+        return _shared_cache
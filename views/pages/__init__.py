@@ -1,23 +1,36 @@
-from .home import home_page
-from .profile import profile_page
-from .chat import chat_page
-from .bot_setup import bot_setup_page
-from .generate_concept import generate_concept_page
-from .create_bot import create_bot_page
-from .my_bots import my_bots_page
-from .edit_bot import edit_bot_page
-from .voice import voice_page
-from .group_chat import group_chat_page
+"""
+Page entry points, imported on first use: a page module (and the controllers, LangChain or torch
+it pulls in) loads only when its route is rendered, not when the app starts.
+"""
+import importlib
 
-__all__ = [
-    'home_page',
-    'profile_page',
-    'chat_page',
-    'bot_setup_page',
-    'generate_concept_page',
-    'create_bot_page',
-    'my_bots_page',
-    'edit_bot_page',
-    'voice_page',
-    'group_chat_page'
-]
\ No newline at end of file
+# route -> (module in this package, page coroutine)
+ROUTES = {
+    "home": ("home", "home_page"),
+    "profile": ("profile", "profile_page"),
+    "chat": ("chat", "chat_page"),
+    "bot_setup": ("bot_setup", "bot_setup_page"),
+    "generate_concept": ("generate_concept", "generate_concept_page"),
+    "create_bot": ("create_bot", "create_bot_page"),
+    "my_bots": ("my_bots", "my_bots_page"),
+    "edit_bot": ("edit_bot", "edit_bot_page"),
+    "voice": ("voice", "voice_page"),
+    "image_studio": ("image_studio", "image_studio_page"),
+    "group_chat": ("group_chat", "group_chat_page"),
+    "diagnostics": ("diagnostics", "diagnostics_page"),
+}
+
+_MODULE_OF = {function: module for module, function in ROUTES.values()}
+
+
+def load_page(route: str):
+    """Import a route's module if needed and return its page coroutine function"""
+    module, function = ROUTES[route]
+    return getattr(importlib.import_module(f"{__name__}.{module}"), function)
+
+
+def __getattr__(name):
+    # Keeps `from views.pages import chat_page` working without importing every page up front
+    if name in _MODULE_OF:
+        return getattr(importlib.import_module(f"{__name__}.{_MODULE_OF[name]}"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
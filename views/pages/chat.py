@@ -3,8 +3,15 @@ import re
 from components.avatar_utils import get_avatar_display
 from components.chat_toolbar import display_chat_toolbar
 from components.message_actions import display_message_actions, display_message_edit_interface, handle_pending_edit
-from config import get_default_bots
+from config import get_default_bots, STREAMING_ENABLED, CHAT_RENDER_CONFIG
 from controllers.chat_controller import LLMChatController
+from services.conversation_store import get_conversation_store
+from services.greeting_store import GreetingStore
+from services.memory_store import MemoryStore
+from services.rerun_metrics import RerunMetrics
+
+# Quoted dialogue in bot messages, styled on display
+_QUOTE_PATTERN = re.compile(r'"(.*?)"')
 
 
 async def chat_page(bot_name):
@@ -20,21 +27,20 @@ async def chat_page(bot_name):
         _handle_bot_not_found()
         return
 
-    # Initialize chat history and audio cache
+    # Initialize chat history
     _initialize_chat_history(bot_name)
-    _initialize_audio_cache()
 
     # Handle any pending message edits first
     await handle_pending_edit(bot)
 
     # Get current chat history
-    chat_history = st.session_state.chat_histories[bot_name]
+    chat_history = MemoryStore.log(bot_name)
 
     # Display message editing interface if active
     display_message_edit_interface()
 
-    # Display all messages
-    await _display_messages(chat_history, current_bot, bot_name, bot)
+    # Display the messages (a fragment: message actions rerun only their own message)
+    _display_messages(chat_history, current_bot, bot_name, bot)
 
     # Send greeting if first time
     await _send_greeting_if_needed(chat_history, current_bot, bot)
@@ -46,16 +52,11 @@ async def chat_page(bot_name):
     user_input = _display_input_area(bot_name)
 
     # Display the main toolbar
-    await display_chat_toolbar(bot)
+    display_chat_toolbar(bot)
 
     # Handle user input
     if user_input:
-        await _handle_user_input(user_input, chat_history, bot, bot_name)
-
-    # Check if we need to rerun due to audio generation completion
-    if st.session_state.get('audio_generated', False):
-        st.session_state.audio_generated = False
-        st.rerun()
+        await _handle_user_input(user_input, chat_history, bot, bot_name, current_bot)
 
 
 def _apply_chat_styles():
@@ -269,53 +270,70 @@ def _handle_bot_not_found():
 
 
 def _initialize_chat_history(bot_name):
-    """Initialize chat history for this bot if not exists"""
-    if "chat_histories" not in st.session_state:
-        st.session_state.chat_histories = {}
-
-    if bot_name not in st.session_state.chat_histories:
-        st.session_state.chat_histories[bot_name] = []
+    """Open this bot's chat, unloading the others"""
+    MemoryStore.open_chat(bot_name)
 
     if "greeting_sent" not in st.session_state:
         st.session_state.greeting_sent = False
 
 
-def _initialize_audio_cache():
-    """Initialize audio cache in session state"""
-    if "audio_cache" not in st.session_state:
-        st.session_state.audio_cache = {}
-
-    if "audio_generated" not in st.session_state:
-        st.session_state.audio_generated = False
+@st.fragment
+def _display_messages(chat_history, current_bot, bot_name, bot_controller):
+    """Display the most recent messages of the chat, with a control to show earlier ones"""
+    with RerunMetrics.track("fragment:messages"):
+        _display_message_window(chat_history, current_bot, bot_name, bot_controller)
 
 
-async def _display_messages(chat_history, current_bot, bot_name, bot_controller):
-    """Display all messages in the chat history"""
-    bot_emoji = _get_bot_emoji(current_bot)
+def _display_message_window(chat_history, current_bot, bot_name, bot_controller):
+    """Body of the messages fragment"""
     bot_voice_settings = _get_bot_voice(current_bot)
     bot_has_voice = bot_voice_settings.get("enabled", False) if bot_voice_settings else False
 
-    for idx, (role, message) in enumerate(chat_history):
-        await _display_single_message(
-            role, message, idx, chat_history,
-            current_bot, bot_name, bot_controller, bot_has_voice
+    # Same for every message: resolve once per rerun, not per message
+    bot_avatar = get_avatar_display(current_bot, size=40)
+    bot_for_actions = current_bot.to_dict() if hasattr(current_bot, 'to_dict') else current_bot
+
+    # Only the last `window` messages are rendered, so widgets per rerun don't grow with the chat
+    window_key = f"render_window_{bot_name}"
+    window = st.session_state.get(window_key, CHAT_RENDER_CONFIG["window"])
+    start = max(0, len(chat_history) - window)
+    hidden = start + chat_history.earlier
+    if hidden:
+        if st.button(f"⬆️ Load earlier messages ({hidden})", key=f"load_earlier_{bot_name}"):
+            window += CHAT_RENDER_CONFIG["step"]
+            st.session_state[window_key] = window
+            if len(chat_history) < window and chat_history.earlier:
+                # Stored chats open with their most recent messages only
+                get_conversation_store().load_earlier(chat_history, window - len(chat_history))
+            st.rerun(scope="fragment")
+
+    for position in range(start, len(chat_history)):
+        _display_single_message(
+            chat_history[position], chat_history,
+            bot_avatar, bot_for_actions, bot_name, bot_controller, bot_has_voice
         )
 
 
-async def _display_single_message(role, message, idx, chat_history, current_bot,
-                                  bot_name, bot_controller, bot_has_voice):
+@st.fragment
+def _display_single_message(chat_message, chat_history, bot_avatar, bot_for_actions,
+                            bot_name, bot_controller, bot_has_voice):
     """Display a single message with appropriate formatting and actions"""
-    avatar = None
-    if role == "assistant":
-        # ✅ Pass the Bot object directly - no conversion to dict needed
-        avatar = get_avatar_display(current_bot, size=40)
+    with RerunMetrics.track("fragment:message"):
+        _render_message(chat_message, chat_history, bot_avatar, bot_for_actions,
+                        bot_name, bot_controller, bot_has_voice)
+
+
+def _render_message(chat_message, chat_history, bot_avatar, bot_for_actions,
+                    bot_name, bot_controller, bot_has_voice):
+    """Body of a message fragment"""
+    role, message = chat_message.role, chat_message.content
+    avatar = bot_avatar if role == "assistant" else None
 
     # Process message to style quoted text (for bot messages only)
     display_message = message
     if role == "assistant":
         # Wrap text in double quotes with gold color
-        display_message = re.sub(
-            r'"(.*?)"',
+        display_message = _QUOTE_PATTERN.sub(
             r'<span style="color: #6ded82; font-style: italic;">"\1"</span>',
             message
         )
@@ -328,17 +346,10 @@ async def _display_single_message(role, message, idx, chat_history, current_bot,
         else:
             st.write(message)
 
-        # Convert Bot object to dict for message actions if needed
-        bot_for_actions = current_bot
-        if hasattr(current_bot, 'to_dict'):
-            bot_for_actions = current_bot.to_dict()
-
         # Use the new message_actions component for all message actions
-        await display_message_actions(
-            role=role,
-            message=message,
-            idx=idx,
-            chat_history=chat_history,
+        display_message_actions(
+            message=chat_message,
+            chat_log=chat_history,
             bot_name=bot_name,
             bot_controller=bot_controller,
             bot_has_voice=bot_has_voice,
@@ -348,14 +359,17 @@ async def _display_single_message(role, message, idx, chat_history, current_bot,
 
 async def _send_greeting_if_needed(chat_history, current_bot, bot_controller):
     """Send greeting message if it's the first interaction"""
-    if not st.session_state.greeting_sent or not chat_history:
+    # Stored chats reopened in a new session already have their greeting
+    if not chat_history:
         personality = _get_bot_personality(current_bot)
         greeting = personality.get("greeting", "")
+        if not greeting:
+            # Pregenerated greetings render instantly; generate inline only if the pool is still empty
+            greeting = GreetingStore.take(current_bot) if current_bot else None
         if not greeting:
             greeting = await bot_controller.generate_greeting()
 
-        chat_history.append(("assistant", greeting))
-        bot_controller._process_memory("(System greeting)", greeting)
+        bot_controller.record_greeting(greeting)
         st.session_state.greeting_sent = True
         st.rerun()
 
@@ -368,17 +382,46 @@ def _display_input_area(bot_name):
         user_input = st.chat_input("Type your message...", key=f"chat_input_{bot_name}")
 
     with input_col2:
-        if st.button("🎤", help="Push to talk", key=f"voice_mic_{bot_name}", use_container_width=True):
-            st.session_state.voice_input_active = True
-            st.rerun()
+        _display_voice_input_button(bot_name)
 
     return user_input
 
 
-async def _handle_user_input(user_input, chat_history, bot_controller, bot_name):
+@st.fragment
+def _display_voice_input_button(bot_name):
+    """Push-to-talk button; toggling it redraws only this fragment"""
+    with RerunMetrics.track("fragment:voice_input"):
+        if st.button("🎤", help="Push to talk", key=f"voice_mic_{bot_name}", use_container_width=True):
+            st.session_state.voice_input_active = True
+            st.rerun(scope="fragment")
+
+
+async def _handle_user_input(user_input, chat_history, bot_controller, bot_name, current_bot):
     """Handle user input and generate bot response"""
-    chat_history.append(("user", user_input))
-    with st.spinner(f"{bot_name} is thinking..."):
-        response = await bot_controller.generate_single_response(user_input)
-        chat_history.append(("assistant", response))
-        st.rerun()
+    user_message = chat_history.append("user", user_input)
+    if STREAMING_ENABLED:
+        response = await _stream_response(user_input, bot_controller, current_bot)
+    else:
+        with st.spinner(f"{bot_name} is thinking..."):
+            response = await bot_controller.generate_single_response(user_input)
+
+    # The controller records the reply; errors are only shown, not added to memory
+    if response and chat_history.last() is user_message:
+        chat_history.append("assistant", response)
+    st.rerun()
+
+
+async def _stream_response(user_input, bot_controller, current_bot):
+    """Render the reply into the chat as tokens arrive and return the full text"""
+    with st.chat_message("user"):
+        st.write(user_input)
+
+    with st.chat_message("assistant", avatar=get_avatar_display(current_bot, size=40)):
+        placeholder = st.empty()
+        response = ""
+        async for chunk in bot_controller.stream_single_response(user_input):
+            response += chunk
+            placeholder.markdown(response + "▌")
+        placeholder.markdown(response)
+
+    return response
@@ -3,7 +3,9 @@ import streamlit as st
 from config import TAG_OPTIONS, PERSONALITY_TRAITS, DEFAULT_RULES
 from controllers.bot_manager_controller import BotManager
 from controllers.chat_controller import LLMChatController
+from components.enhance_all import render_enhance_all_button, build_greeting_prompt
 from controllers.image_controller import ImageController
+from controllers.voice_controller import VoiceService
 
 # Character limits
 NAME_LIMIT = 80
@@ -119,11 +121,12 @@ async def _render_appearance_section(form_data):
                 chat_controller = LLMChatController()
                 current_text = st.session_state.appearance_text_widget
                 enhanced_text = await chat_controller.enhance_text(current_text, "appearance description")
-                # Ensure enhanced text doesn't exceed the limit
-                if len(enhanced_text) > APPEARANCE_LIMIT:
-                    enhanced_text = enhanced_text[:APPEARANCE_LIMIT]
-                st.session_state.appearance_text = enhanced_text
-                st.rerun()
+                if enhanced_text is not None:  # None: failed or superseded, keep the field as it is
+                    # Ensure enhanced text doesn't exceed the limit
+                    if len(enhanced_text) > APPEARANCE_LIMIT:
+                        enhanced_text = enhanced_text[:APPEARANCE_LIMIT]
+                    st.session_state.appearance_text = enhanced_text
+                    st.rerun()
 
     form_data["appearance"]["description"] = st.session_state.get("appearance_text", appearance_text)
 
@@ -230,8 +233,9 @@ async def _render_background_section(form_data):
                 chat_controller = LLMChatController()
                 current_text = st.session_state.desc_text_widget
                 enhanced_text = await chat_controller.enhance_text(current_text, "character background")
-                st.session_state.desc_text = enhanced_text
-                st.rerun()
+                if enhanced_text is not None:
+                    st.session_state.desc_text = enhanced_text
+                    st.rerun()
 
     form_data["basic"]["desc"] = st.session_state.get("desc_text", desc_text)
     return form_data
@@ -261,11 +265,12 @@ async def _render_scenario_section(form_data):
                 chat_controller = LLMChatController()
                 current_text = st.session_state.scenario_text_widget
                 enhanced_text = await chat_controller.enhance_text(current_text, "scenario context")
-                # Ensure enhanced text doesn't exceed the limit
-                if len(enhanced_text) > DESC_LIMIT:
-                    enhanced_text = enhanced_text[:DESC_LIMIT]
-                st.session_state.scenario_text = enhanced_text
-                st.rerun()
+                if enhanced_text is not None:
+                    # Ensure enhanced text doesn't exceed the limit
+                    if len(enhanced_text) > DESC_LIMIT:
+                        enhanced_text = enhanced_text[:DESC_LIMIT]
+                    st.session_state.scenario_text = enhanced_text
+                    st.rerun()
 
     form_data["scenario"] = st.session_state.get("scenario_text", scenario_text)
     return form_data
@@ -325,33 +330,12 @@ async def _render_greeting_section(form_data):
         if st.button("✨", key="enhance_greeting", help="Enhance greeting with AI"):
             with st.spinner("Crafting perfect greeting..."):
                 chat_controller = LLMChatController()
-                # Get all relevant context
-                context = {
-                    "name": form_data["basic"]["name"],
-                    "appearance": st.session_state.get("appearance_text", ""),
-                    "background": st.session_state.get("desc_text", ""),
-                    "personality": ", ".join(form_data["personality"]["traits"]),
-                    "current_greeting": st.session_state.greeting_text_widget
-                }
-
-                prompt = f"""Create an engaging greeting message for {context['name']} that:
-                - Matches their personality: {context['personality']}
-                - Reflects their background: {context['background']}
-                - Optionally references their appearance: {context['appearance']}
-                - Is 4-5 sentences maximum
-                - Sounds in-character
-                - Thoughts appear in italics format
-                - Dialogue in "quotes"
-
-                Current greeting (improve upon this):
-                {context['current_greeting']}
-                === Enhanced greeting ===
-
-                === End Enhanced greeting ==="""
+                prompt = build_greeting_prompt(form_data, st.session_state.greeting_text_widget)
 
                 enhanced_text = await chat_controller.enhance_text(prompt, "character greeting")
-                st.session_state.greeting_text = enhanced_text
-                st.rerun()
+                if enhanced_text is not None:
+                    st.session_state.greeting_text = enhanced_text
+                    st.rerun()
 
     form_data["personality"]["greeting"] = st.session_state.get("greeting_text", greeting_text)
     return form_data
@@ -411,7 +395,9 @@ def _render_custom_tags_form():
 def _render_voice_options(form_data):
     """Render the voice options section"""
     with st.expander("🗣️ Voice Options"):
-        if hasattr(st.session_state, 'voice_service') and st.session_state.voice_service is not None:
+        # Listing emotions doesn't load the voice engine; it starts with the first synthesis
+        emotions = VoiceService.configured_emotions()
+        if emotions:
             voice_enabled = st.checkbox(
                 "Enable Voice for this Character",
                 value=False,
@@ -421,24 +407,15 @@ def _render_voice_options(form_data):
             form_data["voice"]["enabled"] = voice_enabled
 
             if voice_enabled:
-                try:
-                    emotions = st.session_state.voice_service.get_available_emotions()
-                    if emotions:
-                        selected_emotion = st.selectbox(
-                            "Select Voice Emotion",
-                            options=emotions,
-                            index=emotions.index('neutral') if 'neutral' in emotions else 0,
-                            help="Select the emotional tone for your character's voice",
-                            key="voice_emotion_select"
-                        )
-                        form_data["voice"]["emotion"] = selected_emotion
-                        st.success(f"Voice will use: {selected_emotion.capitalize()} tone")
-                    else:
-                        st.warning("No voice emotions available")
-                        form_data["voice"]["enabled"] = False
-                except Exception as e:
-                    st.error(f"Error loading voice options: {str(e)}")
-                    form_data["voice"]["enabled"] = False
+                selected_emotion = st.selectbox(
+                    "Select Voice Emotion",
+                    options=emotions,
+                    index=emotions.index('neutral') if 'neutral' in emotions else 0,
+                    help="Select the emotional tone for your character's voice",
+                    key="voice_emotion_select"
+                )
+                form_data["voice"]["emotion"] = selected_emotion
+                st.success(f"Voice will use: {selected_emotion.capitalize()} tone")
         else:
             st.info("Voice features are currently unavailable")
             form_data["voice"]["enabled"] = False
@@ -521,6 +498,12 @@ async def create_bot_page():
     form_data = _render_rules_section(form_data)
     form_data = await _render_greeting_section(form_data)
     form_data = await _render_scenario_section(form_data)
+    await render_enhance_all_button(form_data, {
+        "appearance_text": APPEARANCE_LIMIT,
+        "desc_text": DESC_LIMIT,
+        "scenario_text": DESC_LIMIT,
+        "greeting_text": GREETING_LIMIT
+    })
     form_data = _render_tags_section(form_data)
     form_data = _render_voice_options(form_data)
     form_data = _render_status_section(form_data)
@@ -0,0 +1,134 @@
+import streamlit as st
+from config import PROFILER_CONFIG
+from services.llm_scheduler import get_llm_scheduler
+from services.metrics import deep_sizeof, get_metrics, start_metrics_server
+from services.profiler import RerunProfiler
+from services.rerun_metrics import RerunMetrics
+
+# Sections of the page: (title, metric names)
+SECTIONS = [
+    ("🧠 LLM", ["llm_request_seconds", "llm_tokens_per_second", "llm_prompt_tokens", "llm_queue_wait_seconds",
+               "llm_time_to_first_token_seconds", "llm_completion_tokens_total", "llm_errors_total"]),
+    ("🎙️ Voice", ["tts_seconds", "tts_real_time_factor", "tts_queue_wait_seconds", "tts_queue_depth",
+                  "tts_cache_requests_total", "tts_errors_total"]),
+    ("🎨 Images", ["image_generation_seconds", "image_errors_total"]),
+    ("🔁 Reruns", ["rerun_seconds", "session_state_bytes", "active_sessions"]),
+]
+
+
+async def diagnostics_page():
+    """Process-wide performance metrics, this session's costs and the export endpoint"""
+    st.markdown("### 🩺 Diagnostics")
+
+    snapshot = get_metrics().snapshot()
+
+    header_cols = st.columns([3, 1, 1, 1])
+    with header_cols[0]:
+        server = start_metrics_server()
+        if server is not None:
+            host, port = server.server_address[:2]
+            endpoint = f"http://{host}:{port}"
+            st.caption(f"Scrape endpoint: `{endpoint}/metrics` (Prometheus) · `{endpoint}/metrics.json`")
+        else:
+            st.caption("Metrics export endpoint is disabled (METRICS_CONFIG['export_port'] / METRICS_PORT)")
+    with header_cols[1]:
+        if st.button("🔄 Refresh", use_container_width=True, key="diagnostics_refresh"):
+            st.rerun()
+    with header_cols[2]:
+        st.download_button("JSON", get_metrics().to_json(), file_name="metrics.json", mime="application/json",
+                           use_container_width=True, key="diagnostics_json")
+    with header_cols[3]:
+        st.download_button("Prometheus", get_metrics().to_prometheus(), file_name="metrics.prom",
+                           mime="text/plain", use_container_width=True, key="diagnostics_prom")
+
+    _display_cache_hit_rate(snapshot)
+
+    for title, names in SECTIONS:
+        st.subheader(title)
+        rows = _metric_rows(snapshot, names)
+        if rows:
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+        else:
+            st.caption("No samples yet")
+
+    st.subheader("⏱️ LLM scheduler")
+    st.json(get_llm_scheduler().stats(), expanded=False)
+
+    _display_slowest_reruns()
+    _display_session()
+
+
+def _display_slowest_reruns():
+    """Slowest profiled full runs per page, with their phase split and hottest frames"""
+    st.subheader("🔥 Slowest reruns")
+    runs = RerunProfiler.slowest()
+    if not runs:
+        if RerunProfiler.enabled():
+            st.caption("No profiled reruns yet")
+        else:
+            st.caption(f"Profiling is off. Set {PROFILER_CONFIG['env_var']}=1 or open the app with "
+                       f"?{PROFILER_CONFIG['query_param']}=1 to profile every rerun.")
+        return
+
+    st.dataframe(
+        [{"page": run["page"], "ms": round(run["ms"], 1),
+          **{f"{name} ms": round(ms, 1) for name, ms in run["phases"].items()},
+          "samples": run["samples"], "profile": run["file"]} for run in runs],
+        use_container_width=True, hide_index=True
+    )
+    with st.expander("Hottest frames of the slowest rerun"):
+        for label, ms in runs[0]["hot"]:
+            st.caption(f"{ms:8.1f} ms  `{label}`")
+
+
+def _display_cache_hit_rate(snapshot):
+    """Response cache hit rate over all lookups so far"""
+    hits = misses = 0
+    for entry in snapshot["cache_requests_total"]["series"]:
+        if entry["labels"].get("result") == "hit":
+            hits += entry["value"]
+        else:
+            misses += entry["value"]
+    total = hits + misses
+    st.metric("Response cache hit rate", f"{hits / total:.0%}" if total else "n/a",
+              help=f"{int(hits)} hits / {int(total)} lookups")
+
+
+def _metric_rows(snapshot, names):
+    """One table row per series of the given metrics"""
+    rows = []
+    for name in names:
+        metric = snapshot[name]
+        for entry in metric["series"]:
+            labels = ", ".join(f"{key}={value}" for key, value in entry["labels"].items())
+            if metric["type"] == "histogram":
+                rows.append({"metric": name, "labels": labels, "count": entry["count"],
+                             "mean": round(entry["mean"], 3), "p50": round(entry["p50"], 3),
+                             "p95": round(entry["p95"], 3), "max": round(entry["max"], 3)})
+            else:
+                rows.append({"metric": name, "labels": labels, "count": entry["value"]})
+    return rows
+
+
+def _display_session():
+    """Costs of this session: reruns per scope and the largest session-state entries"""
+    st.subheader("👤 This session")
+
+    reruns = RerunMetrics.summary()
+    if reruns:
+        st.dataframe(
+            [{"scope": scope, "reruns": stats["count"], "last ms": round(stats["last_ms"], 1),
+              "avg ms": round(stats["mean_ms"], 1)} for scope, stats in reruns.items()],
+            use_container_width=True, hide_index=True
+        )
+
+    sizes = sorted(((key, deep_sizeof(st.session_state[key])) for key in st.session_state.keys()),
+                   key=lambda item: item[1], reverse=True)
+    st.metric("Session state", f"{sum(size for _, size in sizes) / 1024:.0f} KiB")
+    st.dataframe([{"key": key, "KiB": round(size / 1024, 1)} for key, size in sizes[:15]],
+                 use_container_width=True, hide_index=True)
+
+    metrics = st.session_state.get('performance_metrics')
+    if metrics:
+        with st.expander("Session performance metrics"):
+            st.json(metrics, expanded=False)
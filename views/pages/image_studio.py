@@ -1,5 +1,6 @@
 import streamlit as st
 from controllers.image_controller import ImageController
+from services.cancellation import CancellationRegistry
 from io import BytesIO
 from config import IMAGE_STUDIO_CONFIG  # Import the config
 
@@ -58,9 +59,16 @@ async def image_studio_page():
             st.error("Please enter a prompt!")
         else:
             with st.spinner("Generating image..."):
-                image, error = st.session_state.image_controller.generate_image(
-                    prompt, negative_prompt, steps, cfg_scale, width, height, sampler
-                )
+                token = CancellationRegistry.begin("image_studio")
+                completed = False
+                try:
+                    image, error = st.session_state.image_controller.generate_image(
+                        prompt, negative_prompt, steps, cfg_scale, width, height, sampler,
+                        cancel_token=token
+                    )
+                    completed = True
+                finally:
+                    CancellationRegistry.finish(token, completed)
 
                 if error:
                     st.error(f"Generation failed: {error}")
@@ -29,7 +29,7 @@ async def voice_page():
     st.title("🎙️ Voice Studio")
 
     # Initialize with loading state
-    if 'voice_service' not in st.session_state:
+    if st.session_state.get('voice_service') is None:
         st.session_state.voice_service = VoiceService()
         st.session_state.voice_loading = True
         st.session_state.voice_error = None
@@ -39,34 +39,39 @@ async def voice_page():
 
     # Check initialization status
     if voice_service.is_initializing():
-        with st.status("🚀 Initializing Voice Engine...", expanded=True) as status:
-            st.write("Loading AI models (this may take 30-60 seconds)")
-            st.write("You can continue using other features while this loads")
-
-            # Check if initialization completed
-            if voice_service.wait_for_init(timeout=1.0):
-                status.update(label="Voice Engine Ready!", state="complete")
-                st.balloons()  # Visual confirmation
-                st.rerun()  # Force refresh to show UI
-            else:
-                st.spinner()
+        _render_loading_status(voice_service)
         return
 
     # Handle error state
     if voice_service.get_error():
         st.error(f"Voice initialization failed: {voice_service.get_error()}")
         st.warning("Voice features are currently unavailable")
+        if st.button("🔄 Retry loading", key="voice_retry"):
+            voice_service.retry()
+            st.session_state.voice_loading = True
+            st.rerun()
         return
 
     # Main content when ready
     if voice_service.is_ready():
-        # Clear any previous loading state
+        # First pass after loading: confirm, then show the UI in the same run
         if st.session_state.get('voice_loading', False):
             st.session_state.voice_loading = False
-            st.rerun()
+            st.status("Voice Engine Ready!", state="complete")
+            st.balloons()  # Visual confirmation
 
         await render_voice_ui(voice_service)
 
+
+@st.fragment(run_every=1.0)
+def _render_loading_status(voice_service):
+    """Loading status; polls as a fragment so only this block reruns until the shared engine has loaded"""
+    if not voice_service.is_initializing():
+        st.rerun()  # Loaded or failed: render the whole page once
+    with st.status("🚀 Initializing Voice Engine...", expanded=True):
+        st.write("Loading AI models (this may take 30-60 seconds)")
+        st.write("You can continue using other features while this loads")
+
 async def render_voice_ui(voice_service):
     """Render the actual voice UI once service is ready"""
     # Section 1: Voice Preview Generator